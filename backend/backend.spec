@@ -13,6 +13,7 @@ a = Analysis(
     binaries=[],
     datas=[],
     hiddenimports=[
+        'server',  # importable by name so uvicorn can spawn worker processes
         'fastapi',
         'fastapi.middleware.cors',
         'uvicorn',
@@ -29,6 +30,8 @@ a = Analysis(
         'uvicorn.lifespan.on',
         'fpdf',
         'fpdf.enums',
+        'pikepdf',
+        'psutil',
         'pydantic',
         'pydantic_core',
         'pydantic_core._pydantic_core',
@@ -43,6 +46,7 @@ a = Analysis(
         'starlette.middleware.cors',
         'anyio',
         'sniffio',
+        'zstandard',
     ],
     hookspath=['./hooks'],
     hooksconfig={},
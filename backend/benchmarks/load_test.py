@@ -0,0 +1,464 @@
+"""
+Load and soak test the backend API with concurrent simulated editors.
+
+Each virtual user repeatedly exports a folder drawn from a realistic mix
+(small flyers, weekly folders, the odd large catalog) the way the editor does:
+POST /api/generate, GET /api/status, GET /api/download. The app runs either
+in this process (``--server inprocess``, through Starlette's test client) or
+as a local uvicorn server (``--server uvicorn``), always on a throwaway data
+directory.
+
+While the load runs, server RSS, open file descriptors, threads and the size
+of the output directory are sampled. The report lists throughput, latency
+percentiles and error rates per endpoint, and how each resource grew. With
+``--duration`` the run becomes a soak test: after a warm-up, resources that
+keep growing faster than the limits are reported as leaks and the exit status
+is 1, so the tool can gate CI or a nightly run.
+
+Usage:
+    python benchmarks/load_test.py [--users 4] [--requests 100]
+    python benchmarks/load_test.py --duration 3600 [--server uvicorn --workers 2]
+    python benchmarks/load_test.py --duration 600 --cleanup-every 20 --json report.json
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+import psutil
+
+BACKEND_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from src.utils import get_free_port
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """One kind of folder users export."""
+
+    name: str
+    weight: int
+    pages: int
+    products_per_page: int
+    formats: tuple = ("pdf",)
+
+
+# Weekly offers dominate; large catalogs and image exports are rare
+SCENARIOS = [
+    Scenario("flyer", 60, pages=4, products_per_page=6),
+    Scenario("weekly", 30, pages=20, products_per_page=6),
+    Scenario("weekly-png", 5, pages=4, products_per_page=6, formats=("pdf", "png")),
+    Scenario("catalog", 5, pages=100, products_per_page=8),
+]
+
+# Soak-test growth limits, per hour of load after warm-up
+LEAK_LIMITS = {
+    "rss_mb": 50.0,
+    "open_fds": 10.0,
+    "threads": 5.0,
+    "data_files": 100.0,
+    "data_mb": 50.0,
+}
+# Growth below these absolute amounts is noise, whatever the rate
+NOISE_FLOOR = {
+    "rss_mb": 10.0,
+    "open_fds": 3.0,
+    "threads": 2.0,
+    "data_files": 10.0,
+    "data_mb": 5.0,
+}
+
+
+def build_folder(scenario: Scenario, rng: random.Random) -> dict:
+    """A folder for one export; prices vary so no two exports are identical."""
+    return {
+        "pages": [
+            {
+                "page_number": page,
+                "title": f"{scenario.name.capitalize()} pagina {page}",
+                "layout": ("grid", "list", "featured")[page % 3],
+                "background_color": rng.choice(["#ffffff", "#fff4e0", "#e8f4ff"]),
+                "products": [
+                    {
+                        "id": f"{scenario.name}-{page}-{i}",
+                        "name": f"Product {i}",
+                        "price": round(rng.uniform(0.5, 25), 2),
+                        "description": "Alleen deze week in de aanbieding",
+                        "quantity": 1 + i % 3,
+                    }
+                    for i in range(scenario.products_per_page)
+                ],
+            }
+            for page in range(1, scenario.pages + 1)
+        ],
+        "formats": list(scenario.formats),
+        "png_dpi": 72,
+    }
+
+
+@dataclass
+class Sample:
+    """Server resources at one point in time."""
+
+    elapsed: float
+    rss_mb: float
+    open_fds: int
+    threads: int
+    data_files: int
+    data_mb: float
+    completed: int
+
+
+@dataclass
+class Stats:
+    """Latencies and errors, per endpoint."""
+
+    latencies: Dict[str, List[float]] = field(default_factory=dict)
+    errors: Dict[str, int] = field(default_factory=dict)
+    exports: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def record(self, endpoint: str, seconds: float, ok: bool) -> None:
+        with self.lock:
+            self.latencies.setdefault(endpoint, []).append(seconds)
+            if not ok:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of unsorted values."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class InProcessServer:
+    """The app in this process, driven through Starlette's test client."""
+
+    def __init__(self, data_dir: Path):
+        # The server opens its stores on import, so point them here first
+        os.environ["NSA_DATA_DIR"] = str(data_dir)
+        os.environ["NSA_PROJECT_DIR"] = str(data_dir / "projects")
+        from fastapi.testclient import TestClient
+
+        from src import server
+
+        logging.getLogger().setLevel(logging.WARNING)
+        self._client = TestClient(server.app)
+        self._client.__enter__()  # Run the app's startup
+        self.processes = [psutil.Process()]
+
+    def client(self):
+        return self._client
+
+    def close(self) -> None:
+        self._client.__exit__(None, None, None)
+
+
+class UvicornServer:
+    """The backend as a local server process (with ``workers`` worker processes)."""
+
+    def __init__(self, data_dir: Path, workers: int):
+        port = get_free_port()
+        env = dict(os.environ, NSA_PROJECT_DIR=str(data_dir / "projects"))
+        self._process = subprocess.Popen(
+            [
+                sys.executable,
+                str(BACKEND_DIR / "src" / "server.py"),
+                "--workers", str(workers),
+                "--port", str(port),
+                "--data-dir", str(data_dir),
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            env=env,
+        )
+        self.base_url = f"http://127.0.0.1:{port}"
+        self._wait_until_healthy()
+
+    @property
+    def processes(self) -> List[psutil.Process]:
+        # Looked up each time: the supervisor replaces workers that die
+        parent = psutil.Process(self._process.pid)
+        return [parent] + parent.children(recursive=True)
+
+    def _wait_until_healthy(self, timeout: float = 30.0) -> None:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                if httpx.get(f"{self.base_url}/health", timeout=1.0).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        self.close()
+        raise RuntimeError("Server did not become healthy")
+
+    def client(self):
+        return httpx.Client(base_url=self.base_url, timeout=300.0)
+
+    def close(self) -> None:
+        self._process.terminate()
+        self._process.wait(timeout=60)
+
+
+def sample(server, data_dir: Path, start: float, completed: int) -> Sample:
+    """Measure the server's processes and its output directory."""
+    rss = fds = threads = 0
+    for process in server.processes:
+        try:
+            with process.oneshot():
+                rss += process.memory_info().rss
+                fds += process.num_fds() if hasattr(process, "num_fds") else process.num_handles()
+                threads += process.num_threads()
+        except psutil.Error:
+            continue  # Worker restarted
+    files = size = 0
+    for path in data_dir.rglob("*"):
+        if path.is_file() and "projects" not in path.parts:
+            try:
+                size += path.stat().st_size
+                files += 1
+            except OSError:
+                continue  # Removed while scanning
+    return Sample(
+        elapsed=time.monotonic() - start,
+        rss_mb=rss / 2**20,
+        open_fds=fds,
+        threads=threads,
+        data_files=files,
+        data_mb=size / 2**20,
+        completed=completed,
+    )
+
+
+def export(client, folder: dict, stats: Stats) -> None:
+    """One editor export: generate, check status, download."""
+    start = time.perf_counter()
+    response = client.post("/api/generate", json=folder)
+    result = response.json() if response.status_code == 200 else {}
+    ok = bool(result.get("success"))
+    stats.record("generate", time.perf_counter() - start, ok)
+    if not ok:
+        return
+
+    job_id = result["job_id"]
+    start = time.perf_counter()
+    response = client.get(f"/api/status/{job_id}")
+    stats.record(
+        "status",
+        time.perf_counter() - start,
+        response.status_code == 200 and response.json()["status"] == "completed",
+    )
+
+    for url in result["outputs"]:
+        start = time.perf_counter()
+        response = client.get(url)
+        stats.record("download", time.perf_counter() - start, response.status_code == 200)
+    with stats.lock:
+        stats.exports += 1
+
+
+def leaks(samples: List[Sample], warmup: float) -> Dict[str, float]:
+    """
+    Resources that kept growing after the warm-up, with their growth per hour.
+
+    Growth is the least-squares slope over all samples after the warm-up; it
+    must exceed both the hourly limit and, in total, the noise floor.
+
+    Args:
+        samples: Samples in time order
+        warmup: Fraction of the run ignored (caches and pools filling up)
+
+    Returns:
+        Dict[str, float]: Leaking metric name to growth per hour
+    """
+    steady = [s for s in samples if s.elapsed >= warmup * samples[-1].elapsed]
+    if len(steady) < 3:
+        return {}
+    times = [s.elapsed for s in steady]
+    mean_t = sum(times) / len(times)
+    spread = sum((t - mean_t) ** 2 for t in times)
+    if spread == 0:
+        return {}
+
+    found = {}
+    for metric, limit in LEAK_LIMITS.items():
+        values = [getattr(s, metric) for s in steady]
+        mean_v = sum(values) / len(values)
+        slope = sum((t - mean_t) * (v - mean_v) for t, v in zip(times, values)) / spread
+        total = slope * (times[-1] - times[0])
+        if slope * 3600 > limit and total > NOISE_FLOOR[metric]:
+            found[metric] = slope * 3600
+    return found
+
+
+def run(args) -> dict:
+    data_dir = Path(tempfile.mkdtemp(prefix="nsa-load-"))
+    if args.server == "inprocess":
+        server = InProcessServer(data_dir)
+    else:
+        server = UvicornServer(data_dir, args.workers)
+
+    stats = Stats()
+    samples: List[Sample] = []
+    stop = threading.Event()
+    start = time.monotonic()
+    deadline = start + args.duration if args.duration else None
+    remaining = [args.requests]
+    claim_lock = threading.Lock()
+
+    def claim() -> bool:
+        if deadline is not None:
+            return time.monotonic() < deadline
+        with claim_lock:
+            remaining[0] -= 1
+            return remaining[0] >= 0
+
+    def user(number: int) -> None:
+        rng = random.Random(args.seed * 1000 + number)
+        weights = [s.weight for s in SCENARIOS]
+        client = server.client()
+        exports = 0
+        while claim():
+            scenario = rng.choices(SCENARIOS, weights)[0]
+            try:
+                export(client, build_folder(scenario, rng), stats)
+            except Exception as e:
+                stats.record("generate", 0.0, False)
+                print(f"  request failed: {e!r}", file=sys.stderr)
+            exports += 1
+            if args.cleanup_every and exports % args.cleanup_every == 0:
+                client.delete("/api/cleanup")
+            if args.think_time:
+                time.sleep(rng.expovariate(1 / args.think_time))
+
+    def sampler() -> None:
+        while True:
+            samples.append(sample(server, data_dir, start, stats.exports))
+            if args.duration and len(samples) % 10 == 0:
+                s = samples[-1]
+                print(
+                    f"  {s.elapsed:7.0f}s  {s.completed:6} exports  rss {s.rss_mb:7.1f} MB  "
+                    f"fds {s.open_fds:4}  threads {s.threads:3}  "
+                    f"data {s.data_files:6} files / {s.data_mb:7.1f} MB"
+                )
+            if stop.wait(args.sample_interval):
+                break
+
+    sampling = threading.Thread(target=sampler, daemon=True)
+    sampling.start()
+    try:
+        with ThreadPoolExecutor(max_workers=args.users) as pool:
+            list(pool.map(user, range(args.users)))
+    finally:
+        elapsed = time.monotonic() - start
+        stop.set()
+        sampling.join()
+        samples.append(sample(server, data_dir, start, stats.exports))
+        server.close()
+
+    endpoints = {}
+    for endpoint, latencies in stats.latencies.items():
+        errors = stats.errors.get(endpoint, 0)
+        endpoints[endpoint] = {
+            "requests": len(latencies),
+            "errors": errors,
+            "error_rate": errors / len(latencies),
+            "p50_ms": percentile(latencies, 0.50) * 1000,
+            "p90_ms": percentile(latencies, 0.90) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+            "max_ms": max(latencies) * 1000,
+        }
+    report = {
+        "server": args.server,
+        "users": args.users,
+        "seconds": elapsed,
+        "exports": stats.exports,
+        "exports_per_second": stats.exports / elapsed,
+        "endpoints": endpoints,
+        "samples": [asdict(s) for s in samples],
+        "leaks": leaks(samples, args.warmup) if args.duration else {},
+    }
+    if not args.keep_data:
+        shutil.rmtree(data_dir, ignore_errors=True)
+    return report
+
+
+def print_report(report: dict) -> None:
+    print(
+        f"\n{report['exports']} exports in {report['seconds']:.1f}s "
+        f"({report['exports_per_second']:.2f}/s) with {report['users']} users, "
+        f"{report['server']} server\n"
+    )
+    print(
+        f"{'endpoint':<10} {'requests':>8} {'errors':>7} "
+        f"{'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+    )
+    for endpoint, row in report["endpoints"].items():
+        print(
+            f"{endpoint:<10} {row['requests']:>8} {row['errors']:>7} {row['p50_ms']:>8.1f} "
+            f"{row['p90_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['max_ms']:>8.1f}"
+        )
+
+    first, last = report["samples"][0], report["samples"][-1]
+    hours = max(last["elapsed"] - first["elapsed"], 1e-9) / 3600
+    print(f"\n{'resource':<10} {'start':>9} {'end':>9} {'peak':>9} {'per hour':>9}")
+    for metric in LEAK_LIMITS:
+        peak = max(s[metric] for s in report["samples"])
+        growth = (last[metric] - first[metric]) / hours
+        print(
+            f"{metric:<10} {first[metric]:>9.1f} {last[metric]:>9.1f} {peak:>9.1f} {growth:>9.1f}"
+        )
+
+    if report["leaks"]:
+        print("\nLEAKS (growth per hour after warm-up):")
+        for metric, rate in report["leaks"].items():
+            print(f"  {metric}: +{rate:.1f}/h (limit {LEAK_LIMITS[metric]:g}/h)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--server", choices=["inprocess", "uvicorn"], default="inprocess")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--users", type=int, default=4, help="concurrent virtual users")
+    parser.add_argument("--requests", type=int, default=100, help="exports in load mode")
+    parser.add_argument("--duration", type=float, help="soak for this many seconds instead")
+    parser.add_argument("--think-time", type=float, default=0.0, help="mean pause per user (s)")
+    parser.add_argument("--cleanup-every", type=int, default=0,
+                        help="call DELETE /api/cleanup after every N exports")
+    parser.add_argument("--sample-interval", type=float, default=1.0)
+    parser.add_argument("--warmup", type=float, default=0.2,
+                        help="fraction of a soak run ignored for leak detection")
+    parser.add_argument("--max-error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", type=Path, help="also write the full report here")
+    parser.add_argument("--keep-data", action="store_true", help="keep the data directory")
+    args = parser.parse_args()
+
+    report = run(args)
+    print_report(report)
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+
+    error_rate = max((row["error_rate"] for row in report["endpoints"].values()), default=0.0)
+    if report["leaks"] or error_rate > args.max_error_rate:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
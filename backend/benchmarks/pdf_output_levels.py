@@ -0,0 +1,77 @@
+"""
+Compare PDF output compression levels on a large folder.
+
+Renders the same folder once per level (with and without linearization) and
+prints file size and timing for each, so the speed/size trade-off can be
+checked on real hardware.
+
+Usage:
+    python benchmarks/pdf_output_levels.py [--pages 300] [--products 6]
+"""
+
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.models import GeneratePDFRequest
+from src.pdf_generator import generate_pdf_report
+from src.pdf_optimizer import COMPRESSION_LEVELS, post_processing_available
+
+
+def build_request(page_count: int, products_per_page: int, **options) -> GeneratePDFRequest:
+    """Build a folder with a mix of layouts and background colors."""
+    layouts = ["grid", "list", "featured"]
+    backgrounds = ["#ffffff", "#fff4e0", "#e8f4ff"]
+    return GeneratePDFRequest(
+        pages=[
+            {
+                "page_number": page,
+                "title": f"Aanbiedingen week {page}",
+                "layout": layouts[page % len(layouts)],
+                "background_color": backgrounds[page % len(backgrounds)],
+                "products": [
+                    {
+                        "id": f"prod-{page}-{i}",
+                        "name": f"Product {i} van pagina {page}",
+                        "price": 1.99 + i,
+                        "description": "Heerlijk vers, alleen deze week in de aanbieding",
+                        "quantity": 1 + i % 3,
+                    }
+                    for i in range(products_per_page)
+                ],
+            }
+            for page in range(1, page_count + 1)
+        ],
+        **options,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--products", type=int, default=6)
+    args = parser.parse_args()
+
+    if not post_processing_available():
+        print("pikepdf is not installed: only stream compression levels are compared")
+
+    print(f"{'level':<10} {'linearized':<11} {'size KB':>9} {'render s':>9} {'optimize s':>11} {'dedup':>6}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for compression in COMPRESSION_LEVELS:
+            for linearize in (False, True):
+                request = build_request(
+                    args.pages, args.products, compression=compression, linearize=linearize
+                )
+                report = generate_pdf_report(request, Path(tmp) / "out.pdf")
+                print(
+                    f"{compression:<10} {str(report.linearized):<11} "
+                    f"{report.final_size // 1024:>9} {report.render_seconds:>9.2f} "
+                    f"{report.optimize_seconds:>11.2f} {report.objects_deduplicated:>6}"
+                )
+
+
+if __name__ == "__main__":
+    main()
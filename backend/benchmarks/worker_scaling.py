@@ -0,0 +1,114 @@
+"""
+Measure /api/generate throughput against the number of server worker processes.
+
+Starts the backend in shared server mode once per worker count, fires the same
+batch of concurrent generation requests at it and prints requests per second.
+All state lives in a throwaway data directory.
+
+Usage:
+    python benchmarks/worker_scaling.py [--workers 1 2 4] [--requests 40] [--concurrency 8]
+"""
+
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from src.utils import get_free_port
+
+
+def folder(pages: int = 20, products_per_page: int = 6) -> dict:
+    """A mid-sized folder, representative of a weekly offer."""
+    return {
+        "pages": [
+            {
+                "page_number": page,
+                "title": f"Pagina {page}",
+                "layout": ("grid", "list", "featured")[page % 3],
+                "products": [
+                    {"id": f"p-{page}-{i}", "name": f"Product {i}", "price": 1.99 + i}
+                    for i in range(products_per_page)
+                ],
+            }
+            for page in range(1, pages + 1)
+        ]
+    }
+
+
+def wait_until_healthy(base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("Server did not become healthy")
+
+
+def run_batch(base_url: str, requests: int, concurrency: int) -> tuple:
+    payload = folder()
+    with httpx.Client(base_url=base_url, timeout=120.0) as client:
+
+        def one(_):
+            response = client.post("/api/generate", json=payload)
+            return response.status_code == 200 and response.json()["success"]
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(one, range(requests)))
+        elapsed = time.perf_counter() - start
+    return elapsed, results.count(False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    print(f"{'workers':>7} {'seconds':>8} {'req/s':>7} {'errors':>7} {'speedup':>8}")
+    baseline = None
+    for workers in args.workers:
+        port = get_free_port()
+        with tempfile.TemporaryDirectory() as data_dir:
+            server = subprocess.Popen(
+                [
+                    sys.executable,
+                    str(BACKEND_DIR / "src" / "server.py"),
+                    "--workers", str(workers),
+                    "--port", str(port),
+                    "--data-dir", data_dir,
+                ],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            try:
+                base_url = f"http://127.0.0.1:{port}"
+                wait_until_healthy(base_url)
+                run_batch(base_url, args.concurrency, args.concurrency)  # warm up
+                elapsed, errors = run_batch(base_url, args.requests, args.concurrency)
+            finally:
+                server.terminate()
+                server.wait(timeout=60)
+
+        throughput = args.requests / elapsed
+        baseline = baseline or throughput
+        print(
+            f"{workers:>7} {elapsed:>8.2f} {throughput:>7.2f} {errors:>7} "
+            f"{throughput / baseline:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
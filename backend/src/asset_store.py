@@ -0,0 +1,289 @@
+"""Content-addressed store for uploaded product images, with metadata and renditions."""
+
+import hashlib
+import io
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Tuple
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+try:
+    from .utils import get_project_dir
+except ImportError:
+    from utils import get_project_dir
+
+logger = logging.getLogger(__name__)
+
+# Directory under the project directory: saved projects reference these images
+ASSET_DIR_NAME = "assets"
+
+# Largest upload accepted
+MAX_ASSET_BYTES = 25 * 1024 * 1024
+
+# Image metadata kept in memory; more than the distinct images of any folder
+INFO_CACHE_SIZE = 4096
+
+# Image formats accepted for upload
+ASSET_FORMATS = ("JPEG", "PNG", "GIF", "WEBP", "BMP", "TIFF")
+
+# Renditions generated at upload: name -> longest side in pixels. "print" is
+# what output backends draw (about 170 mm at 300 DPI); "thumb" is for the editor.
+RENDITIONS = {"thumb": 256, "print": 2000}
+JPEG_QUALITY = {"thumb": 80, "print": 90}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS assets (
+    asset_id TEXT PRIMARY KEY,
+    format TEXT NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    has_alpha INTEGER NOT NULL,
+    filename TEXT NOT NULL,
+    created_at REAL NOT NULL
+)
+"""
+
+
+class AssetNotFound(KeyError):
+    """Raised when no image with the given id is stored."""
+
+
+class InvalidAsset(ValueError):
+    """Raised when uploaded data is not an accepted image."""
+
+
+@dataclass(frozen=True)
+class AssetInfo:
+    """Metadata of a stored image, extracted once at upload."""
+
+    asset_id: str
+    format: str
+    width: int
+    height: int
+    size_bytes: int
+    has_alpha: bool
+    filename: str
+
+    @property
+    def rendition_suffix(self) -> str:
+        # Opaque images as JPEG, which PDF embeds without re-encoding
+        return ".png" if self.has_alpha else ".jpg"
+
+
+class AssetStore:
+    """
+    Product images stored once per distinct content.
+
+    Images are keyed by the SHA-256 of the uploaded bytes, so uploading the
+    same image again (for another product, or by another user) stores nothing
+    new. At upload the image is decoded once: its format and dimensions are
+    recorded, and the renditions in ``RENDITIONS`` are written with the EXIF
+    orientation applied. Output backends only read the renditions; originals
+    are kept for re-export but never decoded again.
+    """
+
+    def __init__(self, root: Path, timeout: float = 10.0, info_cache_size: int = INFO_CACHE_SIZE):
+        self.root = Path(root)
+        self.db_path = self.root / "assets.sqlite3"
+        self.timeout = timeout
+        self.info_cache_size = info_cache_size
+        self._local = threading.local()
+        # Recently used metadata, least recently used first
+        self._info: "OrderedDict[str, AssetInfo]" = OrderedDict()
+        self._info_lock = threading.Lock()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._connect().execute(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection (sqlite3 connections are per thread)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _path(self, kind: str, name: str) -> Path:
+        # Fan out by hash prefix to keep directories small
+        return self.root / kind / name[:2] / name
+
+    def original_path(self, info: AssetInfo) -> Path:
+        """Path of the uploaded file, as uploaded."""
+        return self._path("originals", f"{info.asset_id}.{info.format.lower()}")
+
+    def rendition_path(self, info: AssetInfo, rendition: str = "print") -> Path:
+        """Path of a pregenerated rendition (see ``RENDITIONS``)."""
+        return self._path("renditions", f"{info.asset_id}-{rendition}{info.rendition_suffix}")
+
+    def add(self, data: bytes, filename: str = "") -> Tuple[AssetInfo, bool]:
+        """
+        Store an uploaded image, unless identical content is stored already.
+
+        Args:
+            data: The uploaded file
+            filename: Original file name, kept for display
+
+        Returns:
+            Tuple[AssetInfo, bool]: The image's metadata, and whether it was new
+
+        Raises:
+            InvalidAsset: If the data is too large or not an accepted image
+        """
+        if len(data) > MAX_ASSET_BYTES:
+            raise InvalidAsset(f"Image larger than {MAX_ASSET_BYTES // (1024 * 1024)} MB")
+
+        asset_id = hashlib.sha256(data).hexdigest()
+        try:
+            return self.get(asset_id), False
+        except AssetNotFound:
+            pass
+
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                image_format = image.format
+                if image_format not in ASSET_FORMATS:
+                    raise InvalidAsset(f"Unsupported image format: {image_format}")
+                image.load()
+                # Dimensions as displayed, i.e. after the EXIF orientation
+                upright = ImageOps.exif_transpose(image)
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+            raise InvalidAsset(f"Not a readable image: {e}") from e
+
+        has_alpha = upright.mode in ("RGBA", "LA", "PA") or "transparency" in upright.info
+        info = AssetInfo(
+            asset_id=asset_id,
+            format=image_format,
+            width=upright.width,
+            height=upright.height,
+            size_bytes=len(data),
+            has_alpha=has_alpha,
+            filename=Path(filename).name,
+        )
+
+        self._write(self.original_path(info), data)
+        upright = upright.convert("RGBA" if has_alpha else "RGB")
+        for rendition, longest_side in RENDITIONS.items():
+            self._write(
+                self.rendition_path(info, rendition),
+                _encode_rendition(upright, longest_side, has_alpha, JPEG_QUALITY[rendition]),
+            )
+
+        # Files first: an asset counts as stored once its row exists
+        self._connect().execute(
+            "INSERT OR IGNORE INTO assets "
+            "(asset_id, format, width, height, size_bytes, has_alpha, filename, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                info.asset_id,
+                info.format,
+                info.width,
+                info.height,
+                info.size_bytes,
+                int(info.has_alpha),
+                info.filename,
+                time.time(),
+            ),
+        )
+        self._remember(info)
+        logger.info(
+            "Stored image %s (%s %dx%d, %d KB)",
+            asset_id[:12],
+            info.format,
+            info.width,
+            info.height,
+            len(data) // 1024,
+        )
+        return info, True
+
+    @staticmethod
+    def _write(path: Path, data: bytes) -> None:
+        """Write atomically, so concurrent uploads of the same image never see partial files."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def _remember(self, info: AssetInfo) -> None:
+        with self._info_lock:
+            self._info[info.asset_id] = info
+            self._info.move_to_end(info.asset_id)
+            while len(self._info) > self.info_cache_size:
+                self._info.popitem(last=False)
+
+    def get(self, asset_id: str) -> AssetInfo:
+        """Metadata of a stored image; raises AssetNotFound if there is none."""
+        with self._info_lock:
+            info = self._info.get(asset_id)
+            if info is not None:
+                self._info.move_to_end(asset_id)
+                return info
+        row = self._connect().execute(
+            "SELECT asset_id, format, width, height, size_bytes, has_alpha, filename "
+            "FROM assets WHERE asset_id = ?",
+            (asset_id,),
+        ).fetchone()
+        if row is None:
+            raise AssetNotFound(asset_id)
+        info = self._row_to_info(row)
+        self._remember(info)
+        return info
+
+    def list_assets(self) -> List[AssetInfo]:
+        """All stored images, most recent first."""
+        rows = self._connect().execute(
+            "SELECT asset_id, format, width, height, size_bytes, has_alpha, filename "
+            "FROM assets ORDER BY created_at DESC"
+        ).fetchall()
+        return [self._row_to_info(row) for row in rows]
+
+    @staticmethod
+    def _row_to_info(row) -> AssetInfo:
+        asset_id, image_format, width, height, size_bytes, has_alpha, filename = row
+        return AssetInfo(
+            asset_id=asset_id,
+            format=image_format,
+            width=width,
+            height=height,
+            size_bytes=size_bytes,
+            has_alpha=bool(has_alpha),
+            filename=filename,
+        )
+
+    def close(self) -> None:
+        """Close this thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def _encode_rendition(image: Image.Image, longest_side: int, has_alpha: bool, quality: int) -> bytes:
+    rendition = image.copy()
+    # Never upscale: thumbnail() only shrinks
+    rendition.thumbnail((longest_side, longest_side), Image.Resampling.LANCZOS)
+    buffer = io.BytesIO()
+    if has_alpha:
+        rendition.save(buffer, "PNG", optimize=True)
+    else:
+        rendition.save(buffer, "JPEG", quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+@lru_cache(maxsize=None)
+def get_asset_store() -> AssetStore:
+    """The process-wide image store in the project directory."""
+    return AssetStore(get_project_dir() / ASSET_DIR_NAME)
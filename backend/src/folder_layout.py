@@ -0,0 +1,460 @@
+"""Layout pass: where every element of a folder goes, shared by all output backends."""
+
+import logging
+import threading
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from fpdf import FPDF
+from fpdf.enums import MethodReturnValue
+from fpdf.fonts import CORE_FONTS_CHARWIDTHS
+
+try:
+    from .asset_store import AssetInfo, AssetNotFound, get_asset_store
+    from .layout_metrics import LayoutMetrics, get_layout_metrics
+    from .models import FolderPage, GeneratePDFRequest, Product
+    from .page_templates import RGB, Frame, parse_color
+    from .price_labels import DEFAULT_LOCALE, LABEL_CACHE_SIZE, LabelSegment, price_label
+except ImportError:
+    from asset_store import AssetInfo, AssetNotFound, get_asset_store
+    from layout_metrics import LayoutMetrics, get_layout_metrics
+    from models import FolderPage, GeneratePDFRequest, Product
+    from page_templates import RGB, Frame, parse_color
+    from price_labels import DEFAULT_LOCALE, LABEL_CACHE_SIZE, LabelSegment, price_label
+
+logger = logging.getLogger(__name__)
+
+# Core fonts are drawn in WinAnsi (cp1252), which has the euro sign, unlike
+# fpdf2's latin-1 default
+CORE_FONTS_ENCODING = "windows-1252"
+
+MM_PER_POINT = 25.4 / 72
+
+# fpdf2's default page margin (1 cm); titles start here and overflow pages restart here
+PAGE_MARGIN = 10.0
+# Horizontal padding fpdf2 applies inside a text cell; other backends match it
+CELL_PADDING = 1.0
+
+# Font family every backend approximates; PDF uses the core font itself
+FONT_FAMILY = "Helvetica"
+
+# Footer: drawn by each backend at this distance from the page bottom
+FOOTER_OFFSET = 15.0
+FOOTER_HEIGHT = 10.0
+FOOTER_FONT = ("I", 8)
+FOOTER_COLOR: RGB = (128, 128, 128)
+FOOTER_TEMPLATE = "Pagina {number}/{total}"
+
+BLACK: RGB = (0, 0, 0)
+TITLE_FONT = ("B", 24)
+TITLE_HEIGHT = 15.0
+TITLE_SPACING = 5.0
+NAME_FONT = ("B", 12)
+NAME_MAX_CHARS = 30
+DESCRIPTION_FONT = ("", 9)
+DESCRIPTION_COLOR: RGB = (100, 100, 100)
+DESCRIPTION_MAX_CHARS = 60
+DESCRIPTION_LINE_HEIGHT = 5.0
+PRICE_FONT = ("B", 11)
+PRICE_COLOR: RGB = (0, 102, 204)
+# Old price: "S" is fpdf2's strike-through style, which the other backends follow
+ORIGINAL_PRICE_FONT = ("S", 9)
+ORIGINAL_PRICE_COLOR: RGB = (100, 100, 100)
+BADGE_FONT = ("B", 11)
+BADGE_COLOR: RGB = (204, 0, 0)
+# Space between the cells of a price label
+LABEL_GAP = 1.5
+LABEL_FONTS = {
+    "price": (PRICE_FONT, PRICE_COLOR),
+    "original": (ORIGINAL_PRICE_FONT, ORIGINAL_PRICE_COLOR),
+    "badge": (BADGE_FONT, BADGE_COLOR),
+}
+QUANTITY_FONT = ("", 9)
+QUANTITY_COLOR: RGB = (150, 150, 150)
+CARD_PADDING = 3.0
+# Product images take the left of a card, at most this share of its width
+IMAGE_MAX_SHARE = 0.4
+
+
+@dataclass(frozen=True)
+class TextRun:
+    """One line of text in a cell box (mm); text is vertically centered in the box."""
+
+    x: float
+    y: float
+    width: float
+    height: float
+    text: str
+    style: str  # "", "B", "I", plus "S" for strike-through
+    size: float
+    color: RGB
+    align: str = "L"
+
+
+@dataclass(frozen=True)
+class Card:
+    """Frame of one product card (mm)."""
+
+    product_id: str
+    x: float
+    y: float
+    width: float
+    height: float
+
+    @property
+    def frame(self) -> Frame:
+        return (self.x, self.y, self.width, self.height)
+
+
+@dataclass(frozen=True)
+class ImagePlacement:
+    """A product image (mm), already fitted to its box keeping the aspect ratio."""
+
+    asset_id: str
+    path: str
+    x: float
+    y: float
+    width: float
+    height: float
+
+
+@dataclass
+class PageLayout:
+    """One output page: everything to draw, in drawing order per kind."""
+
+    width: float
+    height: float
+    source_page: int
+    background: Optional[RGB] = None
+    cards: List[Card] = field(default_factory=list)
+    texts: List[TextRun] = field(default_factory=list)
+    images: List[ImagePlacement] = field(default_factory=list)
+
+
+@dataclass
+class FolderLayout:
+    """Laid-out folder, ready for any output backend."""
+
+    page_format: str
+    orientation: str
+    pages: List[PageLayout]
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    if len(text) > max_chars:
+        return text[:max_chars - 3] + "..."
+    return text
+
+
+_measure = threading.local()
+
+
+def _measure_pdf() -> FPDF:
+    pdf = getattr(_measure, "pdf", None)
+    if pdf is None:
+        pdf = _measure.pdf = FPDF(unit="mm")
+        pdf.core_fonts_encoding = CORE_FONTS_ENCODING
+        pdf.add_page()
+    return pdf
+
+
+@lru_cache(maxsize=4096)
+def wrap_text(text: str, width: float, style: str, size: float) -> Tuple[str, ...]:
+    """
+    Break text into lines that fit ``width`` mm, using the PDF font's metrics.
+
+    Args:
+        text: Text to wrap
+        width: Cell width in mm (including cell padding)
+        style: Font style ("", "B", "I")
+        size: Font size in pt
+
+    Returns:
+        Tuple[str, ...]: The lines, as a PDF multi-line cell would break them
+    """
+    pdf = _measure_pdf()
+    pdf.set_font(FONT_FAMILY, style, size)
+    return tuple(
+        pdf.multi_cell(
+            width, DESCRIPTION_LINE_HEIGHT, text, dry_run=True, output=MethodReturnValue.LINES
+        )
+    )
+
+
+@lru_cache(maxsize=None)
+def _char_widths(style: str) -> Dict[str, float]:
+    """Advance widths (mm per pt of font size) of every character the core font encodes."""
+    font_key = FONT_FAMILY.lower() + "".join(flag for flag in "BI" if flag in style)
+    widths = CORE_FONTS_CHARWIDTHS[font_key]
+    table = {}
+    for code in range(256):
+        try:
+            char = bytes([code]).decode(CORE_FONTS_ENCODING)
+        except UnicodeDecodeError:
+            continue
+        table[char] = widths[chr(code)] / 1000 * MM_PER_POINT
+    return table
+
+
+def string_width(text: str, style: str, size: float) -> float:
+    """
+    Width of ``text`` in mm in the PDF font, without cell padding.
+
+    Sums precomputed character widths (core fonts have no kerning), which is
+    what fpdf2 computes, without its per-call text shaping overhead.
+    """
+    widths = _char_widths(style)
+    try:
+        return sum(widths[char] for char in text) * size
+    except KeyError:
+        pdf = _measure_pdf()  # Let fpdf2 handle (and reject) unencodable text
+        pdf.set_font(FONT_FAMILY, style, size)
+        return pdf.get_string_width(text)
+
+
+@lru_cache(maxsize=LABEL_CACHE_SIZE)
+def _label_cells(segments: Tuple[LabelSegment, ...], width: float) -> tuple:
+    """Cells (text, offset, width, font, color) of a price label in a row ``width`` mm wide."""
+    cells = []
+    for segment in segments:
+        font, color = LABEL_FONTS[segment.kind]
+        cells.append((segment, string_width(segment.text, *font) + 2 * CELL_PADDING, font, color))
+
+    # A row too narrow for everything drops the old price first
+    if sum(cell[1] for cell in cells) + LABEL_GAP * (len(cells) - 1) > width:
+        cells = [cell for cell in cells if cell[0].kind != "original"]
+
+    laid_out = []
+    offset = 0.0
+    for segment, cell_width, font, color in cells:
+        laid_out.append((segment.text, offset, cell_width, font, color))
+        offset += cell_width + LABEL_GAP
+    return tuple(laid_out)
+
+
+def footer_text(number, total) -> str:
+    """Footer of one page; ``number``/``total`` may be aliases resolved later."""
+    return FOOTER_TEMPLATE.format(number=number, total=total)
+
+
+class _PageBuilder:
+    """Accumulates the output pages of one folder page."""
+
+    def __init__(self, page: FolderPage, metrics: LayoutMetrics, locale: str = DEFAULT_LOCALE):
+        self.page = page
+        self.metrics = metrics
+        self.locale = locale
+        self.background = parse_color(page.background_color)
+        if self.background is None and page.background_color:
+            logger.warning("Could not draw background: unknown color %r", page.background_color)
+        if self.background == (255, 255, 255):
+            self.background = None  # Pages are white already
+        self.pages: List[PageLayout] = []
+        self.y = PAGE_MARGIN
+        self.new_page()
+
+    @property
+    def current(self) -> PageLayout:
+        return self.pages[-1]
+
+    def new_page(self) -> None:
+        self.pages.append(
+            PageLayout(
+                width=self.metrics.page_width,
+                height=self.metrics.page_height,
+                source_page=self.page.page_number,
+                background=self.background,
+            )
+        )
+        self.y = PAGE_MARGIN
+
+    def text(self, x, y, width, height, text, font, color, align="L") -> None:
+        style, size = font
+        self.current.texts.append(TextRun(x, y, width, height, text, style, size, color, align))
+
+    def card(self, product: Product, x: float, y: float, width: float, height: float) -> None:
+        """Lay out a single product card."""
+        self.current.cards.append(Card(product.id, x, y, width, height))
+
+        # Text goes right of the product image, if there is one
+        text_x = x + CARD_PADDING
+        text_width = width - 2 * CARD_PADDING
+        image = self.image_info(product)
+        if image is not None:
+            side = min(height, width * IMAGE_MAX_SHARE) - 2 * CARD_PADDING
+            self.image(image, x + CARD_PADDING, y + CARD_PADDING, side, side)
+            text_x += side + CARD_PADDING
+            text_width -= side + CARD_PADDING
+
+        self.text(
+            text_x, y + 3, text_width, 8, _truncate(product.name, NAME_MAX_CHARS), NAME_FONT, BLACK
+        )
+
+        if product.description:
+            description = _truncate(product.description, DESCRIPTION_MAX_CHARS)
+            lines = wrap_text(description, text_width, *DESCRIPTION_FONT)
+            for index, line in enumerate(lines):
+                self.text(
+                    text_x,
+                    y + 12 + index * DESCRIPTION_LINE_HEIGHT,
+                    text_width,
+                    DESCRIPTION_LINE_HEIGHT,
+                    line,
+                    DESCRIPTION_FONT,
+                    DESCRIPTION_COLOR,
+                )
+
+        if product.price:
+            # The quantity box, when drawn, takes the right end of the price row
+            label_width = x + width - text_x - (25 if product.quantity > 1 else CARD_PADDING)
+            self.price_label(product, text_x, y + height - 12, label_width)
+
+        if product.quantity > 1:
+            self.text(
+                x + width - 25,
+                y + height - 12,
+                22,
+                8,
+                f"x{product.quantity}",
+                QUANTITY_FONT,
+                QUANTITY_COLOR,
+                align="R",
+            )
+
+    def price_label(self, product: Product, x: float, y: float, width: float) -> None:
+        """Lay out a product's price label left to right on one row."""
+        segments = price_label(
+            product.price,
+            product.original_price,
+            product.promotion,
+            product.promotion_quantity,
+            self.locale,
+        )
+        for text, offset, cell_width, font, color in _label_cells(segments, width):
+            self.text(x + offset, y, cell_width, 8, text, font, color)
+
+    @staticmethod
+    def image_info(product: Product) -> Optional[AssetInfo]:
+        """Stored metadata of the product's image; None if it has none (or it is missing)."""
+        if not product.image_id:
+            return None
+        try:
+            return get_asset_store().get(product.image_id)
+        except AssetNotFound:
+            logger.warning("Could not draw image of product %s: not uploaded", product.id)
+            return None
+
+    def image(self, info: AssetInfo, x: float, y: float, width: float, height: float) -> None:
+        """Fit an image into a box, centered, from its recorded dimensions."""
+        scale = min(width / info.width, height / info.height)
+        fitted_width, fitted_height = info.width * scale, info.height * scale
+        self.current.images.append(
+            ImagePlacement(
+                asset_id=info.asset_id,
+                path=str(get_asset_store().rendition_path(info)),
+                x=x + (width - fitted_width) / 2,
+                y=y + (height - fitted_height) / 2,
+                width=fitted_width,
+                height=fitted_height,
+            )
+        )
+
+    def grid(self, products: List[Product], metrics: LayoutMetrics) -> None:
+        """Cards in rows of ``metrics.columns``; rows that do not fit move to a new page."""
+        start_y = self.y
+        first_row = 0
+        for i, product in enumerate(products):
+            row = i // metrics.columns - first_row
+            y = start_y + row * metrics.row_pitch
+            fits = y + metrics.row_pitch <= metrics.content_bottom
+            if not fits and (row > 0 or start_y > PAGE_MARGIN):
+                self.new_page()
+                start_y = self.y
+                first_row = i // metrics.columns
+                y = start_y
+            x = metrics.content_x + (i % metrics.columns) * metrics.column_width
+            self.card(product, x, y, metrics.card_width, metrics.card_height)
+
+    def listing(self, products: List[Product], metrics: LayoutMetrics) -> None:
+        """Full-width cards below each other."""
+        for product in products:
+            if self.y + metrics.card_height > metrics.content_bottom:
+                self.new_page()
+            self.card(product, metrics.content_x, self.y, metrics.card_width, metrics.card_height)
+            self.y += metrics.row_pitch
+
+    def featured(self, products: List[Product], metrics: LayoutMetrics) -> None:
+        """First product large, the rest in a grid."""
+        self.card(
+            products[0],
+            metrics.content_x,
+            self.y,
+            metrics.featured_width,
+            metrics.featured_height,
+        )
+        self.y += metrics.featured_pitch
+        if len(products) > 1:
+            self.grid(products[1:], metrics)
+
+
+def layout_page(
+    page: FolderPage, page_format: str, orientation: str, locale: str = DEFAULT_LOCALE
+) -> List[PageLayout]:
+    """
+    Lay out one folder page.
+
+    Args:
+        page: The folder page
+        page_format: Page format (see ``layout_metrics.page_size``)
+        orientation: "portrait" or "landscape"
+        locale: Locale of price labels (see ``price_labels.LOCALES``)
+
+    Returns:
+        List[PageLayout]: The page, plus overflow pages if its products do not fit
+    """
+    layout = page.layout if page.layout in ("list", "featured") else "grid"
+    metrics = get_layout_metrics(page_format, orientation, layout)
+    builder = _PageBuilder(page, metrics, locale)
+
+    if page.title:
+        builder.text(
+            PAGE_MARGIN,
+            builder.y,
+            metrics.page_width - 2 * PAGE_MARGIN,
+            TITLE_HEIGHT,
+            page.title,
+            TITLE_FONT,
+            BLACK,
+        )
+        builder.y += TITLE_HEIGHT + TITLE_SPACING
+
+    if page.products:
+        if layout == "list":
+            builder.listing(page.products, metrics)
+        elif layout == "featured":
+            builder.featured(page.products, metrics)
+        else:
+            builder.grid(page.products, metrics)
+
+    return builder.pages
+
+
+def layout_folder(request: GeneratePDFRequest) -> FolderLayout:
+    """
+    Lay out a whole folder once, for any number of output backends.
+
+    Args:
+        request: Generation request with folder data and page options
+
+    Returns:
+        FolderLayout: All output pages in order
+    """
+    pages: List[PageLayout] = []
+    for page in request.pages:
+        pages.extend(
+            layout_page(page, request.page_format, request.orientation, request.locale)
+        )
+    return FolderLayout(
+        page_format=request.page_format, orientation=request.orientation, pages=pages
+    )
@@ -0,0 +1,166 @@
+"""Job state shared between server worker processes, backed by a local SQLite file."""
+
+import sqlite3
+import threading
+import time
+from collections.abc import MutableMapping
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+# Statuses of jobs that still hold a worker
+ACTIVE_STATUSES = ("running",)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    path TEXT,
+    size_kb INTEGER,
+    worker_pid INTEGER,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
+
+class JobStore(MutableMapping):
+    """
+    Dict-like job registry persisted in SQLite.
+
+    Every worker process opens the same database file, so a job started by one
+    worker can be polled and downloaded through any other. Values are plain
+    dicts with ``status``, ``path`` and ``size_kb`` keys, like the in-memory
+    registry this replaces. Assigning a value replaces the stored job; mutating
+    a returned dict does not write back.
+    """
+
+    def __init__(self, db_path: Path, timeout: float = 10.0):
+        self.db_path = Path(db_path)
+        self.timeout = timeout
+        self._local = threading.local()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection (sqlite3 connections are per thread)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row_to_job(row) -> dict:
+        status, path, size_kb, worker_pid = row
+        return {
+            "status": status,
+            "path": Path(path) if path else None,
+            "size_kb": size_kb,
+            "worker_pid": worker_pid,
+        }
+
+    def __getitem__(self, job_id: str) -> dict:
+        row = self._connect().execute(
+            "SELECT status, path, size_kb, worker_pid FROM jobs WHERE job_id = ?",
+            (job_id,),
+        ).fetchone()
+        if row is None:
+            raise KeyError(job_id)
+        return self._row_to_job(row)
+
+    def __setitem__(self, job_id: str, job: dict) -> None:
+        now = time.time()
+        path = job.get("path")
+        self._connect().execute(
+            """
+            INSERT INTO jobs (job_id, status, path, size_kb, worker_pid, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(job_id) DO UPDATE SET
+                status = excluded.status,
+                path = excluded.path,
+                size_kb = excluded.size_kb,
+                worker_pid = excluded.worker_pid,
+                updated_at = excluded.updated_at
+            """,
+            (
+                job_id,
+                job["status"],
+                str(path) if path else None,
+                job.get("size_kb"),
+                job.get("worker_pid"),
+                now,
+                now,
+            ),
+        )
+
+    def __delitem__(self, job_id: str) -> None:
+        cursor = self._connect().execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+        if cursor.rowcount == 0:
+            raise KeyError(job_id)
+
+    def __contains__(self, job_id) -> bool:
+        row = self._connect().execute(
+            "SELECT 1 FROM jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        return row is not None
+
+    def __iter__(self) -> Iterator[str]:
+        rows = self._connect().execute(
+            "SELECT job_id FROM jobs ORDER BY created_at, rowid"
+        ).fetchall()
+        return iter([row[0] for row in rows])
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+    def items(self) -> List[tuple]:
+        """All jobs as (job_id, job) pairs in creation order, in one query."""
+        rows = self._connect().execute(
+            "SELECT job_id, status, path, size_kb, worker_pid FROM jobs "
+            "ORDER BY created_at, rowid"
+        ).fetchall()
+        return [(row[0], self._row_to_job(row[1:])) for row in rows]
+
+    def active_jobs(self, worker_pid: Optional[int] = None) -> List[str]:
+        """
+        IDs of jobs that are still being generated.
+
+        Args:
+            worker_pid: Only return jobs owned by this worker process
+
+        Returns:
+            List[str]: Job IDs
+        """
+        placeholders = ", ".join("?" for _ in ACTIVE_STATUSES)
+        query = f"SELECT job_id FROM jobs WHERE status IN ({placeholders})"
+        params = list(ACTIVE_STATUSES)
+        if worker_pid is not None:
+            query += " AND worker_pid = ?"
+            params.append(worker_pid)
+        return [row[0] for row in self._connect().execute(query, params).fetchall()]
+
+    def prune(self, max_age_hours: int = 24) -> int:
+        """
+        Forget jobs that were last updated more than ``max_age_hours`` ago.
+
+        Args:
+            max_age_hours: Maximum age of job records to keep (in hours)
+
+        Returns:
+            int: Number of job records removed
+        """
+        cutoff = time.time() - max_age_hours * 3600
+        cursor = self._connect().execute(
+            "DELETE FROM jobs WHERE updated_at < ?", (cutoff,)
+        )
+        return cursor.rowcount
+
+    def close(self) -> None:
+        """Close this thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,220 @@
+"""Layout metrics per page format, orientation and layout, computed once per process."""
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Tuple
+
+# Portrait page sizes in mm
+PAGE_FORMATS: Dict[str, Tuple[float, float]] = {
+    "A3": (297.0, 420.0),
+    "A4": (210.0, 297.0),
+    "A5": (148.0, 210.0),
+    "Letter": (215.9, 279.4),
+}
+
+# Custom formats are given as "<width>x<height>" in mm
+CUSTOM_FORMAT = re.compile(r"^(\d+(?:\.\d+)?)x(\d+(?:\.\d+)?)$")
+CUSTOM_MIN_MM = 74.0
+CUSTOM_MAX_MM = 1000.0
+
+LAYOUTS = ("grid", "list", "featured")
+
+# Metrics kept per (page size, orientation, layout); custom sizes come from
+# requests, so the cache is bounded rather than growing with every new size
+METRICS_CACHE_SIZE = 256
+
+# Left/right margin of the product area, and the space kept free above the footer
+SIDE_MARGIN = 15.0
+BOTTOM_RESERVE = 20.0
+# Space between neighbouring cards
+CARD_GAP = 5.0
+
+GRID_COLUMNS = 2
+
+# Card heights on A4; other formats scale them by page width
+REFERENCE_WIDTH = PAGE_FORMATS["A4"][0]
+GRID_ROW_HEIGHT = 60.0
+LIST_CARD_HEIGHT = 35.0
+FEATURED_CARD_HEIGHT = 80.0
+
+
+@dataclass(frozen=True)
+class LayoutMetrics:
+    """
+    Precomputed dimensions (mm) for one page format, orientation and layout.
+
+    ``card_*`` is the size of a regular card (grid cell or list row) and
+    ``row_pitch`` the vertical distance between rows. Featured layouts also
+    carry the size of the large first card; their remaining products use the
+    grid values.
+    """
+
+    page_format: str
+    orientation: str
+    layout: str
+    page_width: float
+    page_height: float
+    content_x: float
+    content_width: float
+    content_bottom: float
+    columns: int
+    column_width: float
+    row_pitch: float
+    card_width: float
+    card_height: float
+    featured_width: float = 0.0
+    featured_height: float = 0.0
+    featured_pitch: float = 0.0
+
+
+def page_size(page_format: str) -> Tuple[float, float]:
+    """
+    Portrait width and height of a named or custom page format.
+
+    Args:
+        page_format: One of PAGE_FORMATS (case-insensitive) or "<w>x<h>" in mm
+
+    Returns:
+        Tuple[float, float]: Width and height in mm
+
+    Raises:
+        ValueError: If the format is unknown or a custom size is out of range
+    """
+    for name, size in PAGE_FORMATS.items():
+        if page_format.lower() == name.lower():
+            return size
+
+    match = CUSTOM_FORMAT.match(page_format.strip().lower())
+    if not match:
+        raise ValueError(f"Unknown page format {page_format!r}")
+    width, height = float(match.group(1)), float(match.group(2))
+    for side in (width, height):
+        if not CUSTOM_MIN_MM <= side <= CUSTOM_MAX_MM:
+            raise ValueError(
+                f"Custom page sides must be {CUSTOM_MIN_MM:g}-{CUSTOM_MAX_MM:g} mm, got {side:g}"
+            )
+    # Orientation decides which side is horizontal
+    return min(width, height), max(width, height)
+
+
+def normalize_page_format(page_format: str) -> str:
+    """
+    Canonical spelling of a page format, so equal formats share cache entries.
+
+    Args:
+        page_format: Named or custom page format (see ``page_size``)
+
+    Returns:
+        str: The PAGE_FORMATS key, or "<w>x<h>" for custom formats
+
+    Raises:
+        ValueError: If the format is not valid
+    """
+    page_size(page_format)
+    for name in PAGE_FORMATS:
+        if page_format.lower() == name.lower():
+            return name
+    return page_format.strip().lower()
+
+
+def get_layout_metrics(page_format: str, orientation: str, layout: str) -> LayoutMetrics:
+    """
+    Dimensions for rendering one layout on one page format.
+
+    Equal sizes share one cache entry however they are spelled ("100x200",
+    "100.0x200" and "200x100" are the same page).
+
+    Args:
+        page_format: Named or custom page format (see ``page_size``)
+        orientation: "portrait" or "landscape"
+        layout: "grid", "list" or "featured" (anything else renders as grid)
+
+    Returns:
+        LayoutMetrics: Cached metrics for the combination
+
+    Raises:
+        ValueError: If the page format is not valid
+    """
+    portrait_width, portrait_height = page_size(page_format)
+    if orientation != "landscape":
+        orientation = "portrait"
+    if layout not in LAYOUTS:
+        layout = "grid"
+    return _compute_metrics(portrait_width, portrait_height, orientation, layout)
+
+
+def _format_name(portrait_width: float, portrait_height: float) -> str:
+    for name, size in PAGE_FORMATS.items():
+        if size == (portrait_width, portrait_height):
+            return name
+    return f"{portrait_width:g}x{portrait_height:g}"
+
+
+@lru_cache(maxsize=METRICS_CACHE_SIZE)
+def _compute_metrics(
+    portrait_width: float, portrait_height: float, orientation: str, layout: str
+) -> LayoutMetrics:
+    width, height = portrait_width, portrait_height
+    if orientation == "landscape":
+        width, height = height, width
+    scale = portrait_width / REFERENCE_WIDTH
+
+    content_width = width - 2 * SIDE_MARGIN
+    common = dict(
+        page_format=_format_name(portrait_width, portrait_height),
+        orientation=orientation,
+        layout=layout,
+        page_width=width,
+        page_height=height,
+        content_x=SIDE_MARGIN,
+        content_width=content_width,
+        content_bottom=height - BOTTOM_RESERVE,
+    )
+
+    if layout == "list":
+        card_height = LIST_CARD_HEIGHT * scale
+        return LayoutMetrics(
+            **common,
+            columns=1,
+            column_width=content_width,
+            row_pitch=card_height + CARD_GAP,
+            card_width=content_width,
+            card_height=card_height,
+        )
+
+    column_width = content_width / GRID_COLUMNS
+    row_pitch = GRID_ROW_HEIGHT * scale
+    grid = dict(
+        columns=GRID_COLUMNS,
+        column_width=column_width,
+        row_pitch=row_pitch,
+        card_width=column_width - CARD_GAP,
+        card_height=row_pitch - CARD_GAP,
+    )
+    if layout == "featured":
+        featured_height = FEATURED_CARD_HEIGHT * scale
+        return LayoutMetrics(
+            **common,
+            **grid,
+            featured_width=content_width,
+            featured_height=featured_height,
+            featured_pitch=featured_height + CARD_GAP,
+        )
+    return LayoutMetrics(**common, **grid)
+
+
+def precompute_all() -> int:
+    """
+    Fill the metrics cache for every named format, orientation and layout.
+
+    Returns:
+        int: Number of combinations computed
+    """
+    count = 0
+    for page_format in PAGE_FORMATS:
+        for orientation in ("portrait", "landscape"):
+            for layout in LAYOUTS:
+                get_layout_metrics(page_format, orientation, layout)
+                count += 1
+    return count
@@ -0,0 +1,171 @@
+"""
+Structured logging through a queue, so request threads never format log lines or write them.
+
+Stdout belongs to the control protocol (the ``SERVER_PORT=`` line the Tauri
+side parses); all log output goes to stderr.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+try:
+    from .tracing import current_job_id
+except ImportError:
+    from tracing import current_job_id
+
+# Records waiting for the writer thread; beyond this they are dropped rather
+# than blocking requests on a stalled stderr
+LOG_QUEUE_SIZE = 10000
+
+LOG_FORMATS = ("text", "json")
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message",
+    "asctime",
+    "taskName",
+}
+
+_listener: Optional[QueueListener] = None
+
+# Renders tracebacks at the call site, before the frames they show move on
+_exception_formatter = logging.Formatter()
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    Formats records with their ``extra`` fields, as text or as JSON lines.
+
+    Text: ``2026-01-05 10:00:00,123 - server - INFO - PDF job done job_id=... ms=12.5``
+    JSON: one object per line with ``ts``, ``level``, ``logger``, ``msg`` and the fields.
+    """
+
+    def __init__(self, log_format: str = "text"):
+        super().__init__("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+        self.json = log_format == "json"
+
+    @staticmethod
+    def fields(record: logging.LogRecord) -> dict:
+        return {
+            key: value
+            for key, value in vars(record).items()
+            if key not in _RECORD_ATTRS and not key.startswith("_")
+        }
+
+    def format(self, record: logging.LogRecord) -> str:
+        if not self.json:
+            text = super().format(record)
+            fields = self.fields(record)
+            if fields:
+                text += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+            return text
+
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            **self.fields(record),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Queues records with their message rendered; the listener thread formats and writes them.
+
+    Like ``QueueHandler``, the message (and any traceback) is rendered in the
+    logging thread, against the arguments as they are at the call site. Unlike
+    it, the log line itself is left to the writer's formatter, so ``extra``
+    fields survive to become text or JSON fields. Records get the current job
+    id attached, and are dropped (and counted) when the queue is full.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if "job_id" not in vars(record):
+            job_id = current_job_id()
+            if job_id is not None:
+                record.job_id = job_id
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging(level: Optional[str] = None, log_format: Optional[str] = None) -> None:
+    """
+    Route all logging through a queue to a single stderr writer thread.
+
+    Safe to call again (e.g. with options parsed later); the previous
+    pipeline is flushed and replaced.
+
+    Args:
+        level: Log level name; defaults to ``NSA_LOG_LEVEL`` or INFO
+        log_format: "text" or "json"; defaults to ``NSA_LOG_FORMAT`` or text
+    """
+    global _listener
+
+    level = (level or os.environ.get("NSA_LOG_LEVEL") or "INFO").upper()
+    log_format = log_format or os.environ.get("NSA_LOG_FORMAT") or "text"
+    if log_format not in LOG_FORMATS:
+        raise ValueError(f"Unknown log format {log_format!r}; expected one of {LOG_FORMATS}")
+
+    shutdown_logging()
+
+    log_queue: queue.Queue = queue.Queue(LOG_QUEUE_SIZE)
+    writer = logging.StreamHandler(sys.stderr)
+    writer.setFormatter(StructuredFormatter(log_format))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(DeferredQueueHandler(log_queue))
+    root.setLevel(level)
+
+    _listener = QueueListener(log_queue, writer, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Write out queued records and stop the writer thread."""
+    global _listener
+
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    listener.stop()
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, DeferredQueueHandler) and handler.dropped:
+            sys.stderr.write(
+                f"{time.strftime('%Y-%m-%d %H:%M:%S')} - logging - WARNING - "
+                f"{handler.dropped} log records dropped (queue full)\n"
+            )
+
+
+atexit.register(shutdown_logging)
@@ -1,8 +1,15 @@
 """Pydantic models for API request/response validation."""
 
-from typing import List, Optional
+from typing import Any, Dict, List, Literal, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+try:
+    from .layout_metrics import normalize_page_format
+    from .price_labels import DEFAULT_LOCALE, LOCALES
+except ImportError:
+    from layout_metrics import normalize_page_format
+    from price_labels import DEFAULT_LOCALE, LOCALES
 
 
 class Product(BaseModel):
@@ -13,7 +20,36 @@ class Product(BaseModel):
     price: Optional[float] = Field(None, description="Product price")
     description: Optional[str] = Field(None, description="Product description")
     image_url: Optional[str] = Field(None, description="URL or path to product image")
+    image_id: Optional[str] = Field(
+        None,
+        description="Id of an image uploaded through /api/assets, drawn on the product card",
+        pattern="^[0-9a-f]{64}$",
+    )
     quantity: int = Field(1, ge=1, description="Product quantity")
+    original_price: Optional[float] = Field(
+        None, ge=0, description="Regular price, shown struck through when above the price"
+    )
+    promotion: Optional[Literal["price_cut", "percent_off", "multi_buy"]] = Field(
+        None,
+        description=(
+            "Promotion label: price_cut (old price struck through), percent_off "
+            '(adds "-25%"), or multi_buy ("2 voor", with price covering all items)'
+        ),
+    )
+    promotion_quantity: Optional[int] = Field(
+        None, ge=2, description="Items in a multi_buy deal"
+    )
+
+    @model_validator(mode="after")
+    def _check_promotion(self) -> "Product":
+        if self.promotion in ("price_cut", "percent_off"):
+            if self.price is None or self.original_price is None:
+                raise ValueError(f"{self.promotion} needs both price and original_price")
+            if self.original_price <= self.price:
+                raise ValueError(f"{self.promotion} needs original_price above price")
+        elif self.promotion == "multi_buy" and not self.promotion_quantity:
+            raise ValueError("multi_buy needs promotion_quantity")
+        return self
 
     class Config:
         json_schema_extra = {
@@ -62,6 +98,60 @@ class GeneratePDFRequest(BaseModel):
         description="Page orientation (portrait or landscape)",
         pattern="^(portrait|landscape)$",
     )
+    page_format: str = Field(
+        default="A4",
+        description='Page format: A3, A4, A5, Letter, or custom "<width>x<height>" in mm',
+    )
+    compression: str = Field(
+        default="balanced",
+        description="Output compression level (fast, balanced or max)",
+        pattern="^(fast|balanced|max)$",
+    )
+    linearize: bool = Field(
+        default=False,
+        description="Write linearized (fast web view) PDF so the first page shows early",
+    )
+    low_memory: bool = Field(
+        default=False,
+        description="Spill rendered pages to disk to keep memory bounded for large folders",
+    )
+    max_rss_mb: int = Field(
+        default=512,
+        ge=64,
+        description=(
+            "RSS (MB) above which low-memory mode spills segments early; "
+            "a best-effort heuristic, not a hard limit"
+        ),
+    )
+    formats: List[Literal["pdf", "png", "html"]] = Field(
+        default=["pdf"],
+        min_length=1,
+        description="Output formats, all produced from one layout pass (pdf, png, html)",
+    )
+    png_dpi: int = Field(
+        default=150, ge=36, le=600, description="Resolution of PNG page images"
+    )
+    locale: str = Field(
+        default=DEFAULT_LOCALE,
+        description=f"Locale of prices and promotion labels ({', '.join(LOCALES)})",
+    )
+
+    @field_validator("page_format")
+    @classmethod
+    def _check_page_format(cls, value: str) -> str:
+        return normalize_page_format(value)
+
+    @field_validator("formats")
+    @classmethod
+    def _dedupe_formats(cls, value: List[str]) -> List[str]:
+        return list(dict.fromkeys(value))
+
+    @field_validator("locale")
+    @classmethod
+    def _check_locale(cls, value: str) -> str:
+        if value not in LOCALES:
+            raise ValueError(f"Unknown locale {value!r}; expected one of {', '.join(LOCALES)}")
+        return value
 
     class Config:
         json_schema_extra = {
@@ -84,10 +174,64 @@ class GeneratePDFRequest(BaseModel):
                 "color_mode": "RGB",
                 "dpi": 300,
                 "orientation": "portrait",
+                "page_format": "A4",
+                "compression": "balanced",
+                "linearize": False,
             }
         }
 
 
+class CreateProjectRequest(BaseModel):
+    """Request to create a folder project."""
+
+    name: str = Field(..., min_length=1, max_length=200, description="Project name")
+
+
+class ProjectInfo(BaseModel):
+    """A saved folder project."""
+
+    project_id: str = Field(..., description="Unique project identifier")
+    name: str = Field(..., description="Project name")
+    head_revision: int = Field(..., description="Latest saved revision (0 if never saved)")
+    created_at: float = Field(..., description="Creation time (Unix timestamp)")
+    updated_at: float = Field(..., description="Last save time (Unix timestamp)")
+
+
+class ProjectSnapshot(BaseModel):
+    """Folder content saved by autosave."""
+
+    pages: List[FolderPage] = Field(..., description="Pages of the folder")
+    settings: Dict[str, Any] = Field(
+        default_factory=dict, description="PDF settings kept with the folder"
+    )
+
+
+class SaveProjectResponse(BaseModel):
+    """Response from saving a project snapshot."""
+
+    project_id: str = Field(..., description="Project identifier")
+    revision: int = Field(..., description="Head revision after saving")
+    created: bool = Field(..., description="False if nothing changed since the head revision")
+    objects_written: int = Field(..., description="Number of new pages/products/settings stored")
+
+
+class ProjectRevision(ProjectSnapshot):
+    """A loaded project revision."""
+
+    project_id: str = Field(..., description="Project identifier")
+    name: str = Field(..., description="Project name")
+    revision: int = Field(..., description="Revision number")
+    created_at: float = Field(..., description="Save time (Unix timestamp)")
+
+
+class RevisionInfo(BaseModel):
+    """Summary of one project revision."""
+
+    revision: int = Field(..., description="Revision number")
+    page_count: int = Field(..., description="Number of pages in the revision")
+    created_at: float = Field(..., description="Save time (Unix timestamp)")
+
+
 class GeneratePDFResponse(BaseModel):
     """Response from PDF generation request."""
 
@@ -95,6 +239,30 @@ class GeneratePDFResponse(BaseModel):
     job_id: str = Field(..., description="Unique job identifier")
     message: str = Field(..., description="Status message")
     file_size_kb: Optional[int] = Field(None, description="Size of generated PDF in KB")
+    outputs: List[str] = Field(
+        default_factory=list, description="Download URLs of the generated files"
+    )
+
+
+class AssetResponse(BaseModel):
+    """An uploaded product image."""
+
+    asset_id: str = Field(..., description="Content hash; use as a product's image_id")
+    format: str = Field(..., description="Image format of the upload (JPEG, PNG, ...)")
+    width: int = Field(..., description="Width in pixels, after EXIF orientation")
+    height: int = Field(..., description="Height in pixels, after EXIF orientation")
+    size_bytes: int = Field(..., description="Size of the uploaded file")
+    filename: str = Field(..., description="Name of the uploaded file")
+    created: bool = Field(
+        True, description="False if identical content was stored already"
+    )
+
+
+class SpeculateResponse(BaseModel):
+    """Response from submitting a folder for render-ahead."""
+
+    queued: int = Field(..., description="Pages queued for background rendering")
+    cached: int = Field(..., description="Pages already rendered")
 
 
 class HealthResponse(BaseModel):
@@ -0,0 +1,187 @@
+"""Reusable page templates: static page chrome compiled once into a Form XObject."""
+
+import io
+import logging
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Optional, Sequence, Tuple
+
+from fpdf import FPDF
+
+try:
+    from .layout_metrics import page_size
+except ImportError:
+    from layout_metrics import page_size
+
+try:
+    import pikepdf
+except ImportError:  # without pikepdf, chrome is drawn inline on every page
+    pikepdf = None
+
+logger = logging.getLogger(__name__)
+
+RGB = Tuple[int, int, int]
+Frame = Tuple[float, float, float, float]
+
+# Card frame style, shared by inline drawing and compiled templates
+FRAME_COLOR: RGB = (220, 220, 220)
+FRAME_LINE_WIDTH = 0.3
+
+NAMED_COLORS: Dict[str, RGB] = {
+    "white": (255, 255, 255),
+    "black": (0, 0, 0),
+    "red": (255, 0, 0),
+    "green": (0, 128, 0),
+    "blue": (0, 0, 255),
+    "yellow": (255, 255, 0),
+    "orange": (255, 165, 0),
+    "gray": (128, 128, 128),
+    "grey": (128, 128, 128),
+}
+
+# Compiled templates kept per process; a folder rarely uses more than a handful
+TEMPLATE_CACHE_SIZE = 256
+
+# pikepdf objects are not safe to share between threads while copying
+_stamp_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class PageDesign:
+    """
+    Static chrome of one page: everything that does not depend on product content.
+
+    Pages with equal designs share one compiled template.
+    """
+
+    orientation: str
+    page_format: str = "A4"
+    background: Optional[RGB] = None
+    frames: Tuple[Frame, ...] = ()
+
+    @property
+    def is_empty(self) -> bool:
+        return self.background is None and not self.frames
+
+
+def templates_available() -> bool:
+    """Whether pages can reference compiled templates (requires pikepdf)."""
+    return pikepdf is not None
+
+
+def parse_color(color: Optional[str]) -> Optional[RGB]:
+    """
+    Parse a hex (``#rrggbb`` / ``#rgb``) or named color.
+
+    Args:
+        color: Color string from the request
+
+    Returns:
+        Optional[RGB]: The color, or None if it is missing or not understood
+    """
+    if not color:
+        return None
+    value = color.strip().lower()
+    if value in NAMED_COLORS:
+        return NAMED_COLORS[value]
+    value = value.lstrip("#")
+    if len(value) == 3:
+        value = "".join(c * 2 for c in value)
+    if len(value) != 6:
+        return None
+    try:
+        return tuple(int(value[i:i + 2], 16) for i in (0, 2, 4))
+    except ValueError:
+        return None
+
+
+def draw_chrome(pdf: FPDF, design: PageDesign) -> None:
+    """
+    Draw a page design onto the current page of ``pdf``.
+
+    Used both to compile templates and as the inline fallback, so both paths
+    produce identical output.
+    """
+    if design.background is not None:
+        pdf.set_fill_color(*design.background)
+        pdf.rect(0, 0, pdf.w, pdf.h, "F")
+
+    if design.frames:
+        pdf.set_draw_color(*FRAME_COLOR)
+        pdf.set_line_width(FRAME_LINE_WIDTH)
+        for x, y, width, height in design.frames:
+            pdf.rect(x, y, width, height)
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def compile_template(design: PageDesign):
+    """
+    Render a page design once into a single-page PDF kept open for stamping.
+
+    Args:
+        design: The page design to compile
+
+    Returns:
+        pikepdf.Pdf: One-page document whose page becomes the Form XObject
+    """
+    pdf = FPDF(
+        orientation=design.orientation.upper()[0],
+        unit="mm",
+        format=page_size(design.page_format),
+    )
+    pdf.set_auto_page_break(False)
+    pdf.add_page()
+    draw_chrome(pdf, design)
+    return pikepdf.open(io.BytesIO(bytes(pdf.output())))
+
+
+def stamp_templates(document, designs: Sequence[Optional[PageDesign]]) -> int:
+    """
+    Place each page's compiled template underneath its content.
+
+    Every distinct design is copied into ``document`` once as a Form XObject,
+    together with one tiny content stream that paints it; every page with that
+    design references both objects. Page content streams are not rewritten, so
+    stamping stays cheap for documents streamed from disk.
+
+    Args:
+        document: An open pikepdf.Pdf with one page per entry in ``designs``
+        designs: Design per page (None for pages without chrome)
+
+    Returns:
+        int: Number of distinct templates used
+    """
+    stamps = {}
+    with _stamp_lock:
+        for page, design in zip(document.pages, designs):
+            if design is None or design.is_empty:
+                continue
+            stamp = stamps.get(design)
+            if stamp is None:
+                template = compile_template(design)
+                formx = document.copy_foreign(template.pages[0].as_form_xobject())
+                name = pikepdf.Name(f"/NSATpl{len(stamps)}")
+                underlay = document.make_stream(b"q " + bytes(name.unparse()) + b" Do Q\n")
+                stamp = stamps[design] = (name, formx, underlay)
+            _apply_stamp(page.obj, *stamp)
+
+    if stamps:
+        logger.debug("Stamped %d pages from %d templates", len(designs), len(stamps))
+    return len(stamps)
+
+
+def _apply_stamp(page, name, formx, underlay) -> None:
+    if "/Resources" not in page:
+        page.Resources = pikepdf.Dictionary()
+    if "/XObject" not in page.Resources:
+        page.Resources.XObject = pikepdf.Dictionary()
+    page.Resources.XObject[name] = formx
+
+    contents = page.get("/Contents")
+    if contents is None:
+        page.Contents = underlay
+    elif isinstance(contents, pikepdf.Array):
+        contents.insert(0, underlay)
+    else:
+        page.Contents = pikepdf.Array([underlay, contents])
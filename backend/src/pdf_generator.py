@@ -1,29 +1,172 @@
 """PDF generation using fpdf2 (pure Python, no GTK dependencies)."""
 
+import gc
+import hashlib
+import json
 import logging
+import shutil
+import tempfile
+import time
+from collections import defaultdict
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional
 
 from fpdf import FPDF
-from fpdf.enums import XPos, YPos
 
 try:
-    from .models import GeneratePDFRequest
+    from .folder_layout import (
+        CORE_FONTS_ENCODING,
+        FONT_FAMILY,
+        FOOTER_COLOR,
+        FOOTER_FONT,
+        FOOTER_HEIGHT,
+        FOOTER_OFFSET,
+        FolderLayout,
+        PageLayout,
+        footer_text,
+        layout_folder,
+        layout_page,
+    )
+    from .layout_metrics import LayoutMetrics, get_layout_metrics, page_size
+    from .models import FolderPage, GeneratePDFRequest
+    from .page_templates import (
+        FRAME_COLOR,
+        FRAME_LINE_WIDTH,
+        RGB,
+        Frame,
+        PageDesign,
+        templates_available,
+    )
+    from .pdf_optimizer import (
+        PAGE_NUMBER_ALIAS,
+        OptimizationReport,
+        assemble_segments,
+        compression_level,
+        post_processing_available,
+        write_pdf,
+    )
+    from .price_labels import DEFAULT_LOCALE
+    from .render_cache import RenderCache
+    from .tracing import span
+    from .utils import get_rss_bytes
 except ImportError:
-    from models import GeneratePDFRequest
+    from folder_layout import (
+        CORE_FONTS_ENCODING,
+        FONT_FAMILY,
+        FOOTER_COLOR,
+        FOOTER_FONT,
+        FOOTER_HEIGHT,
+        FOOTER_OFFSET,
+        FolderLayout,
+        PageLayout,
+        footer_text,
+        layout_folder,
+        layout_page,
+    )
+    from layout_metrics import LayoutMetrics, get_layout_metrics, page_size
+    from models import FolderPage, GeneratePDFRequest
+    from page_templates import (
+        FRAME_COLOR,
+        FRAME_LINE_WIDTH,
+        RGB,
+        Frame,
+        PageDesign,
+        templates_available,
+    )
+    from pdf_optimizer import (
+        PAGE_NUMBER_ALIAS,
+        OptimizationReport,
+        assemble_segments,
+        compression_level,
+        post_processing_available,
+        write_pdf,
+    )
+    from price_labels import DEFAULT_LOCALE
+    from render_cache import RenderCache
+    from tracing import span
+    from utils import get_rss_bytes
 
 logger = logging.getLogger(__name__)
 
-# Euro symbol for non-unicode fonts
-EURO = "EUR"
+# Low-memory mode: maximum number of pages held in memory before spilling to disk
+SEGMENT_MAX_PAGES = 50
+# ...and the minimum, even above the RSS ceiling, so a folder never degrades
+# into one file per page
+SEGMENT_MIN_PAGES = 10
 
 
 class FolderPDF(FPDF):
-    """Custom PDF class for offer folders."""
+    """
+    Custom PDF class for offer folders.
+
+    With ``use_templates``, static page chrome (background, card frames) is
+    recorded per page instead of drawn; the output stage then stamps each page
+    with a template compiled once per distinct design.
+    """
 
-    def __init__(self, orientation: str = "portrait"):
-        super().__init__(orientation=orientation.upper()[0], unit="mm", format="A4")
-        self.set_auto_page_break(auto=True, margin=15)
+    def __init__(
+        self,
+        orientation: str = "portrait",
+        use_templates: bool = False,
+        page_offset: Optional[int] = 0,
+        page_format: str = "A4",
+        locale: str = DEFAULT_LOCALE,
+    ):
+        super().__init__(
+            orientation=orientation.upper()[0], unit="mm", format=page_size(page_format)
+        )
+        self.core_fonts_encoding = CORE_FONTS_ENCODING
+        # Pagination is decided by the layout pass
+        self.set_auto_page_break(auto=False)
+        self.orientation_name = orientation
+        self.page_format = page_format
+        self.locale = locale
+        # Pages rendered before this document, when the folder is split into
+        # segments; None if unknown, leaving a page-number alias for assembly
+        self.page_offset = page_offset
+        self.use_templates = use_templates
+        self.page_backgrounds: Dict[int, RGB] = {}
+        self.page_frames: Dict[int, List[Frame]] = defaultdict(list)
+
+    def draw_background(self, rgb: RGB):
+        """Fill the current page with a background color."""
+        if self.use_templates:
+            self.page_backgrounds[self.page] = rgb
+            return
+        self.set_fill_color(*rgb)
+        self.rect(0, 0, self.w, self.h, "F")
+
+    def draw_frame(self, x: float, y: float, width: float, height: float):
+        """Draw a product card frame on the current page."""
+        if self.use_templates:
+            self.page_frames[self.page].append((x, y, width, height))
+            return
+        self.set_draw_color(*FRAME_COLOR)
+        self.set_line_width(FRAME_LINE_WIDTH)
+        self.rect(x, y, width, height)
+
+    def metrics(self, layout: str) -> LayoutMetrics:
+        """Cached dimensions of ``layout`` on this document's format and orientation."""
+        return get_layout_metrics(self.page_format, self.orientation_name, layout)
+
+    def page_designs(self) -> List[Optional[PageDesign]]:
+        """Recorded chrome for every page, in page order (None for bare pages)."""
+        designs = []
+        for page_no in range(1, self.pages_count + 1):
+            background = self.page_backgrounds.get(page_no)
+            frames = tuple(self.page_frames.get(page_no, ()))
+            if background is None and not frames:
+                designs.append(None)
+                continue
+            designs.append(
+                PageDesign(
+                    orientation=self.orientation_name,
+                    page_format=self.page_format,
+                    background=background,
+                    frames=frames,
+                )
+            )
+        return designs
 
     def header(self):
         """Add page header."""
@@ -31,176 +174,322 @@ class FolderPDF(FPDF):
 
     def footer(self):
         """Add page footer with page numbers."""
-        self.set_y(-15)
-        self.set_font("Helvetica", "I", 8)
-        self.set_text_color(128, 128, 128)
-        self.cell(0, 10, f"Pagina {self.page_no()}/{{nb}}", align="C")
-
-
-def generate_pdf(request: GeneratePDFRequest, output_path: Path) -> bool:
+        self.set_y(-FOOTER_OFFSET)
+        self.set_font(FONT_FAMILY, *FOOTER_FONT)
+        self.set_text_color(*FOOTER_COLOR)
+        if self.page_offset is None:
+            number = PAGE_NUMBER_ALIAS.decode()
+        else:
+            number = self.page_offset + self.page_no()
+        self.cell(0, FOOTER_HEIGHT, footer_text(number, "{nb}"), align="C")
+
+
+def generate_pdf(
+    request: GeneratePDFRequest,
+    output_path: Path,
+    render_cache: Optional[RenderCache] = None,
+) -> bool:
     """
     Generate PDF from folder data using fpdf2.
 
     Args:
         request: PDF generation request with folder data
         output_path: Path where the PDF should be saved
+        render_cache: Pre-rendered pages to reuse (see ``generate_pdf_report``)
 
     Returns:
         bool: True if generation succeeded, False otherwise
     """
     try:
-        # Create PDF with correct orientation
-        pdf = FolderPDF(orientation=request.orientation)
-        pdf.alias_nb_pages()
-
-        for page in request.pages:
-            pdf.add_page()
-
-            # Set background color if specified
-            if page.background_color and page.background_color != "#ffffff":
-                _draw_background(pdf, page.background_color)
-
-            # Page title
-            if page.title:
-                pdf.set_font("Helvetica", "B", 24)
-                pdf.set_text_color(0, 0, 0)
-                pdf.cell(0, 15, page.title, new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="L")
-                pdf.ln(5)
-
-            # Render products based on layout
-            if page.layout == "grid":
-                _render_grid_layout(pdf, page.products)
-            elif page.layout == "list":
-                _render_list_layout(pdf, page.products)
-            elif page.layout == "featured":
-                _render_featured_layout(pdf, page.products)
-            else:
-                _render_grid_layout(pdf, page.products)
-
-        # Save PDF
-        pdf.output(str(output_path))
-        logger.info(f"PDF generated successfully: {output_path}")
+        generate_pdf_report(request, output_path, render_cache)
+        logger.info("PDF generated successfully: %s", output_path)
         return True
 
     except Exception as e:
-        logger.error(f"PDF Generation Error: {e}", exc_info=True)
+        logger.error("PDF Generation Error: %s", e, exc_info=True)
         return False
 
 
-def _draw_background(pdf: FPDF, color: str):
-    """Draw background color on current page."""
-    try:
-        # Parse hex color
-        color = color.lstrip("#")
-        r, g, b = tuple(int(color[i:i+2], 16) for i in (0, 2, 4))
+def generate_pdf_report(
+    request: GeneratePDFRequest,
+    output_path: Path,
+    render_cache: Optional[RenderCache] = None,
+) -> OptimizationReport:
+    """
+    Generate PDF from folder data and report output size and timings.
 
-        pdf.set_fill_color(r, g, b)
-        pdf.rect(0, 0, pdf.w, pdf.h, "F")
-    except Exception as e:
-        logger.warning(f"Could not draw background: {e}")
+    Args:
+        request: PDF generation request with folder data
+        output_path: Path where the PDF should be saved
+        render_cache: If given and most pages were already rendered
+            speculatively, the folder is assembled from cached per-page fragments
+
+    Returns:
+        OptimizationReport: Size and time figures for the written PDF
+
+    Raises:
+        Exception: Any rendering or output error
+    """
+    if request.low_memory:
+        if post_processing_available():
+            return _generate_segmented(request, output_path)
+        logger.warning("Low-memory mode needs pikepdf; rendering in memory instead")
+    elif render_cache is not None and post_processing_available():
+        keys = [fragment_key(page, request) for page in request.pages]
+        # Assembling from fragments only pays off once most pages are pre-rendered
+        cached = sum(1 for key in keys if render_cache.contains(key))
+        if cached * 2 >= len(keys):
+            return _generate_from_fragments(request, output_path, render_cache, keys)
+
+    start = time.perf_counter()
+    with span("layout", pages=len(request.pages)):
+        layout = layout_folder(request)
+    layout_seconds = time.perf_counter() - start
+
+    # Draw and save through the optimization stage (compression, dedup, linearization)
+    report = render_layout_pdf(layout, request, output_path)
+    report.render_seconds += layout_seconds
+    return report
+
+
+def _generate_segmented(request: GeneratePDFRequest, output_path: Path) -> OptimizationReport:
+    """
+    Render in segments spilled to disk, keeping rendering memory flat for large folders.
+
+    Completed pages are written to a segment file every SEGMENT_MAX_PAGES pages,
+    or earlier (but not before SEGMENT_MIN_PAGES) once the process RSS passes
+    ``request.max_rss_mb``. The segments are then streamed into the final PDF.
 
+    ``max_rss_mb`` is a best-effort heuristic for segment size, not a limit:
+    it only decides when the next segment is spilled. Memory used by other
+    requests, and by pikepdf while assembling the final file, is not bounded
+    by it.
+    """
+    start = time.perf_counter()
+    max_rss = request.max_rss_mb * 1024 * 1024
+    use_templates = templates_available()
+    segment_paths: List[Path] = []
+    designs: List[Optional[PageDesign]] = []
+    pages_done = 0
+    warned = False
+
+    def flush(pdf: FolderPDF) -> int:
+        segment_path = Path(spill_dir) / f"segment-{len(segment_paths):05d}.pdf"
+        with compression_level(request.compression):
+            pdf.output(str(segment_path))
+        segment_paths.append(segment_path)
+        if use_templates:
+            designs.extend(pdf.page_designs())
+        return pdf.pages_count
+
+    with tempfile.TemporaryDirectory(prefix="segments-", dir=output_path.parent) as spill_dir:
+        with span("render", mode="segmented"):
+            pdf = None
+            for page in request.pages:
+                if pdf is None:
+                    pdf = _segment_pdf(request, use_templates, pages_done)
+                _render_page(pdf, page)
+
+                over_ceiling = pdf.pages_count >= SEGMENT_MIN_PAGES and get_rss_bytes() > max_rss
+                if pdf.pages_count >= SEGMENT_MAX_PAGES or over_ceiling:
+                    pages_done += flush(pdf)
+                    pdf = None
+                    gc.collect()
+                    if over_ceiling and not warned and get_rss_bytes() > max_rss:
+                        logger.warning(
+                            "RSS stays above %d MB after spilling; spilling every %d pages",
+                            request.max_rss_mb,
+                            SEGMENT_MIN_PAGES,
+                        )
+                        warned = True
+
+            if pdf is not None or not segment_paths:
+                pages_done += flush(pdf or _segment_pdf(request, use_templates, pages_done))
+                pdf = None
+
+        render_seconds = time.perf_counter() - start
+        logger.info("Rendered %d pages in %d segments", pages_done, len(segment_paths))
+
+        with span("write", pages=pages_done):
+            return assemble_segments(
+                segment_paths,
+                output_path,
+                total_pages=pages_done,
+                compression=request.compression,
+                linearize=request.linearize,
+                page_designs=designs if use_templates else None,
+                render_seconds=render_seconds,
+            )
+
+
+def fragment_key(page: FolderPage, request: GeneratePDFRequest) -> str:
+    """
+    Cache key of one rendered folder page.
+
+    Covers the page content and every request option that changes how the page
+    renders, but not its position in the folder (``page_number`` is not drawn).
+    """
+    options = {
+        "page": page.model_dump(exclude={"page_number"}),
+        "orientation": request.orientation,
+        "page_format": request.page_format,
+        "locale": request.locale,
+        "compression": request.compression,
+        "templates": templates_available(),
+    }
+    data = json.dumps(options, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def render_fragment(
+    page: FolderPage, request: GeneratePDFRequest, fragment_path: Path
+) -> List[Optional[PageDesign]]:
+    """
+    Render one folder page into its own PDF, independent of its position.
 
-def _render_grid_layout(pdf: FPDF, products):
-    """Render products in a grid layout (2 columns)."""
-    if not products:
-        return
-
-    cols = 2
-    col_width = (pdf.w - 30) / cols  # 15mm margin each side
-    row_height = 60
-
-    start_x = 15
-    start_y = pdf.get_y()
-
-    for i, product in enumerate(products):
-        col = i % cols
-        row = i // cols
-
-        x = start_x + (col * col_width)
-        y = start_y + (row * row_height)
-
-        # Check if we need a new page
-        if y + row_height > pdf.h - 20:
-            pdf.add_page()
-            start_y = pdf.get_y()
-            y = start_y + ((i // cols - (i // cols)) * row_height)
-
-        _render_product_card(pdf, product, x, y, col_width - 5, row_height - 5)
-
-
-def _render_list_layout(pdf: FPDF, products):
-    """Render products in a list layout (full width)."""
-    if not products:
-        return
-
-    card_width = pdf.w - 30
-    card_height = 35
-
-    for product in products:
-        # Check if we need a new page
-        if pdf.get_y() + card_height > pdf.h - 20:
-            pdf.add_page()
-
-        _render_product_card(pdf, product, 15, pdf.get_y(), card_width, card_height)
-        pdf.ln(card_height + 5)
-
-
-def _render_featured_layout(pdf: FPDF, products):
-    """Render products in featured layout (first product large, rest in grid)."""
-    if not products:
-        return
-
-    # First product - featured (large)
-    if len(products) >= 1:
-        featured = products[0]
-        _render_product_card(pdf, featured, 15, pdf.get_y(), pdf.w - 30, 80)
-        pdf.ln(85)
-
-    # Rest in grid
-    if len(products) > 1:
-        _render_grid_layout(pdf, products[1:])
-
-
-def _render_product_card(pdf: FPDF, product, x: float, y: float, width: float, height: float):
-    """Render a single product card."""
-    # Card border
-    pdf.set_draw_color(220, 220, 220)
-    pdf.set_line_width(0.3)
-    pdf.rect(x, y, width, height)
-
-    # Product name
-    pdf.set_xy(x + 3, y + 3)
-    pdf.set_font("Helvetica", "B", 12)
-    pdf.set_text_color(0, 0, 0)
-
-    # Truncate name if too long
-    name = product.name
-    if len(name) > 30:
-        name = name[:27] + "..."
-    pdf.cell(width - 6, 8, name, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
-
-    # Product description
-    if product.description:
-        pdf.set_xy(x + 3, y + 12)
-        pdf.set_font("Helvetica", "", 9)
-        pdf.set_text_color(100, 100, 100)
-
-        # Truncate description
-        desc = product.description
-        if len(desc) > 60:
-            desc = desc[:57] + "..."
-        pdf.multi_cell(width - 6, 5, desc)
-
-    # Price (use EUR instead of € for font compatibility)
-    if product.price:
-        pdf.set_xy(x + 3, y + height - 12)
-        pdf.set_font("Helvetica", "B", 11)
-        pdf.set_text_color(0, 102, 204)
-        pdf.cell(width - 6, 8, f"{EURO} {product.price:.2f}")
-
-    # Quantity if > 1
-    if product.quantity > 1:
-        pdf.set_xy(x + width - 25, y + height - 12)
-        pdf.set_font("Helvetica", "", 9)
-        pdf.set_text_color(150, 150, 150)
-        pdf.cell(22, 8, f"x{product.quantity}", align="R")
+    Page number and total are left as aliases, resolved when fragments are
+    assembled into a folder.
+
+    Args:
+        page: The folder page
+        request: Request whose rendering options apply
+        fragment_path: Where to write the fragment
+
+    Returns:
+        List[Optional[PageDesign]]: Design per rendered page (None if no chrome
+        or when templates are unavailable)
+    """
+    pdf = _segment_pdf(request, templates_available(), page_offset=None)
+    _render_page(pdf, page)
+    with compression_level(request.compression):
+        pdf.output(str(fragment_path))
+    if pdf.use_templates:
+        return pdf.page_designs()
+    return [None] * pdf.pages_count
+
+
+def _generate_from_fragments(
+    request: GeneratePDFRequest, output_path: Path, render_cache: RenderCache, keys: List[str]
+) -> OptimizationReport:
+    """Assemble the folder from cached page renders, rendering missing pages now."""
+    start = time.perf_counter()
+    use_templates = templates_available()
+    hits = 0
+
+    with tempfile.TemporaryDirectory(prefix="fragments-", dir=output_path.parent) as work_dir:
+        segment_paths: List[Path] = []
+        designs: List[Optional[PageDesign]] = []
+        with span("render", mode="fragments"):
+            for index, (page, key) in enumerate(zip(request.pages, keys)):
+                segment_path = Path(work_dir) / f"page-{index:05d}.pdf"
+                fragment = render_cache.lookup(key)
+                try:
+                    if fragment is None:
+                        raise FileNotFoundError(key)
+                    # Assembly resolves aliases in place, so work on a copy
+                    shutil.copyfile(fragment[0], segment_path)
+                    hits += 1
+                except FileNotFoundError:  # Not rendered yet, or just pruned
+                    fragment = render_cache.store(
+                        key, lambda path: render_fragment(page, request, path)
+                    )
+                    shutil.copyfile(fragment[0], segment_path)
+                segment_paths.append(segment_path)
+                designs.extend(fragment[1])
+
+        render_seconds = time.perf_counter() - start
+        logger.info(
+            "Assembling %d pages from %d fragments (%d pre-rendered)",
+            len(designs),
+            len(segment_paths),
+            hits,
+        )
+        with span("write", pages=len(designs)):
+            return assemble_segments(
+                segment_paths,
+                output_path,
+                total_pages=len(designs),
+                compression=request.compression,
+                linearize=request.linearize,
+                page_designs=designs if use_templates else None,
+                render_seconds=render_seconds,
+            )
+
+
+def _segment_pdf(
+    request: GeneratePDFRequest, use_templates: bool, page_offset: Optional[int]
+) -> FolderPDF:
+    pdf = FolderPDF(
+        orientation=request.orientation,
+        use_templates=use_templates,
+        page_offset=page_offset,
+        page_format=request.page_format,
+        locale=request.locale,
+    )
+    # Leave "{nb}" in place: only the assembly step knows the total page count
+    pdf.str_alias_nb_pages = None
+    return pdf
+
+
+def _render_page(pdf: FolderPDF, page):
+    """Render one folder page (and any overflow pages it needs)."""
+    for laid_out in layout_page(page, pdf.page_format, pdf.orientation_name, pdf.locale):
+        draw_page_layout(pdf, laid_out)
+
+
+def draw_page_layout(pdf: FolderPDF, page: PageLayout):
+    """Draw one laid-out page as a new PDF page."""
+    pdf.add_page()
+
+    if page.background is not None:
+        pdf.draw_background(page.background)
+
+    for card in page.cards:
+        pdf.draw_frame(*card.frame)
+
+    # fpdf2 embeds each distinct image file once per document
+    for image in page.images:
+        pdf.image(image.path, image.x, image.y, image.width, image.height)
+
+    for run in page.texts:
+        pdf.set_font(FONT_FAMILY, run.style, run.size)
+        pdf.set_text_color(*run.color)
+        pdf.set_xy(run.x, run.y)
+        pdf.cell(run.width, run.height, run.text, align=run.align)
+
+
+def render_layout_pdf(
+    layout: FolderLayout, request: GeneratePDFRequest, output_path: Path
+) -> OptimizationReport:
+    """
+    Write an already laid-out folder as PDF.
+
+    Args:
+        layout: Result of the layout pass
+        request: Request whose output options apply
+        output_path: Path where the PDF should be saved
+
+    Returns:
+        OptimizationReport: Size and time figures for the written PDF
+    """
+    start = time.perf_counter()
+    with span("render", format="pdf", pages=len(layout.pages)):
+        pdf = FolderPDF(
+            orientation=layout.orientation,
+            use_templates=templates_available(),
+            page_format=layout.page_format,
+        )
+        for page in layout.pages:
+            draw_page_layout(pdf, page)
+    draw_seconds = time.perf_counter() - start
+
+    with span("write", format="pdf"):
+        report = write_pdf(
+            pdf,
+            output_path,
+            compression=request.compression,
+            linearize=request.linearize,
+            page_designs=pdf.page_designs() if pdf.use_templates else None,
+        )
+    report.render_seconds += draw_seconds
+    return report
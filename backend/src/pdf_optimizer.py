@@ -0,0 +1,459 @@
+"""PDF output stage: stream compression levels, resource deduplication and linearization."""
+
+import hashlib
+import io
+import logging
+import tempfile
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from fpdf import syntax as fpdf_syntax
+
+try:
+    import pikepdf
+except ImportError:  # post-processing is optional; fpdf2 output is used as-is
+    pikepdf = None
+
+try:
+    from .page_templates import PageDesign, stamp_templates
+except ImportError:
+    from page_templates import PageDesign, stamp_templates
+
+logger = logging.getLogger(__name__)
+
+# zlib level used for content and image streams per compression setting
+COMPRESSION_LEVELS = {
+    "fast": 1,
+    "balanced": 6,
+    "max": 9,
+}
+
+DEFAULT_COMPRESSION = "balanced"
+
+# fpdf2's default total-pages alias, left unresolved in separately rendered segments
+TOTAL_PAGES_ALIAS = b"{nb}"
+# Page-number alias written by pages rendered before their position is known
+PAGE_NUMBER_ALIAS = b"{pn}"
+
+# Most segment files open at once while assembling. pikepdf copies a source's
+# streams only when the merged file is saved, so sources stay open until then;
+# more segments are first merged in batches of this size into intermediate files
+MERGE_BATCH_SIZE = 64
+
+# Resource categories whose entries are shared between pages
+_SHARED_RESOURCE_KEYS = ("/Font", "/XObject", "/ExtGState", "/ColorSpace", "/Pattern", "/Shading")
+
+# fpdf2 and pikepdf read their zlib levels from process-wide globals, so fpdf2
+# outputs and pikepdf saves are serialized
+_compression_lock = threading.RLock()
+
+# pikepdf's flate level as last set here (pikepdf has no getter; -1 is its default)
+_pikepdf_flate_level = -1
+
+
+@dataclass
+class OptimizationReport:
+    """Size and timing figures for one PDF output."""
+
+    compression: str
+    linearized: bool
+    raw_size: int
+    final_size: int
+    objects_deduplicated: int
+    render_seconds: float
+    optimize_seconds: float
+
+    @property
+    def saved_percent(self) -> float:
+        if not self.raw_size:
+            return 0.0
+        return 100.0 * (self.raw_size - self.final_size) / self.raw_size
+
+
+def post_processing_available() -> bool:
+    """Whether deduplication and linearization are available (requires pikepdf)."""
+    return pikepdf is not None
+
+
+@contextmanager
+def compression_level(compression: str):
+    """
+    Temporarily set the zlib level fpdf2 uses for content streams while writing.
+
+    Images are compressed when ``pdf.image()`` embeds them, not on output, so
+    they keep fpdf2's default level; "max" recompresses them when saving.
+
+    Args:
+        compression: One of COMPRESSION_LEVELS
+    """
+    level = COMPRESSION_LEVELS[compression]
+    with _compression_lock:
+        previous_level = fpdf_syntax.PDFContentStream._COMPRESSION_LEVEL
+        fpdf_syntax.PDFContentStream._COMPRESSION_LEVEL = level
+        try:
+            yield
+        finally:
+            fpdf_syntax.PDFContentStream._COMPRESSION_LEVEL = previous_level
+
+
+def write_pdf(
+    pdf,
+    output_path: Path,
+    compression: str = DEFAULT_COMPRESSION,
+    linearize: bool = False,
+    page_designs: Optional[Sequence[Optional[PageDesign]]] = None,
+) -> OptimizationReport:
+    """
+    Serialize an FPDF document and run the optimization stage.
+
+    "fast" writes content streams with the quickest zlib level and, unless page
+    templates are stamped or the output is linearized, saves fpdf2's output as-is.
+    "balanced" and "max" pass through pikepdf; "max" also packs objects into
+    compressed object streams and recompresses every stream at the highest
+    level. ``linearize`` produces "fast web view" output so viewers can show the
+    first page before the whole file has arrived.
+
+    Args:
+        pdf: The FPDF document to write
+        output_path: Where to write the final PDF
+        compression: One of COMPRESSION_LEVELS
+        linearize: Whether to linearize the output
+        page_designs: Page templates to stamp under each page's content
+
+    Returns:
+        OptimizationReport: Size and time figures for this output
+    """
+    start = time.perf_counter()
+    with compression_level(compression):
+        raw = bytes(pdf.output())
+    render_seconds = time.perf_counter() - start
+
+    return optimize_pdf_bytes(
+        raw,
+        output_path,
+        compression=compression,
+        linearize=linearize,
+        page_designs=page_designs,
+        render_seconds=render_seconds,
+    )
+
+
+def optimize_pdf_bytes(
+    raw: bytes,
+    output_path: Path,
+    compression: str = DEFAULT_COMPRESSION,
+    linearize: bool = False,
+    page_designs: Optional[Sequence[Optional[PageDesign]]] = None,
+    render_seconds: float = 0.0,
+) -> OptimizationReport:
+    """
+    Optimize an already serialized PDF and write it to ``output_path``.
+
+    Args:
+        raw: The PDF as produced by the renderer
+        output_path: Where to write the final PDF
+        compression: One of COMPRESSION_LEVELS
+        linearize: Whether to linearize the output
+        page_designs: Page templates to stamp under each page's content
+        render_seconds: Time spent producing ``raw``, copied into the report
+
+    Returns:
+        OptimizationReport: Size and time figures for this output
+    """
+    start = time.perf_counter()
+    deduplicated = 0
+    needs_post_processing = compression != "fast" or linearize or bool(page_designs)
+
+    if needs_post_processing and pikepdf is None:
+        if linearize:
+            logger.warning("Linearization requested but pikepdf is not installed")
+        needs_post_processing = False
+
+    if needs_post_processing:
+        with pikepdf.open(io.BytesIO(raw)) as document:
+            if page_designs:
+                stamp_templates(document, page_designs)
+            deduplicated = deduplicate_resources(document)
+            _save_optimized(document, output_path, compression, linearize)
+    else:
+        Path(output_path).write_bytes(raw)
+
+    return _report(
+        compression,
+        linearize and pikepdf is not None,
+        raw_size=len(raw),
+        output_path=output_path,
+        deduplicated=deduplicated,
+        render_seconds=render_seconds,
+        optimize_seconds=time.perf_counter() - start,
+    )
+
+
+def assemble_segments(
+    segment_paths: Sequence[Path],
+    output_path: Path,
+    total_pages: int,
+    compression: str = DEFAULT_COMPRESSION,
+    linearize: bool = False,
+    page_designs: Optional[Sequence[Optional[PageDesign]]] = None,
+    render_seconds: float = 0.0,
+) -> OptimizationReport:
+    """
+    Join separately rendered PDF segments into one optimized PDF.
+
+    Segments are opened lazily from disk, so page content is streamed into the
+    output instead of being held in memory; no more than MERGE_BATCH_SIZE files
+    are open at once. The ``{nb}`` total-pages alias, which a segment cannot
+    resolve on its own, is replaced with ``total_pages`` and the ``{pn}``
+    page-number alias with each page's position in the output.
+    Segment files are modified in place.
+    Resources repeated in every segment (fonts, templates) are deduplicated.
+
+    Args:
+        segment_paths: Segment files in page order
+        output_path: Where to write the final PDF
+        total_pages: Page count of the assembled document
+        compression: One of COMPRESSION_LEVELS
+        linearize: Whether to linearize the output
+        page_designs: Page templates to stamp under each page's content
+        render_seconds: Time spent rendering the segments, copied into the report
+
+    Returns:
+        OptimizationReport: Size and time figures for this output
+    """
+    start = time.perf_counter()
+
+    # Resolve aliases one segment at a time, so no more than a segment is in memory
+    first_page = 1
+    for segment_path in segment_paths:
+        first_page += _resolve_page_aliases(segment_path, first_page, total_pages)
+
+    with tempfile.TemporaryDirectory(prefix="merge-", dir=Path(output_path).parent) as merge_dir:
+        sources, deduplicated = _merge_in_batches(segment_paths, Path(merge_dir))
+        with ExitStack() as stack:
+            document = stack.enter_context(pikepdf.new())
+            for source in sources:
+                document.pages.extend(stack.enter_context(pikepdf.open(source)).pages)
+
+            if page_designs:
+                stamp_templates(document, page_designs)
+            deduplicated += deduplicate_resources(document)
+            _save_optimized(document, output_path, compression, linearize)
+
+    return _report(
+        compression,
+        linearize,
+        raw_size=sum(Path(p).stat().st_size for p in segment_paths),
+        output_path=output_path,
+        deduplicated=deduplicated,
+        render_seconds=render_seconds,
+        optimize_seconds=time.perf_counter() - start,
+    )
+
+
+def _merge_in_batches(segment_paths: Sequence[Path], work_dir: Path) -> Tuple[List[Path], int]:
+    """
+    Merge segments, MERGE_BATCH_SIZE at a time, until at most that many files remain.
+
+    Each batch is saved to ``work_dir`` and its sources closed before the next
+    batch is opened. Intermediate files of a finished round are deleted.
+
+    Returns:
+        Tuple[List[Path], int]: Files to assemble in page order, and the number
+        of resource references deduplicated while merging
+    """
+    paths = [Path(path) for path in segment_paths]
+    deduplicated = 0
+    round_number = 0
+    while len(paths) > MERGE_BATCH_SIZE:
+        merged = []
+        for start in range(0, len(paths), MERGE_BATCH_SIZE):
+            merged_path = work_dir / f"merged-{round_number}-{len(merged):05d}.pdf"
+            with ExitStack() as stack:
+                document = stack.enter_context(pikepdf.new())
+                for path in paths[start:start + MERGE_BATCH_SIZE]:
+                    document.pages.extend(stack.enter_context(pikepdf.open(path)).pages)
+                deduplicated += deduplicate_resources(document)
+                document.save(merged_path)
+            merged.append(merged_path)
+        for path in paths:
+            if path.parent == work_dir:
+                path.unlink()
+        paths = merged
+        round_number += 1
+    return paths, deduplicated
+
+
+def _resolve_page_aliases(segment_path: Path, first_page: int, total_pages: int) -> int:
+    """
+    Replace the page-number and total-pages aliases in a segment file, in place.
+
+    Returns:
+        int: Number of pages in the segment
+    """
+    total = str(total_pages).encode()
+    with pikepdf.open(segment_path, allow_overwriting_input=True) as segment:
+        changed = False
+        for index, page in enumerate(segment.pages):
+            if isinstance(page.obj.Contents, pikepdf.Array):
+                page.contents_coalesce()
+            content = page.obj.Contents.read_bytes()
+            if TOTAL_PAGES_ALIAS in content or PAGE_NUMBER_ALIAS in content:
+                number = str(first_page + index).encode()
+                content = content.replace(TOTAL_PAGES_ALIAS, total)
+                page.obj.Contents.write(content.replace(PAGE_NUMBER_ALIAS, number))
+                changed = True
+        if changed:
+            segment.save(segment_path)
+        return len(segment.pages)
+
+
+def _report(
+    compression: str,
+    linearized: bool,
+    raw_size: int,
+    output_path: Path,
+    deduplicated: int,
+    render_seconds: float,
+    optimize_seconds: float,
+) -> OptimizationReport:
+    report = OptimizationReport(
+        compression=compression,
+        linearized=linearized,
+        raw_size=raw_size,
+        final_size=Path(output_path).stat().st_size,
+        objects_deduplicated=deduplicated,
+        render_seconds=render_seconds,
+        optimize_seconds=optimize_seconds,
+    )
+    logger.info(
+        "PDF output (%s%s): %d -> %d bytes (%.1f%% saved, %d objects deduplicated), "
+        "render %.3fs, optimize %.3fs",
+        report.compression,
+        ", linearized" if report.linearized else "",
+        report.raw_size,
+        report.final_size,
+        report.saved_percent,
+        report.objects_deduplicated,
+        report.render_seconds,
+        report.optimize_seconds,
+    )
+    return report
+
+
+def _set_pikepdf_flate_level(level: int) -> None:
+    global _pikepdf_flate_level
+    pikepdf.settings.set_flate_compression_level(level)
+    _pikepdf_flate_level = level
+
+
+def _save_optimized(document, output_path: Path, compression: str, linearize: bool) -> None:
+    # Every save compresses new streams at pikepdf's global level, so none may
+    # run while a "max" save has raised it
+    with _compression_lock:
+        if compression != "max":
+            document.save(
+                output_path,
+                compress_streams=True,
+                object_stream_mode=pikepdf.ObjectStreamMode.preserve,
+                linearize=linearize,
+            )
+            return
+
+        previous_level = _pikepdf_flate_level
+        _set_pikepdf_flate_level(COMPRESSION_LEVELS["max"])
+        try:
+            document.save(
+                output_path,
+                compress_streams=True,
+                object_stream_mode=pikepdf.ObjectStreamMode.generate,
+                recompress_flate=True,
+                linearize=linearize,
+            )
+        finally:
+            _set_pikepdf_flate_level(previous_level)
+
+
+def deduplicate_resources(document) -> int:
+    """
+    Point identical page resources (fonts, images, graphic states, ...) at one object.
+
+    Objects are compared by content, including the content of everything they
+    reference, so a font embedded once per page or per render segment collapses
+    to a single copy. Unreferenced duplicates are dropped when the file is saved.
+
+    Args:
+        document: An open pikepdf.Pdf
+
+    Returns:
+        int: Number of resource references that were redirected
+    """
+    fingerprints: Dict[tuple, bytes] = {}
+    canonical: Dict[bytes, object] = {}
+    redirected = 0
+
+    for page in document.pages:
+        resources = page.obj.get("/Resources")
+        if resources is None:
+            continue
+        for category in _SHARED_RESOURCE_KEYS:
+            entries = resources.get(category)
+            if not isinstance(entries, pikepdf.Dictionary):
+                continue
+            for name in list(entries.keys()):
+                obj = entries[name]
+                if not obj.is_indirect:
+                    continue
+                digest = _fingerprint(obj, fingerprints, set())
+                first = canonical.setdefault(digest, obj)
+                if first.objgen != obj.objgen:
+                    entries[name] = first
+                    redirected += 1
+    return redirected
+
+
+def _fingerprint(obj, memo: Dict[tuple, bytes], in_progress: set) -> bytes:
+    """Content hash of a PDF object and everything it references."""
+    if not isinstance(obj, pikepdf.Object):
+        # pikepdf hands out numbers and booleans as plain Python values
+        return f"{type(obj).__name__}:{obj!r}".encode()
+    if obj.is_indirect:
+        key = obj.objgen
+        if key in memo:
+            return memo[key]
+        if key in in_progress:
+            # Reference cycle: fall back to identity for the back edge
+            return f"ref:{key}".encode()
+        in_progress.add(key)
+
+    digest = hashlib.sha1()
+    if isinstance(obj, pikepdf.Stream):
+        digest.update(b"stream")
+        digest.update(obj.read_raw_bytes())
+        items = ((k, v) for k, v in obj.stream_dict.items() if k != "/Length")
+        _hash_items(digest, items, memo, in_progress)
+    elif isinstance(obj, pikepdf.Dictionary):
+        digest.update(b"dict")
+        _hash_items(digest, obj.items(), memo, in_progress)
+    elif isinstance(obj, pikepdf.Array):
+        digest.update(b"array")
+        for item in obj:
+            digest.update(_fingerprint(item, memo, in_progress))
+    else:
+        digest.update(obj.unparse())
+
+    result = digest.digest()
+    if obj.is_indirect:
+        in_progress.discard(obj.objgen)
+        memo[obj.objgen] = result
+    return result
+
+
+def _hash_items(digest, items, memo: Dict[tuple, bytes], in_progress: set) -> None:
+    for key, value in sorted(items, key=lambda item: str(item[0])):
+        digest.update(str(key).encode())
+        digest.update(_fingerprint(value, memo, in_progress))
@@ -0,0 +1,133 @@
+"""
+Price and promotion label formatting per locale ("€ 9,99", "2 voor", "-25%").
+
+Locale rules are compiled once at import into a prefix/suffix and a separator
+translation table, so formatting an amount is one ``format()`` and one
+``str.translate()``. Labels are cached per (price, promotion, locale): a
+folder repeats a handful of distinct prices across thousands of products.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional, Tuple
+
+DEFAULT_LOCALE = "nl_NL"
+
+# Distinct labels kept formatted; far more than the distinct prices of any folder
+LABEL_CACHE_SIZE = 65536
+
+PROMOTIONS = ("price_cut", "percent_off", "multi_buy")
+
+
+@dataclass(frozen=True)
+class LocaleRules:
+    """How one locale writes euro amounts and promotions."""
+
+    decimal: str
+    group: str
+    price_pattern: str
+    multi_buy_pattern: str
+    percent_off_pattern: str
+
+
+LOCALES: Dict[str, LocaleRules] = {
+    "nl_NL": LocaleRules(",", ".", "€ {amount}", "{quantity} voor", "-{percent}%"),
+    "nl_BE": LocaleRules(",", ".", "€ {amount}", "{quantity} voor", "-{percent}%"),
+    "de_DE": LocaleRules(",", ".", "{amount} €", "{quantity} für", "-{percent} %"),
+    "en_IE": LocaleRules(".", ",", "€{amount}", "{quantity} for", "-{percent}%"),
+}
+
+
+class _CompiledLocale:
+    """Locale rules reduced to string operations."""
+
+    __slots__ = ("prefix", "suffix", "separators", "rules")
+
+    def __init__(self, rules: LocaleRules):
+        self.rules = rules
+        self.prefix, _, self.suffix = rules.price_pattern.partition("{amount}")
+        # format(..., ",.2f") writes "1,234.50"; swap in the locale's separators
+        self.separators = str.maketrans({",": rules.group, ".": rules.decimal})
+
+    def amount(self, value: float) -> str:
+        return self.prefix + format(value, ",.2f").translate(self.separators) + self.suffix
+
+
+_COMPILED = {code: _CompiledLocale(rules) for code, rules in LOCALES.items()}
+
+
+class LabelSegment(NamedTuple):
+    """One piece of a price label: ``kind`` is "price", "original" or "badge"."""
+
+    kind: str
+    text: str
+
+
+def _compiled(locale: str) -> _CompiledLocale:
+    try:
+        return _COMPILED[locale]
+    except KeyError:
+        raise ValueError(
+            f"Unknown locale {locale!r}; expected one of {', '.join(LOCALES)}"
+        ) from None
+
+
+@lru_cache(maxsize=LABEL_CACHE_SIZE)
+def format_price(amount: float, locale: str = DEFAULT_LOCALE) -> str:
+    """
+    Format a euro amount the way ``locale`` writes prices.
+
+    Args:
+        amount: Amount in euros
+        locale: Locale code (see ``LOCALES``)
+
+    Returns:
+        str: E.g. "€ 1.234,50" for nl_NL
+
+    Raises:
+        ValueError: If the locale is unknown
+    """
+    return _compiled(locale).amount(amount)
+
+
+@lru_cache(maxsize=LABEL_CACHE_SIZE)
+def price_label(
+    price: float,
+    original_price: Optional[float] = None,
+    promotion: Optional[str] = None,
+    promotion_quantity: Optional[int] = None,
+    locale: str = DEFAULT_LOCALE,
+) -> Tuple[LabelSegment, ...]:
+    """
+    Texts of one product's price label, in reading order.
+
+    A multi-buy deal reads "2 voor € 5,00" (``price`` is for all items). An
+    original price above ``price`` follows it, to be struck through; a
+    percentage promotion ends the label with its discount ("-25%").
+
+    Args:
+        price: Selling price
+        original_price: Regular price, if the product is discounted
+        promotion: One of ``PROMOTIONS``, or None
+        promotion_quantity: Items in a multi-buy deal
+        locale: Locale code (see ``LOCALES``)
+
+    Returns:
+        Tuple[LabelSegment, ...]: Badge, price and original-price segments
+
+    Raises:
+        ValueError: If the locale is unknown
+    """
+    compiled = _compiled(locale)
+    segments = []
+    if promotion == "multi_buy" and promotion_quantity:
+        text = compiled.rules.multi_buy_pattern.format(quantity=promotion_quantity)
+        segments.append(LabelSegment("badge", text))
+    segments.append(LabelSegment("price", format_price(price, locale)))
+    if original_price is not None and original_price > price:
+        segments.append(LabelSegment("original", format_price(original_price, locale)))
+        if promotion == "percent_off":
+            percent = round((1 - price / original_price) * 100)
+            text = compiled.rules.percent_off_pattern.format(percent=percent)
+            segments.append(LabelSegment("badge", text))
+    return tuple(segments)
@@ -0,0 +1,359 @@
+"""Folder projects persisted as incremental, content-addressed snapshots in SQLite."""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+# Placeholders per IN (...) query, well below SQLite's bound-variable limit
+_QUERY_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    hash TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS projects (
+    project_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    head_revision INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS revisions (
+    project_id TEXT NOT NULL,
+    revision INTEGER NOT NULL,
+    manifest TEXT NOT NULL,
+    page_count INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (project_id, revision)
+);
+"""
+
+
+class ProjectNotFound(KeyError):
+    """Raised when a project or revision does not exist."""
+
+
+@dataclass
+class SnapshotResult:
+    """Outcome of saving a project snapshot."""
+
+    revision: int
+    created: bool
+    objects_written: int
+
+
+def _encode(value: Any) -> str:
+    """Canonical JSON, so equal content always encodes (and hashes) the same."""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def _hash(data: str) -> str:
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def _chunks(items: Sequence[str]) -> Iterable[Sequence[str]]:
+    for start in range(0, len(items), _QUERY_CHUNK):
+        yield items[start:start + _QUERY_CHUNK]
+
+
+class ProjectStore:
+    """
+    Revisioned folder projects.
+
+    A snapshot is split into objects keyed by the hash of their content:
+    every product, every page (with its products replaced by product hashes),
+    the settings, and a manifest listing the page hashes. Saving only inserts
+    objects that are not stored yet, so an autosave after editing one product
+    writes that product, its page and a new manifest; an unchanged folder
+    writes nothing. Revisions share all unchanged objects.
+    """
+
+    def __init__(self, db_path: Path, timeout: float = 10.0):
+        self.db_path = Path(db_path)
+        self.timeout = timeout
+        self._local = threading.local()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._connect().executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection (sqlite3 connections are per thread)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def create_project(self, name: str) -> dict:
+        """
+        Create an empty project.
+
+        Args:
+            name: Display name of the project
+
+        Returns:
+            dict: The project record
+        """
+        now = time.time()
+        project_id = str(uuid.uuid4())
+        self._connect().execute(
+            "INSERT INTO projects (project_id, name, created_at, updated_at) VALUES (?, ?, ?, ?)",
+            (project_id, name, now, now),
+        )
+        return self.get_project(project_id)
+
+    def get_project(self, project_id: str) -> dict:
+        """Project record; raises ProjectNotFound if it does not exist."""
+        row = self._connect().execute(
+            "SELECT project_id, name, head_revision, created_at, updated_at "
+            "FROM projects WHERE project_id = ?",
+            (project_id,),
+        ).fetchone()
+        if row is None:
+            raise ProjectNotFound(project_id)
+        return self._row_to_project(row)
+
+    def list_projects(self) -> List[dict]:
+        """All projects, most recently saved first."""
+        rows = self._connect().execute(
+            "SELECT project_id, name, head_revision, created_at, updated_at "
+            "FROM projects ORDER BY updated_at DESC"
+        ).fetchall()
+        return [self._row_to_project(row) for row in rows]
+
+    @staticmethod
+    def _row_to_project(row) -> dict:
+        project_id, name, head_revision, created_at, updated_at = row
+        return {
+            "project_id": project_id,
+            "name": name,
+            "head_revision": head_revision,
+            "created_at": created_at,
+            "updated_at": updated_at,
+        }
+
+    def save_snapshot(
+        self, project_id: str, pages: List[dict], settings: Optional[dict] = None
+    ) -> SnapshotResult:
+        """
+        Store the current state of a project as a new revision.
+
+        Args:
+            project_id: The project to save
+            pages: Folder pages as plain dicts, each with a ``products`` list
+            settings: PDF settings to keep with the folder
+
+        Returns:
+            SnapshotResult: The head revision and how much was written. If the
+            folder is unchanged since the head revision, no revision is created.
+        """
+        objects: Dict[str, str] = {}
+
+        def put(value: Any) -> str:
+            data = _encode(value)
+            digest = _hash(data)
+            objects[digest] = data
+            return digest
+
+        page_hashes = []
+        for page in pages:
+            product_hashes = [put(product) for product in page.get("products", [])]
+            page_hashes.append(put({**page, "products": product_hashes}))
+        manifest = put({"pages": page_hashes, "settings": put(settings or {})})
+
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT p.head_revision, r.manifest FROM projects p "
+                "LEFT JOIN revisions r "
+                "ON r.project_id = p.project_id AND r.revision = p.head_revision "
+                "WHERE p.project_id = ?",
+                (project_id,),
+            ).fetchone()
+            if row is None:
+                raise ProjectNotFound(project_id)
+            head_revision, head_manifest = row
+            if head_manifest == manifest:
+                conn.execute("COMMIT")
+                return SnapshotResult(revision=head_revision, created=False, objects_written=0)
+
+            written = self._insert_missing(conn, objects)
+            now = time.time()
+            revision = head_revision + 1
+            conn.execute(
+                "INSERT INTO revisions (project_id, revision, manifest, page_count, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (project_id, revision, manifest, len(page_hashes), now),
+            )
+            conn.execute(
+                "UPDATE projects SET head_revision = ?, updated_at = ? WHERE project_id = ?",
+                (revision, now, project_id),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return SnapshotResult(revision=revision, created=True, objects_written=written)
+
+    @staticmethod
+    def _insert_missing(conn: sqlite3.Connection, objects: Dict[str, str]) -> int:
+        """Insert objects whose hash is not stored yet; returns how many were new."""
+        hashes = list(objects)
+        existing = set()
+        for chunk in _chunks(hashes):
+            placeholders = ", ".join("?" for _ in chunk)
+            existing.update(
+                row[0]
+                for row in conn.execute(
+                    f"SELECT hash FROM objects WHERE hash IN ({placeholders})", chunk
+                )
+            )
+        missing = [(digest, objects[digest]) for digest in hashes if digest not in existing]
+        conn.executemany("INSERT INTO objects (hash, data) VALUES (?, ?)", missing)
+        return len(missing)
+
+    def _load_objects(self, hashes: Sequence[str]) -> Dict[str, Any]:
+        unique = list(dict.fromkeys(hashes))
+        loaded = {}
+        conn = self._connect()
+        for chunk in _chunks(unique):
+            placeholders = ", ".join("?" for _ in chunk)
+            for digest, data in conn.execute(
+                f"SELECT hash, data FROM objects WHERE hash IN ({placeholders})", chunk
+            ):
+                loaded[digest] = json.loads(data)
+        return loaded
+
+    def load_revision(self, project_id: str, revision: Optional[int] = None) -> dict:
+        """
+        Load a project revision.
+
+        Args:
+            project_id: The project to load
+            revision: Revision number (defaults to the head revision)
+
+        Returns:
+            dict: ``project_id``, ``name``, ``revision``, ``created_at``,
+            ``pages`` and ``settings``
+
+        Raises:
+            ProjectNotFound: If the project or revision does not exist
+        """
+        project = self.get_project(project_id)
+        if revision is None:
+            revision = project["head_revision"]
+        if revision == 0:
+            return {
+                "project_id": project_id,
+                "name": project["name"],
+                "revision": 0,
+                "created_at": project["created_at"],
+                "pages": [],
+                "settings": {},
+            }
+
+        row = self._connect().execute(
+            "SELECT manifest, created_at FROM revisions WHERE project_id = ? AND revision = ?",
+            (project_id, revision),
+        ).fetchone()
+        if row is None:
+            raise ProjectNotFound(f"{project_id}@{revision}")
+        manifest_hash, created_at = row
+
+        manifest = self._load_objects([manifest_hash])[manifest_hash]
+        objects = self._load_objects(manifest["pages"] + [manifest["settings"]])
+        product_hashes = [
+            digest for page_hash in manifest["pages"] for digest in objects[page_hash]["products"]
+        ]
+        products = self._load_objects(product_hashes)
+
+        return {
+            "project_id": project_id,
+            "name": project["name"],
+            "revision": revision,
+            "created_at": created_at,
+            "pages": [
+                {**objects[digest], "products": [products[p] for p in objects[digest]["products"]]}
+                for digest in manifest["pages"]
+            ],
+            "settings": objects[manifest["settings"]],
+        }
+
+    def list_revisions(self, project_id: str) -> List[dict]:
+        """Revisions of a project, newest first."""
+        self.get_project(project_id)
+        rows = self._connect().execute(
+            "SELECT revision, page_count, created_at FROM revisions "
+            "WHERE project_id = ? ORDER BY revision DESC",
+            (project_id,),
+        ).fetchall()
+        return [
+            {"revision": revision, "page_count": page_count, "created_at": created_at}
+            for revision, page_count, created_at in rows
+        ]
+
+    def delete_project(self, project_id: str) -> int:
+        """
+        Delete a project with all its revisions.
+
+        Args:
+            project_id: The project to delete
+
+        Returns:
+            int: Number of objects no longer referenced by any revision and removed
+        """
+        conn = self._connect()
+        cursor = conn.execute("DELETE FROM projects WHERE project_id = ?", (project_id,))
+        if cursor.rowcount == 0:
+            raise ProjectNotFound(project_id)
+        conn.execute("DELETE FROM revisions WHERE project_id = ?", (project_id,))
+        return self.collect_garbage()
+
+    def collect_garbage(self) -> int:
+        """
+        Remove objects that no revision references any more.
+
+        Returns:
+            int: Number of objects removed
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            manifests = [row[0] for row in conn.execute("SELECT DISTINCT manifest FROM revisions")]
+            reachable = set(manifests)
+            page_hashes = []
+            for manifest in self._load_objects(manifests).values():
+                reachable.add(manifest["settings"])
+                page_hashes.extend(manifest["pages"])
+            reachable.update(page_hashes)
+            for page in self._load_objects(page_hashes).values():
+                reachable.update(page["products"])
+
+            unreachable = [
+                row[0] for row in conn.execute("SELECT hash FROM objects")
+                if row[0] not in reachable
+            ]
+            for chunk in _chunks(unreachable):
+                placeholders = ", ".join("?" for _ in chunk)
+                conn.execute(f"DELETE FROM objects WHERE hash IN ({placeholders})", chunk)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return len(unreachable)
+
+    def close(self) -> None:
+        """Close this thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
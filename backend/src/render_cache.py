@@ -0,0 +1,148 @@
+"""On-disk cache of pre-rendered folder pages, shared by all worker processes."""
+
+import json
+import logging
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+try:
+    from .page_templates import PageDesign
+except ImportError:
+    from page_templates import PageDesign
+
+logger = logging.getLogger(__name__)
+
+# Rendered pages kept on disk; the least recently used are removed beyond this
+MAX_FRAGMENTS = 5000
+
+Designs = List[Optional[PageDesign]]
+Fragment = Tuple[Path, Designs]
+
+
+def _design_to_json(design: Optional[PageDesign]) -> Optional[dict]:
+    if design is None:
+        return None
+    return {
+        "orientation": design.orientation,
+        "page_format": design.page_format,
+        "background": design.background,
+        "frames": design.frames,
+    }
+
+
+def _design_from_json(data: Optional[dict]) -> Optional[PageDesign]:
+    if data is None:
+        return None
+    return PageDesign(
+        orientation=data["orientation"],
+        page_format=data["page_format"],
+        background=tuple(data["background"]) if data["background"] else None,
+        frames=tuple(tuple(frame) for frame in data["frames"]),
+    )
+
+
+class RenderCache:
+    """
+    Rendered folder pages ("fragments") keyed by a hash of their content and options.
+
+    Each fragment is a small PDF holding one folder page (plus any overflow
+    pages) with its page number and total left as aliases, so it can be placed
+    at any position of any folder. The page designs recorded while rendering
+    are stored next to it for template stamping.
+    """
+
+    def __init__(self, cache_dir: Path, max_fragments: int = MAX_FRAGMENTS):
+        self.cache_dir = Path(cache_dir)
+        self.max_fragments = max_fragments
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._stores = 0
+        self._lock = threading.Lock()
+
+    def _paths(self, key: str) -> Tuple[Path, Path]:
+        return self.cache_dir / f"{key}.pdf", self.cache_dir / f"{key}.json"
+
+    def lookup(self, key: str) -> Optional[Fragment]:
+        """
+        Find a rendered page.
+
+        Args:
+            key: Fragment key
+
+        Returns:
+            Optional[Fragment]: Fragment path and its page designs, or None on a miss
+        """
+        pdf_path, designs_path = self._paths(key)
+        try:
+            designs = json.loads(designs_path.read_text())
+            os.utime(pdf_path)  # Mark as recently used
+        except (OSError, ValueError):
+            return None
+        return pdf_path, [_design_from_json(design) for design in designs]
+
+    def contains(self, key: str) -> bool:
+        """Whether a page is rendered already (without marking it as used)."""
+        pdf_path, designs_path = self._paths(key)
+        return pdf_path.exists() and designs_path.exists()
+
+    def store(self, key: str, render: Callable[[Path], Designs]) -> Fragment:
+        """
+        Render a page into the cache.
+
+        ``render`` writes the fragment PDF to the path it is given and returns
+        the page designs. Files are renamed into place, so concurrent readers
+        and writers of the same key never see partial fragments.
+
+        Args:
+            key: Fragment key
+            render: Function rendering the page
+
+        Returns:
+            Fragment: Fragment path and its page designs
+        """
+        pdf_path, designs_path = self._paths(key)
+        tmp = f".{uuid.uuid4().hex}.tmp"
+        tmp_pdf = pdf_path.with_name(pdf_path.name + tmp)
+        tmp_designs = designs_path.with_name(designs_path.name + tmp)
+        try:
+            designs = render(tmp_pdf)
+            tmp_designs.write_text(json.dumps([_design_to_json(d) for d in designs]))
+            # Designs first: a fragment counts as cached once its PDF exists
+            os.replace(tmp_designs, designs_path)
+            os.replace(tmp_pdf, pdf_path)
+        finally:
+            tmp_pdf.unlink(missing_ok=True)
+            tmp_designs.unlink(missing_ok=True)
+
+        with self._lock:
+            self._stores += 1
+            prune = self._stores % 100 == 0
+        if prune:
+            self.prune()
+        return pdf_path, designs
+
+    def prune(self) -> int:
+        """
+        Remove the least recently used fragments beyond ``max_fragments``.
+
+        Returns:
+            int: Number of fragments removed
+        """
+        fragments = []
+        for pdf_path in self.cache_dir.glob("*.pdf"):
+            try:
+                fragments.append((pdf_path.stat().st_mtime, pdf_path))
+            except OSError:
+                continue  # Removed by another worker
+        excess = len(fragments) - self.max_fragments
+        if excess <= 0:
+            return 0
+
+        fragments.sort()
+        for _, pdf_path in fragments[:excess]:
+            pdf_path.unlink(missing_ok=True)
+            pdf_path.with_suffix(".json").unlink(missing_ok=True)
+        logger.info("Pruned %d cached page renders", excess)
+        return excess
@@ -0,0 +1,384 @@
+"""Output backends fed by one layout pass: PDF for print, PNG per page, HTML for the web."""
+
+import contextvars
+import html
+import logging
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+try:
+    from .folder_layout import (
+        CELL_PADDING,
+        FOOTER_COLOR,
+        FOOTER_FONT,
+        FOOTER_HEIGHT,
+        FOOTER_OFFSET,
+        PAGE_MARGIN,
+        FolderLayout,
+        ImagePlacement,
+        PageLayout,
+        TextRun,
+        footer_text,
+        layout_folder,
+    )
+    from .models import GeneratePDFRequest
+    from .page_templates import FRAME_COLOR, FRAME_LINE_WIDTH
+    from .pdf_generator import generate_pdf_report, render_layout_pdf
+    from .render_cache import RenderCache
+    from .tracing import span
+except ImportError:
+    from folder_layout import (
+        CELL_PADDING,
+        FOOTER_COLOR,
+        FOOTER_FONT,
+        FOOTER_HEIGHT,
+        FOOTER_OFFSET,
+        PAGE_MARGIN,
+        FolderLayout,
+        ImagePlacement,
+        PageLayout,
+        TextRun,
+        footer_text,
+        layout_folder,
+    )
+    from models import GeneratePDFRequest
+    from page_templates import FRAME_COLOR, FRAME_LINE_WIDTH
+    from pdf_generator import generate_pdf_report, render_layout_pdf
+    from render_cache import RenderCache
+    from tracing import span
+
+logger = logging.getLogger(__name__)
+
+MM_PER_INCH = 25.4
+POINTS_PER_INCH = 72
+
+HTML_FILENAME = "folder.html"
+PNG_FILENAME = "page-{number:03d}.png"
+
+# TrueType fonts tried for each style before Pillow's built-in font
+_FONT_CANDIDATES = {
+    "": ("arial.ttf", "Arial.ttf", "LiberationSans-Regular.ttf", "DejaVuSans.ttf"),
+    "B": ("arialbd.ttf", "Arial Bold.ttf", "LiberationSans-Bold.ttf", "DejaVuSans-Bold.ttf"),
+    "I": ("ariali.ttf", "Arial Italic.ttf", "LiberationSans-Italic.ttf", "DejaVuSans-Oblique.ttf"),
+}
+
+
+class Renderer:
+    """An output backend: turns a laid-out folder into files."""
+
+    name = ""
+
+    def render(
+        self, layout: FolderLayout, request: GeneratePDFRequest, pdf_path: Path, output_dir: Path
+    ) -> List[Path]:
+        """
+        Write this backend's output.
+
+        Args:
+            layout: The laid-out folder
+            request: Request whose output options apply
+            pdf_path: Where the job's PDF goes
+            output_dir: Directory for the job's other outputs
+
+        Returns:
+            List[Path]: Files written
+        """
+        raise NotImplementedError
+
+
+class PDFRenderer(Renderer):
+    """Print PDF through the optimization stage."""
+
+    name = "pdf"
+
+    def render(self, layout, request, pdf_path, output_dir):
+        render_layout_pdf(layout, request, pdf_path)
+        return [pdf_path]
+
+
+class PNGRenderer(Renderer):
+    """One PNG image per page, at ``request.png_dpi``."""
+
+    name = "png"
+
+    def render(self, layout, request, pdf_path, output_dir):
+        scale = request.png_dpi / MM_PER_INCH  # pixels per mm
+        images = _ImageCache()
+        paths = []
+        for number, page in enumerate(layout.pages, start=1):
+            path = output_dir / PNG_FILENAME.format(number=number)
+            rendered = self.render_page(page, scale, footer_text(number, len(layout.pages)), images)
+            rendered.save(path, optimize=False)
+            paths.append(path)
+        return paths
+
+    @staticmethod
+    def render_page(
+        page: PageLayout, scale: float, footer: str, images: Optional["_ImageCache"] = None
+    ) -> Image.Image:
+        size = (round(page.width * scale), round(page.height * scale))
+        image = Image.new("RGB", size, page.background or (255, 255, 255))
+        draw = ImageDraw.Draw(image)
+
+        line_width = max(1, round(FRAME_LINE_WIDTH * scale))
+        for card in page.cards:
+            box = [
+                card.x * scale,
+                card.y * scale,
+                (card.x + card.width) * scale,
+                (card.y + card.height) * scale,
+            ]
+            draw.rectangle(box, outline=FRAME_COLOR, width=line_width)
+
+        if images is None:
+            images = _ImageCache()
+        for placement in page.images:
+            size = (
+                max(1, round(placement.width * scale)),
+                max(1, round(placement.height * scale)),
+            )
+            picture = images.scaled(placement, size)
+            position = (round(placement.x * scale), round(placement.y * scale))
+            image.paste(picture, position, picture if picture.mode == "RGBA" else None)
+
+        for run in page.texts:
+            _draw_text(draw, run, scale)
+        _draw_text(draw, _footer_run(page, footer), scale)
+        return image
+
+
+class HTMLRenderer(Renderer):
+    """A single self-contained HTML page with every folder page positioned in mm."""
+
+    name = "html"
+
+    def render(self, layout, request, pdf_path, output_dir):
+        title = html.escape(Path(request.output_filename).stem)
+        parts = [
+            "<!DOCTYPE html>\n<html lang=\"nl\">\n<head>\n<meta charset=\"utf-8\">\n",
+            f"<title>{title}</title>\n<style>\n{_HTML_STYLE}</style>\n</head>\n<body>\n",
+        ]
+        for number, page in enumerate(layout.pages, start=1):
+            parts.append(self.render_page(page, footer_text(number, len(layout.pages))))
+        parts.append("</body>\n</html>\n")
+
+        path = output_dir / HTML_FILENAME
+        path.write_text("".join(parts), encoding="utf-8")
+
+        # Each distinct image is copied once, however many products show it
+        images = {}
+        for page in layout.pages:
+            for placement in page.images:
+                if placement.asset_id not in images:
+                    image_path = output_dir / _html_image_name(placement)
+                    shutil.copyfile(placement.path, image_path)
+                    images[placement.asset_id] = image_path
+        return [path] + list(images.values())
+
+    @staticmethod
+    def render_page(page: PageLayout, footer: str) -> str:
+        background = _css_color(page.background or (255, 255, 255))
+        parts = [
+            f'<section class="page" data-source-page="{page.source_page}" '
+            f'style="width:{page.width:.2f}mm;height:{page.height:.2f}mm;'
+            f'background:{background}">\n'
+        ]
+        for card in page.cards:
+            parts.append(
+                f'<div class="card" data-product-id="{html.escape(card.product_id)}" '
+                f'style="{_css_box(card.x, card.y, card.width, card.height)}"></div>\n'
+            )
+        for placement in page.images:
+            parts.append(
+                f'<img class="image" alt="" src="{_html_image_name(placement)}" style="'
+                f'{_css_box(placement.x, placement.y, placement.width, placement.height)}">\n'
+            )
+        for run in page.texts + [_footer_run(page, footer)]:
+            weight = "bold" if "B" in run.style else "normal"
+            style = "italic" if "I" in run.style else "normal"
+            decoration = "line-through" if "S" in run.style else "none"
+            justify = {"L": "flex-start", "C": "center", "R": "flex-end"}[run.align]
+            parts.append(
+                f'<div class="text" style="{_css_box(run.x, run.y, run.width, run.height)};'
+                f"font-size:{run.size:g}pt;font-weight:{weight};font-style:{style};"
+                f"text-decoration:{decoration};"
+                f'color:{_css_color(run.color)};justify-content:{justify}">'
+                f"{html.escape(run.text)}</div>\n"
+            )
+        parts.append("</section>\n")
+        return "".join(parts)
+
+
+_HTML_STYLE = f"""body {{ margin: 0; background: #e5e5e5; }}
+.page {{ position: relative; margin: 8mm auto; overflow: hidden; box-shadow: 0 1mm 4mm #0003; }}
+.card {{ position: absolute; box-sizing: border-box;
+  border: {FRAME_LINE_WIDTH}mm solid {'rgb({}, {}, {})'.format(*FRAME_COLOR)}; }}
+.image {{ position: absolute; }}
+.text {{ position: absolute; box-sizing: border-box; display: flex; align-items: center;
+  padding: 0 {CELL_PADDING:g}mm; white-space: pre; overflow: hidden;
+  font-family: Helvetica, Arial, sans-serif; }}
+"""
+
+RENDERERS: Dict[str, Renderer] = {
+    renderer.name: renderer for renderer in (PDFRenderer(), PNGRenderer(), HTMLRenderer())
+}
+
+
+class _ImageCache:
+    """Image renditions decoded once per job, and scaled once per size."""
+
+    def __init__(self):
+        self._decoded: Dict[str, Image.Image] = {}
+        self._scaled: Dict[tuple, Image.Image] = {}
+
+    def scaled(self, placement: ImagePlacement, size: Tuple[int, int]) -> Image.Image:
+        key = (placement.asset_id, size)
+        picture = self._scaled.get(key)
+        if picture is None:
+            decoded = self._decoded.get(placement.asset_id)
+            if decoded is None:
+                with Image.open(placement.path) as source:
+                    decoded = source.convert("RGBA" if "A" in source.mode else "RGB")
+                self._decoded[placement.asset_id] = decoded
+            picture = self._scaled[key] = decoded.resize(size, Image.Resampling.LANCZOS)
+        return picture
+
+
+def _html_image_name(placement: ImagePlacement) -> str:
+    return placement.asset_id + Path(placement.path).suffix
+
+
+def _css_color(rgb) -> str:
+    return "rgb({}, {}, {})".format(*rgb)
+
+
+def _css_box(x: float, y: float, width: float, height: float) -> str:
+    return f"left:{x:.2f}mm;top:{y:.2f}mm;width:{width:.2f}mm;height:{height:.2f}mm"
+
+
+def _footer_run(page: PageLayout, text: str) -> TextRun:
+    style, size = FOOTER_FONT
+    return TextRun(
+        x=PAGE_MARGIN,
+        y=page.height - FOOTER_OFFSET,
+        width=page.width - 2 * PAGE_MARGIN,
+        height=FOOTER_HEIGHT,
+        text=text,
+        style=style,
+        size=size,
+        color=FOOTER_COLOR,
+        align="C",
+    )
+
+
+@lru_cache(maxsize=64)
+def _font(style: str, size_px: int) -> ImageFont.ImageFont:
+    for name in _FONT_CANDIDATES.get(style, _FONT_CANDIDATES[""]):
+        try:
+            return ImageFont.truetype(name, size_px)
+        except OSError:
+            continue
+    return ImageFont.load_default(size=size_px)
+
+
+def _draw_text(draw: ImageDraw.ImageDraw, run: TextRun, scale: float) -> None:
+    """Draw a text run like a PDF cell: padded, vertically centered, aligned."""
+    size_px = max(1, round(run.size / POINTS_PER_INCH * MM_PER_INCH * scale))
+    font = _font(run.style.replace("S", ""), size_px)
+    middle = (run.y + run.height / 2) * scale
+    if run.align == "R":
+        position, anchor = ((run.x + run.width - CELL_PADDING) * scale, middle), "rm"
+    elif run.align == "C":
+        position, anchor = ((run.x + run.width / 2) * scale, middle), "mm"
+    else:
+        position, anchor = ((run.x + CELL_PADDING) * scale, middle), "lm"
+    draw.text(position, run.text, fill=run.color, font=font, anchor=anchor)
+    if "S" in run.style:
+        left, _, right, _ = draw.textbbox(position, run.text, font=font, anchor=anchor)
+        draw.line([(left, middle), (right, middle)], fill=run.color, width=max(1, size_px // 14))
+
+
+def _render_traced(renderer: Renderer, *args) -> List[Path]:
+    # PDF traces its own render/write steps; other formats render and write together
+    if renderer.name == "pdf":
+        return renderer.render(*args)
+    with span("render", format=renderer.name):
+        return renderer.render(*args)
+
+
+def output_dir_for(pdf_path: Path) -> Path:
+    """Directory holding a job's PNG/HTML outputs, next to its PDF."""
+    return pdf_path.with_suffix("")
+
+
+def generate_outputs(
+    request: GeneratePDFRequest,
+    pdf_path: Path,
+    render_cache: Optional[RenderCache] = None,
+) -> Dict[str, List[Path]]:
+    """
+    Produce every output format requested, from a single layout pass.
+
+    A PDF-only request takes the regular PDF path (with low-memory mode and
+    render-ahead). Otherwise the folder is laid out once and all backends draw
+    that layout concurrently.
+
+    Args:
+        request: Generation request, with ``formats`` to produce
+        pdf_path: Where the PDF goes; other outputs go to ``output_dir_for(pdf_path)``
+        render_cache: Pre-rendered pages for the PDF-only path
+
+    Returns:
+        Dict[str, List[Path]]: Files written per format
+
+    Raises:
+        Exception: Any layout or rendering error
+    """
+    if request.formats == ["pdf"]:
+        generate_pdf_report(request, pdf_path, render_cache)
+        return {"pdf": [pdf_path]}
+
+    if request.low_memory:
+        logger.warning("Low-memory mode only applies to PDF-only jobs")
+
+    start = time.perf_counter()
+    with span("layout", pages=len(request.pages)):
+        layout = layout_folder(request)
+    layout_seconds = time.perf_counter() - start
+
+    output_dir = output_dir_for(pdf_path)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        with ThreadPoolExecutor(max_workers=len(request.formats)) as executor:
+            # Each backend runs in a copy of this context, keeping the job id for tracing
+            futures = {
+                name: executor.submit(
+                    contextvars.copy_context().run,
+                    _render_traced,
+                    RENDERERS[name],
+                    layout,
+                    request,
+                    pdf_path,
+                    output_dir,
+                )
+                for name in request.formats
+            }
+            outputs = {name: future.result() for name, future in futures.items()}
+    except Exception:
+        shutil.rmtree(output_dir, ignore_errors=True)
+        raise
+
+    logger.info(
+        "Rendered %d pages as %s (layout %.2fs, total %.2fs)",
+        len(layout.pages),
+        ", ".join(request.formats),
+        layout_seconds,
+        time.perf_counter() - start,
+    )
+    return outputs
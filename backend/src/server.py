@@ -1,35 +1,189 @@
 """FastAPI server for NSAanbiedingen backend."""
 
+import argparse
 import logging
+import mimetypes
+import multiprocessing
+import os
+import shutil
 import uuid
 from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Dict, Optional
 
 import uvicorn
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, File, HTTPException, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
 
 try:
-    from .models import ErrorResponse, GeneratePDFRequest, GeneratePDFResponse, HealthResponse
-    from .pdf_generator import generate_pdf
-    from .utils import announce_port, cleanup_temp_files, get_free_port, get_temp_pdf_dir
+    from .models import (
+        AssetResponse,
+        CreateProjectRequest,
+        ErrorResponse,
+        GeneratePDFRequest,
+        GeneratePDFResponse,
+        HealthResponse,
+        ProjectInfo,
+        ProjectRevision,
+        ProjectSnapshot,
+        RevisionInfo,
+        SaveProjectResponse,
+        SpeculateResponse,
+    )
+    from .asset_store import (
+        MAX_ASSET_BYTES,
+        RENDITIONS,
+        AssetNotFound,
+        InvalidAsset,
+        get_asset_store,
+    )
+    from .job_store import ACTIVE_STATUSES, JobStore
+    from .layout_metrics import precompute_all as precompute_layout_metrics
+    from .logging_config import LOG_FORMATS, configure_logging
+    from .project_store import ProjectNotFound, ProjectStore
+    from .render_cache import RenderCache
+    from .renderers import generate_outputs, output_dir_for
+    from .speculative import SpeculativeRenderer
+    from .tracing import (
+        RECEIVED_KEY,
+        RequestTimer,
+        enable_tracing,
+        job_context,
+        record_span,
+    )
+    from .transport import CompressionMiddleware, ranged_file_response
+    from .utils import (
+        announce_port,
+        cleanup_temp_files,
+        get_free_port,
+        get_project_dir,
+        get_temp_pdf_dir,
+        pid_alive,
+    )
 except ImportError:
-    from models import ErrorResponse, GeneratePDFRequest, GeneratePDFResponse, HealthResponse
-    from pdf_generator import generate_pdf
-    from utils import announce_port, cleanup_temp_files, get_free_port, get_temp_pdf_dir
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-)
+    from models import (
+        AssetResponse,
+        CreateProjectRequest,
+        ErrorResponse,
+        GeneratePDFRequest,
+        GeneratePDFResponse,
+        HealthResponse,
+        ProjectInfo,
+        ProjectRevision,
+        ProjectSnapshot,
+        RevisionInfo,
+        SaveProjectResponse,
+        SpeculateResponse,
+    )
+    from asset_store import (
+        MAX_ASSET_BYTES,
+        RENDITIONS,
+        AssetNotFound,
+        InvalidAsset,
+        get_asset_store,
+    )
+    from job_store import ACTIVE_STATUSES, JobStore
+    from layout_metrics import precompute_all as precompute_layout_metrics
+    from logging_config import LOG_FORMATS, configure_logging
+    from project_store import ProjectNotFound, ProjectStore
+    from render_cache import RenderCache
+    from renderers import generate_outputs, output_dir_for
+    from speculative import SpeculativeRenderer
+    from tracing import (
+        RECEIVED_KEY,
+        RequestTimer,
+        enable_tracing,
+        job_context,
+        record_span,
+    )
+    from transport import CompressionMiddleware, ranged_file_response
+    from utils import (
+        announce_port,
+        cleanup_temp_files,
+        get_free_port,
+        get_project_dir,
+        get_temp_pdf_dir,
+        pid_alive,
+    )
+
+# Log through a queue to stderr (stdout carries the SERVER_PORT handshake);
+# worker processes read the options from the environment
+configure_logging()
 logger = logging.getLogger(__name__)
 
-# Store PDF generation jobs in memory (in production, use a proper queue)
-jobs: Dict[str, dict] = {}
+JOB_DB_NAME = "jobs.sqlite3"
+PROJECT_DB_NAME = "projects.sqlite3"
+RENDER_CACHE_DIR = "render-cache"
+
+# Bytes of an uploaded file read at a time
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Seconds uvicorn waits for open requests (and so in-flight jobs) on shutdown
+GRACEFUL_TIMEOUT = float(os.environ.get("NSA_GRACEFUL_TIMEOUT", "30"))
+
+
+def open_job_store() -> JobStore:
+    """Open the job registry in the (possibly shared) output directory."""
+    return JobStore(get_temp_pdf_dir() / JOB_DB_NAME)
+
+
+def open_render_cache() -> RenderCache:
+    """Open the cache of pre-rendered pages in the (possibly shared) output directory."""
+    return RenderCache(get_temp_pdf_dir() / RENDER_CACHE_DIR)
+
+
+# Job state lives in SQLite next to the PDFs so every worker process sees every job
+jobs: JobStore = open_job_store()
+
+# Saved folder projects; every worker opens the same database
+projects: ProjectStore = ProjectStore(get_project_dir() / PROJECT_DB_NAME)
+
+# Pages rendered ahead of export while the user edits; the cache directory is
+# shared by all workers, the background renderer is per worker
+render_cache = open_render_cache()
+speculator = SpeculativeRenderer(render_cache)
+
+# Uploaded product images, next to the projects that use them
+assets = get_asset_store()
+
+def fail_interrupted_jobs() -> None:
+    """
+    Mark this worker's unfinished jobs as failed.
+
+    Each job runs inside its /api/generate request, so by the time the app
+    shuts down uvicorn has already waited up to the graceful timeout for them;
+    jobs still running now were cancelled.
+    """
+    for job_id in jobs.active_jobs(worker_pid=os.getpid()):
+        logger.warning("PDF job %s interrupted by shutdown", job_id, extra={"job_id": job_id})
+        jobs[job_id] = {"status": "failed", "path": None}
+
+
+def fail_orphaned_jobs(store: JobStore) -> int:
+    """
+    Mark jobs whose worker process has exited as failed.
+
+    The output directory (and with it the job store) can be shared by several
+    server instances, so jobs of workers that are still alive are left alone.
+
+    Args:
+        store: Job store to sweep
+
+    Returns:
+        int: Number of jobs marked as failed
+    """
+    orphaned = [
+        job_id
+        for job_id, job in store.items()
+        if job["status"] in ACTIVE_STATUSES and not pid_alive(job["worker_pid"])
+    ]
+    for job_id in orphaned:
+        logger.warning("PDF job %s orphaned by a crashed worker", job_id, extra={"job_id": job_id})
+        store[job_id] = {"status": "failed", "path": None}
+    return len(orphaned)
 
 
 @asynccontextmanager
@@ -38,9 +192,13 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("NSAanbiedingen backend starting up...")
     cleanup_temp_files()  # Clean up old PDFs on startup
+    jobs.prune()
+    precompute_layout_metrics()
     yield
     # Shutdown
     logger.info("NSAanbiedingen backend shutting down...")
+    speculator.stop()
+    fail_interrupted_jobs()
 
 
 # Create FastAPI app
@@ -51,13 +209,20 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
-# Add CORS middleware for browser dev mode
+# Decode gzip/zstd request bodies and compress large responses
+app.add_middleware(CompressionMiddleware)
+
+# Note request arrival for the "validate" trace span (a no-op unless tracing)
+app.add_middleware(RequestTimer)
+
+# Add CORS middleware for browser dev mode (outermost, so error responses carry CORS headers)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:4321", "http://127.0.0.1:4321", "tauri://localhost"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Accept-Ranges", "Content-Encoding", "Content-Range", "ETag"],
 )
 
 
@@ -72,52 +237,28 @@ async def health_check():
 
 
 @app.post("/api/generate", response_model=GeneratePDFResponse)
-async def generate_pdf_endpoint(request: GeneratePDFRequest):
+async def generate_pdf_endpoint(request: GeneratePDFRequest, http_request: Request):
     """
     Start PDF generation job.
 
     Args:
         request: PDF generation request with folder data
+        http_request: The incoming request (for its arrival time when tracing)
 
     Returns:
         GeneratePDFResponse: Job status and ID
     """
     try:
         job_id = str(uuid.uuid4())
-        temp_dir = get_temp_pdf_dir()
-        output_path = temp_dir / f"{job_id}.pdf"
-
-        logger.info(f"Starting PDF generation job {job_id}")
-
-        # Generate PDF
-        success = generate_pdf(request, output_path)
-
-        # Store job info
-        if success and output_path.exists():
-            file_size_kb = output_path.stat().st_size // 1024
-            jobs[job_id] = {
-                "status": "completed",
-                "path": output_path,
-                "size_kb": file_size_kb,
-            }
-            logger.info(f"PDF job {job_id} completed ({file_size_kb} KB)")
-            return GeneratePDFResponse(
-                success=True,
-                job_id=job_id,
-                message="PDF generated successfully",
-                file_size_kb=file_size_kb,
-            )
-        else:
-            jobs[job_id] = {"status": "failed", "path": None}
-            logger.error(f"PDF job {job_id} failed during generation")
-            return GeneratePDFResponse(
-                success=False,
-                job_id=job_id,
-                message="PDF generation failed",
-            )
+        with job_context(job_id):
+            received = http_request.scope.get(RECEIVED_KEY)
+            if received is not None:
+                # Body decoding and validation ran before this endpoint
+                record_span("validate", received, pages=len(request.pages))
+            return await _run_generate_job(job_id, request)
 
     except Exception as e:
-        logger.error(f"Error in PDF generation: {e}", exc_info=True)
+        logger.error("Error in PDF generation: %s", e, exc_info=True)
         return GeneratePDFResponse(
             success=False,
             job_id="unknown",
@@ -125,16 +266,105 @@ async def generate_pdf_endpoint(request: GeneratePDFRequest):
         )
 
 
+async def _run_generate_job(job_id: str, request: GeneratePDFRequest) -> GeneratePDFResponse:
+    output_path = get_temp_pdf_dir() / f"{job_id}.pdf"
+
+    logger.info("Starting PDF generation job")
+    jobs[job_id] = {"status": "running", "path": None, "worker_pid": os.getpid()}
+
+    # Generate off the event loop so the worker keeps serving other requests;
+    # render-ahead pauses until the export is done
+    try:
+        with speculator.interactive():
+            outputs = await run_in_threadpool(
+                generate_outputs, request, output_path, render_cache
+            )
+    except Exception as e:
+        logger.error("Generation Error: %s", e, exc_info=True)
+        outputs = None
+
+    # Store job info
+    if outputs and all(path.exists() for paths in outputs.values() for path in paths):
+        files = [path for paths in outputs.values() for path in paths]
+        pdf_path = output_path if "pdf" in outputs else None
+        size_bytes = pdf_path.stat().st_size if pdf_path else sum(
+            path.stat().st_size for path in files
+        )
+        file_size_kb = size_bytes // 1024
+        jobs[job_id] = {
+            "status": "completed",
+            "path": pdf_path,
+            "size_kb": file_size_kb,
+        }
+        logger.info(
+            "Job completed: %s (%d KB)",
+            ", ".join(outputs),
+            file_size_kb,
+            extra={"size_kb": file_size_kb},
+        )
+        return GeneratePDFResponse(
+            success=True,
+            job_id=job_id,
+            message="PDF generated successfully"
+            if pdf_path
+            else "Output generated successfully",
+            file_size_kb=file_size_kb,
+            outputs=[
+                f"/api/download/{job_id}"
+                if path == output_path
+                else f"/api/download/{job_id}/{path.name}"
+                for path in files
+            ],
+        )
+
+    jobs[job_id] = {"status": "failed", "path": None}
+    logger.error("PDF job failed during generation")
+    return GeneratePDFResponse(
+        success=False,
+        job_id=job_id,
+        message="PDF generation failed",
+    )
+
+
+@app.post("/api/speculate", response_model=SpeculateResponse)
+async def speculate(request: GeneratePDFRequest, http_request: Request, client: str = ""):
+    """
+    Render changed pages ahead of export.
+
+    The editor posts the folder (debounced) while the user edits. Pages whose
+    render is not cached are queued for a low-priority background thread, so a
+    later export only has to assemble them. Pages the same client queued for
+    an earlier version of its folder are dropped; other clients' are kept.
+
+    Args:
+        request: The folder as it would be exported
+        client: Id of the submitting editor; defaults to the client address
+
+    Returns:
+        SpeculateResponse: How many pages were queued and already cached
+    """
+    if not client and http_request.client is not None:
+        client = http_request.client.host
+    # Hashing every page and checking the cache takes a while on large folders;
+    # keep it off the event loop like an export
+    counts = await run_in_threadpool(speculator.submit, request, client)
+    return SpeculateResponse(**counts)
+
+
 @app.get("/api/download/{job_id}")
-async def download_pdf(job_id: str):
+async def download_pdf(job_id: str, request: Request):
     """
     Download generated PDF.
 
+    Supports HTTP range requests (``Range``/``If-Range``) so interrupted
+    downloads of large PDFs can resume.
+
     Args:
         job_id: The job ID from generation request
+        request: The incoming request
 
     Returns:
-        FileResponse: The PDF file
+        Response: The PDF file, or the requested byte range of it
 
     Raises:
         HTTPException: If job not found or not completed
@@ -163,14 +393,48 @@ async def download_pdf(job_id: str):
             detail=ErrorResponse(error="PDF file not found", job_id=job_id).dict(),
         )
 
-    logger.info(f"Downloading PDF for job {job_id}")
-    return FileResponse(
-        path=file_path,
+    logger.info("Downloading PDF", extra={"job_id": job_id})
+    return ranged_file_response(
+        request,
+        file_path,
         media_type="application/pdf",
         filename="aanbieding.pdf",
     )
 
 
+@app.get("/api/download/{job_id}/{filename}")
+async def download_output(job_id: str, filename: str, request: Request):
+    """
+    Download a PNG page or HTML file of a multi-format job.
+
+    Args:
+        job_id: The job ID from generation request
+        filename: Name of the file, as listed in the job's ``outputs``
+        request: The incoming request
+
+    Returns:
+        Response: The file, or the requested byte range of it
+
+    Raises:
+        HTTPException: If job or file not found, or job not completed
+    """
+    if job_id not in jobs or jobs[job_id]["status"] != "completed":
+        raise HTTPException(
+            status_code=404,
+            detail=ErrorResponse(error="Job not found", job_id=job_id).model_dump(),
+        )
+
+    file_path = output_dir_for(get_temp_pdf_dir() / f"{job_id}.pdf") / filename
+    if Path(filename).name != filename or not file_path.is_file():
+        raise HTTPException(
+            status_code=404,
+            detail=ErrorResponse(error="File not found", job_id=job_id).model_dump(),
+        )
+
+    media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    return ranged_file_response(request, file_path, media_type=media_type, filename=filename)
+
+
 @app.get("/api/status/{job_id}")
 async def job_status(job_id: str):
     """
@@ -222,28 +486,313 @@ async def cleanup_jobs():
                     path = jobs[job_id].get("path")
                     if path and path.exists():
                         path.unlink()
+                    shutil.rmtree(
+                        output_dir_for(get_temp_pdf_dir() / f"{job_id}.pdf"),
+                        ignore_errors=True,
+                    )
                     del jobs[job_id]
                 except Exception as e:
-                    logger.error(f"Error cleaning up job {job_id}: {e}")
+                    logger.error("Error cleaning up job %s: %s", job_id, e)
     return {"jobs_before": before, "jobs_after": len(jobs)}
 
 
-def main():
+def _project_not_found(project_id: str) -> HTTPException:
+    return HTTPException(
+        status_code=404,
+        detail=ErrorResponse(error="Project not found", detail=project_id).model_dump(),
+    )
+
+
+@app.post("/api/projects", response_model=ProjectInfo)
+async def create_project(request: CreateProjectRequest):
+    """Create an empty folder project."""
+    project = projects.create_project(request.name)
+    logger.info("Created project %s", project["project_id"])
+    return ProjectInfo(**project)
+
+
+@app.get("/api/projects")
+async def list_projects():
+    """List saved projects, most recently saved first."""
+    return {"projects": [ProjectInfo(**project) for project in projects.list_projects()]}
+
+
+@app.get("/api/projects/{project_id}", response_model=ProjectRevision)
+async def load_project(project_id: str):
+    """Load the latest revision of a project."""
+    return await _load_revision(project_id, None)
+
+
+@app.put("/api/projects/{project_id}", response_model=SaveProjectResponse)
+async def save_project(project_id: str, snapshot: ProjectSnapshot):
+    """
+    Autosave a project.
+
+    Only pages, products and settings that changed since any earlier revision
+    are written; saving an unchanged folder creates no revision.
+
+    Args:
+        project_id: The project to save
+        snapshot: Current folder content
+
+    Returns:
+        SaveProjectResponse: The head revision and number of objects written
+    """
+    pages = [page.model_dump() for page in snapshot.pages]
+    try:
+        result = await run_in_threadpool(
+            projects.save_snapshot, project_id, pages, snapshot.settings
+        )
+    except ProjectNotFound:
+        raise _project_not_found(project_id)
+    if result.created:
+        logger.info(
+            "Saved project %s revision %d (%d new objects)",
+            project_id,
+            result.revision,
+            result.objects_written,
+        )
+    return SaveProjectResponse(project_id=project_id, **vars(result))
+
+
+@app.get("/api/projects/{project_id}/revisions")
+async def list_project_revisions(project_id: str):
+    """List the revisions of a project, newest first."""
+    try:
+        revisions = projects.list_revisions(project_id)
+    except ProjectNotFound:
+        raise _project_not_found(project_id)
+    return {"project_id": project_id, "revisions": [RevisionInfo(**r) for r in revisions]}
+
+
+@app.get("/api/projects/{project_id}/revisions/{revision}", response_model=ProjectRevision)
+async def load_project_revision(project_id: str, revision: int):
+    """Load a specific revision of a project."""
+    return await _load_revision(project_id, revision)
+
+
+async def _load_revision(project_id: str, revision: Optional[int]) -> ProjectRevision:
+    try:
+        loaded = await run_in_threadpool(projects.load_revision, project_id, revision)
+    except ProjectNotFound:
+        raise _project_not_found(project_id if revision is None else f"{project_id}@{revision}")
+    return ProjectRevision(**loaded)
+
+
+@app.delete("/api/projects/{project_id}")
+async def delete_project(project_id: str):
+    """Delete a project and every revision of it."""
+    try:
+        removed = projects.delete_project(project_id)
+    except ProjectNotFound:
+        raise _project_not_found(project_id)
+    return {"project_id": project_id, "objects_removed": removed}
+
+
+def _asset_response(info, created: bool) -> AssetResponse:
+    return AssetResponse(
+        asset_id=info.asset_id,
+        format=info.format,
+        width=info.width,
+        height=info.height,
+        size_bytes=info.size_bytes,
+        filename=info.filename,
+        created=created,
+    )
+
+
+@app.post("/api/assets", response_model=AssetResponse)
+async def upload_asset(file: UploadFile = File(...)):
+    """
+    Upload a product image.
+
+    The image is stored under the hash of its content, so uploading the same
+    file again returns the existing asset. Dimensions are read and renditions
+    generated once, here; exports never decode the upload again. Use the
+    returned ``asset_id`` as a product's ``image_id``.
+
+    Args:
+        file: The image file (JPEG, PNG, GIF, WebP, BMP or TIFF)
+
+    Returns:
+        AssetResponse: The stored image's metadata
+
+    Raises:
+        HTTPException: If the file is too large or not an accepted image
+    """
+    # Read in chunks, so an oversized upload is refused without holding all of it
+    data = bytearray()
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        data += chunk
+        if len(data) > MAX_ASSET_BYTES:
+            raise HTTPException(
+                status_code=413,
+                detail=ErrorResponse(
+                    error="Image too large",
+                    detail=f"Images may be at most {MAX_ASSET_BYTES // (1024 * 1024)} MB",
+                ).model_dump(),
+            )
+    data = bytes(data)
+    try:
+        info, created = await run_in_threadpool(assets.add, data, file.filename or "")
+    except InvalidAsset as e:
+        raise HTTPException(
+            status_code=400,
+            detail=ErrorResponse(error="Invalid image", detail=str(e)).model_dump(),
+        )
+    return _asset_response(info, created)
+
+
+@app.get("/api/assets")
+async def list_assets():
+    """List uploaded images, most recent first."""
+    return {"assets": [_asset_response(info, False) for info in assets.list_assets()]}
+
+
+@app.get("/api/assets/{asset_id}/{rendition}")
+async def get_asset(asset_id: str, rendition: str):
+    """
+    Serve an uploaded image: ``thumb`` and ``print`` renditions, or the ``original``.
+
+    Content never changes for an asset id, so responses may be cached forever.
+    """
+    try:
+        info = assets.get(asset_id)
+    except AssetNotFound:
+        raise HTTPException(
+            status_code=404,
+            detail=ErrorResponse(error="Image not found", detail=asset_id).model_dump(),
+        )
+    if rendition == "original":
+        path = assets.original_path(info)
+    elif rendition in RENDITIONS:
+        path = assets.rendition_path(info, rendition)
+    else:
+        raise HTTPException(
+            status_code=404,
+            detail=ErrorResponse(error="Unknown rendition", detail=rendition).model_dump(),
+        )
+    return FileResponse(
+        path,
+        media_type=mimetypes.guess_type(path.name)[0],
+        headers={"Cache-Control": "public, max-age=31536000, immutable"},
+    )
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """
+    Parse server options. Every option can also be set through an NSA_* variable.
+
+    Without arguments the server runs in sidecar mode: one worker on a random
+    localhost port, announced on stdout.
+    """
+    parser = argparse.ArgumentParser(description="NSAanbiedingen backend server")
+    parser.add_argument(
+        "--host",
+        default=os.environ.get("NSA_HOST", "127.0.0.1"),
+        help="Interface to listen on (use 0.0.0.0 for a shared team server)",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=int(os.environ.get("NSA_PORT", "0")),
+        help="Port to listen on (0 picks a free port)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.environ.get("NSA_WORKERS", "1")),
+        help="Number of worker processes",
+    )
+    parser.add_argument(
+        "--data-dir",
+        default=os.environ.get("NSA_DATA_DIR"),
+        help="Directory for generated PDFs and job state, shared by all workers",
+    )
+    parser.add_argument(
+        "--graceful-timeout",
+        type=float,
+        default=GRACEFUL_TIMEOUT,
+        help="Seconds to wait for in-flight jobs on shutdown",
+    )
+    parser.add_argument(
+        "--log-level",
+        default=os.environ.get("NSA_LOG_LEVEL", "info"),
+        choices=["debug", "info", "warning", "error"],
+        type=str.lower,
+        help="Minimum level of log records written to stderr",
+    )
+    parser.add_argument(
+        "--log-format",
+        default=os.environ.get("NSA_LOG_FORMAT", "text"),
+        choices=LOG_FORMATS,
+        help="Write logs as text lines or JSON lines",
+    )
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        default=os.environ.get("NSA_TRACE", "") not in ("", "0"),
+        help="Log per-job trace spans (validate, layout, render, write)",
+    )
+    return parser.parse_args(argv)
+
+
+def _app_import_string() -> str:
+    """Import string for this module's app, needed to spawn worker processes."""
+    return f"{__package__}.server:app" if __package__ else "server:app"
+
+
+def main(argv=None):
     """Entry point for the backend server."""
-    port = get_free_port()
+    global jobs, render_cache, speculator
+
+    args = parse_args(argv)
+
+    # Worker processes read their configuration from the environment
+    if args.data_dir:
+        os.environ["NSA_DATA_DIR"] = str(Path(args.data_dir).resolve())
+    os.environ["NSA_GRACEFUL_TIMEOUT"] = str(args.graceful_timeout)
+    os.environ["NSA_LOG_LEVEL"] = args.log_level
+    os.environ["NSA_LOG_FORMAT"] = args.log_format
+    os.environ["NSA_TRACE"] = "1" if args.trace else "0"
+    configure_logging(args.log_level, args.log_format)
+    enable_tracing(args.trace)
+    # Reopen the shared state in the directory given on the command line
+    jobs = open_job_store()
+    render_cache = open_render_cache()
+    speculator = SpeculativeRenderer(render_cache)
+
+    fail_orphaned_jobs(jobs)
+
+    port = args.port or get_free_port(args.host)
     announce_port(port)
 
-    logger.info(f"Starting Uvicorn server on http://127.0.0.1:{port}")
+    logger.info(
+        "Starting Uvicorn server on http://%s:%d with %d worker(s)",
+        args.host,
+        port,
+        args.workers,
+    )
 
-    # Uvicorn configuration for sidecar mode
+    # Uvicorn configuration for sidecar mode (one worker) or shared server mode.
+    # log_config=None keeps uvicorn's loggers (whose default config writes
+    # access lines to stdout) on our queue to stderr
     uvicorn.run(
-        app,
-        host="127.0.0.1",
+        app if args.workers == 1 else _app_import_string(),
+        host=args.host,
         port=port,
-        log_level="info",
+        workers=args.workers,
+        log_config=None,
+        log_level=args.log_level,
         access_log=True,
+        # A timeout of 0 means "don't wait"; only a missing value waits forever
+        timeout_graceful_shutdown=args.graceful_timeout,
     )
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Worker processes in the PyInstaller bundle
     main()
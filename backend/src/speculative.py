@@ -0,0 +1,190 @@
+"""Speculative render-ahead: pre-render edited pages in the background before export."""
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+try:
+    from .models import FolderPage, GeneratePDFRequest
+    from .pdf_generator import fragment_key, render_fragment
+    from .render_cache import RenderCache
+except ImportError:
+    from models import FolderPage, GeneratePDFRequest
+    from pdf_generator import fragment_key, render_fragment
+    from render_cache import RenderCache
+
+logger = logging.getLogger(__name__)
+
+# Niceness of the background thread (Linux applies it per thread)
+SPECULATIVE_NICENESS = 19
+
+
+class PriorityGate:
+    """
+    Lets interactive work run alone: speculative work waits while any is active.
+
+    Rendering is CPU-bound Python, so a background thread running alongside an
+    export would take GIL time from it no matter its OS priority. The gate
+    makes speculation yield completely instead.
+    """
+
+    def __init__(self):
+        self._active = 0
+        self._lock = threading.Lock()
+        self._idle = threading.Event()
+        self._idle.set()
+
+    @contextmanager
+    def interactive(self):
+        """Mark interactive work as running for the duration of the block."""
+        with self._lock:
+            self._active += 1
+            self._idle.clear()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active -= 1
+                if self._active == 0:
+                    self._idle.set()
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until no interactive work is running; False on timeout."""
+        return self._idle.wait(timeout)
+
+
+class SpeculativeRenderer:
+    """
+    Background renderer for pages the user is editing.
+
+    ``submit`` receives a client's folder as it currently is and queues every
+    page whose render is not cached yet; pages that client queued for an older
+    version of its folder are dropped, other clients' pages are kept. One
+    low-priority thread renders queued pages into the render cache, one page at
+    a time and taking clients in turn, and pauses whenever an interactive
+    export is running.
+    """
+
+    def __init__(self, cache: RenderCache):
+        self.cache = cache
+        self.gate = PriorityGate()
+        self.rendered = 0
+        self.failed = 0
+        # Per client (in the order they are served next): key -> (page, request)
+        self._pending: "OrderedDict[str, OrderedDict]" = OrderedDict()
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._in_progress = False
+        self._thread: Optional[threading.Thread] = None
+
+    def interactive(self):
+        """Context manager for interactive exports; speculation pauses meanwhile."""
+        return self.gate.interactive()
+
+    def submit(self, request: GeneratePDFRequest, client: str = "") -> Dict[str, int]:
+        """
+        Queue the pages of a folder for rendering ahead of export.
+
+        Args:
+            request: The folder and render options as an export would send them
+            client: Whose folder this is; replaces only this client's queued pages
+
+        Returns:
+            Dict[str, int]: Number of pages ``queued`` and already ``cached``
+        """
+        pending = OrderedDict()
+        cached = 0
+        for page in request.pages:
+            key = fragment_key(page, request)
+            if self.cache.contains(key):
+                cached += 1
+            else:
+                pending[key] = (page, request)
+
+        with self._condition:
+            self._pending.pop(client, None)
+            if pending:
+                self._pending[client] = pending
+                self._ensure_thread()
+                self._condition.notify()
+        return {"queued": len(pending), "cached": cached}
+
+    @property
+    def pending(self) -> int:
+        """Number of pages waiting to be rendered."""
+        with self._condition:
+            return sum(len(pages) for pages in self._pending.values())
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(
+                target=self._run, name="speculative-render", daemon=True
+            )
+            self._thread.start()
+
+    def _next(self) -> Optional[Tuple[str, FolderPage, GeneratePDFRequest]]:
+        with self._condition:
+            while not self._pending and not self._stopping:
+                self._condition.wait()
+            if self._stopping:
+                return None
+            # Take the first client's next page, then move that client to the back
+            client, pages = self._pending.popitem(last=False)
+            key, (page, request) = pages.popitem(last=False)
+            if pages:
+                self._pending[client] = pages
+            self._in_progress = True
+            return key, page, request
+
+    def _done(self) -> None:
+        with self._condition:
+            self._in_progress = False
+            self._condition.notify_all()
+
+    def _run(self) -> None:
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), SPECULATIVE_NICENESS)
+        except (AttributeError, OSError):
+            pass  # Not supported on this platform; the gate still applies
+
+        while True:
+            item = self._next()
+            if item is None:
+                return
+            # Exports first: wait for them to finish before each page
+            self.gate.wait_idle()
+            key, page, request = item
+            try:
+                if not self.cache.contains(key):
+                    self.cache.store(key, lambda path: render_fragment(page, request, path))
+                    self.rendered += 1
+            except Exception as e:
+                self.failed += 1
+                logger.warning("Speculative render of page %d failed: %s", page.page_number, e)
+            finally:
+                self._done()
+
+    def wait_until_done(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until the queue is empty (for tests and benchmarks).
+
+        Returns:
+            bool: False if pages were still pending at the timeout
+        """
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: not self._pending and not self._in_progress, timeout
+            )
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Drop queued pages and stop the background thread."""
+        with self._condition:
+            self._pending.clear()
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
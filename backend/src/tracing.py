@@ -0,0 +1,117 @@
+"""
+Per-job trace spans (validate, layout, render, write), logged as structured records.
+
+Tracing is off unless ``NSA_TRACE=1`` (or ``enable_tracing()``). While off,
+``span()`` returns a shared no-op context manager, so instrumented code pays
+one function call and a flag check per span.
+"""
+
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+trace_logger = logging.getLogger("trace")
+
+_enabled = os.environ.get("NSA_TRACE", "") not in ("", "0")
+_job_id: ContextVar[Optional[str]] = ContextVar("job_id", default=None)
+
+# ASGI scope key holding the time a request arrived (set while tracing)
+RECEIVED_KEY = "nsa.received"
+
+
+def enable_tracing(enabled: bool = True) -> None:
+    """Turn span recording on or off for this process."""
+    global _enabled
+    _enabled = enabled
+
+
+def tracing_enabled() -> bool:
+    """Whether spans are being recorded."""
+    return _enabled
+
+
+def current_job_id() -> Optional[str]:
+    """Id of the job being processed in this context, if any."""
+    return _job_id.get()
+
+
+@contextmanager
+def job_context(job_id: str):
+    """Attribute spans and log records in this block (and threads it starts) to a job."""
+    token = _job_id.set(job_id)
+    try:
+        yield
+    finally:
+        _job_id.reset(token)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("name", "fields", "start")
+
+    def __init__(self, name: str, fields: dict):
+        self.name = name
+        self.fields = fields
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        error = exc_type.__name__ if exc_type else None
+        record_span(self.name, self.start, error=error, **self.fields)
+        return False
+
+
+def span(name: str, **fields):
+    """
+    Time a block as a span of the current job.
+
+    Args:
+        name: Span name ("validate", "layout", "render", "write", ...)
+        **fields: Extra fields logged with the span
+
+    Returns:
+        A context manager; a shared no-op one while tracing is off
+    """
+    if not _enabled:
+        return _NOOP_SPAN
+    return _Span(name, fields)
+
+
+def record_span(name: str, start: float, error: Optional[str] = None, **fields) -> None:
+    """Log a span that started at ``start`` (a ``time.perf_counter()`` value) and ends now."""
+    if not _enabled:
+        return
+    ms = (time.perf_counter() - start) * 1000
+    extra = {"span": name, "ms": round(ms, 3), **fields}
+    if error:
+        extra["error"] = error
+    trace_logger.info("span %s %.3f ms", name, ms, extra=extra)
+
+
+class RequestTimer:
+    """ASGI middleware noting when each request arrived, for the "validate" span."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if _enabled and scope["type"] == "http":
+            scope[RECEIVED_KEY] = time.perf_counter()
+        await self.app(scope, receive, send)
@@ -0,0 +1,450 @@
+"""Compressed HTTP transport and resumable (byte-range) file downloads."""
+
+import zlib
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.responses import FileResponse, JSONResponse, Response, StreamingResponse
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional, gzip is always available
+    zstandard = None
+
+try:
+    from .models import ErrorResponse
+except ImportError:
+    from models import ErrorResponse
+
+# Bodies smaller than this are sent as-is; compressing them costs more than it saves
+DEFAULT_MINIMUM_SIZE = 1024
+
+# Upper bound for a decompressed request body (protects against zip bombs)
+MAX_REQUEST_BODY_BYTES = 64 * 1024 * 1024
+
+# Media types worth compressing. PDFs are left alone: fpdf2 already Flate-compresses
+# their streams, and an identity response keeps the strong ETag resumes need
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+RANGE_CHUNK_SIZE = 64 * 1024
+
+# Largest piece a compressed request body is inflated into at once
+DECODE_CHUNK_SIZE = 64 * 1024
+
+
+def supported_encodings() -> List[str]:
+    """
+    Content codings this server can decode and produce, in order of preference.
+
+    Returns:
+        List[str]: e.g. ["zstd", "gzip"]
+    """
+    return ["zstd", "gzip"] if zstandard is not None else ["gzip"]
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Pick the preferred content coding from an Accept-Encoding header.
+
+    Args:
+        accept_encoding: Raw Accept-Encoding header value
+
+    Returns:
+        Optional[str]: The chosen coding, or None to send the body uncompressed
+    """
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        token, _, params = part.strip().partition(";")
+        if not token:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[token.strip()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in supported_encodings():
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class _Compressor:
+    """Streaming compressor for a single response body."""
+
+    def __init__(self, encoding: str):
+        if encoding == "zstd":
+            self._obj = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+        else:
+            self._obj = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush()
+
+
+class _BodyTooLarge(Exception):
+    """Raised when a decompressed request body exceeds the configured limit."""
+
+
+class _BoundedDecoder:
+    """
+    Incremental request body decoder that never inflates far past ``limit`` bytes.
+
+    A few KB of gzip or zstd can expand to gigabytes, so output is produced in
+    bounded pieces and decoding stops as soon as the limit is passed.
+    """
+
+    def __init__(self, encoding: str, limit: int):
+        self.limit = limit
+        self.total = 0
+        self.chunks: List[bytes] = []
+        if encoding == "zstd":
+            # zstd's decompressobj has no output bound; its stream writer hands
+            # decoded data to write() one buffer at a time instead
+            self._zlib = None
+            self._zstd = zstandard.ZstdDecompressor().stream_writer(
+                self, write_size=DECODE_CHUNK_SIZE
+            )
+        else:
+            self._zlib = zlib.decompressobj(47)  # gzip or zlib header
+
+    def write(self, data: bytes) -> int:
+        self.total += len(data)
+        if self.total > self.limit:
+            raise _BodyTooLarge()
+        self.chunks.append(data)
+        return len(data)
+
+    def feed(self, data: bytes) -> None:
+        if self._zlib is None:
+            self._zstd.write(data)
+            return
+        while data:
+            max_length = min(DECODE_CHUNK_SIZE, self.limit - self.total + 1)
+            self.write(self._zlib.decompress(data, max_length))
+            data = self._zlib.unconsumed_tail
+
+    def finish(self) -> bytes:
+        if self._zlib is not None:
+            self.write(self._zlib.flush())
+        return b"".join(self.chunks)
+
+
+async def _read_decompressed(receive, encoding: str, limit: int) -> bytes:
+    """Read the full request body from ``receive`` and decode it incrementally."""
+    decoder = _BoundedDecoder(encoding, limit)
+    more_body = True
+    while more_body:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        more_body = message.get("more_body", False)
+        decoder.feed(message.get("body", b""))
+    return decoder.finish()
+
+
+def _error_response(status_code: int, error: str, detail: str) -> JSONResponse:
+    return JSONResponse(
+        status_code=status_code,
+        content={"detail": ErrorResponse(error=error, detail=detail).model_dump()},
+    )
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware that decodes compressed request bodies and compresses responses.
+
+    Request bodies sent with ``Content-Encoding: gzip`` or ``zstd`` are decoded before
+    they reach the endpoint. Responses are compressed with the best coding from the
+    client's Accept-Encoding once they reach ``minimum_size`` bytes. Requests carrying
+    a Range header are served uncompressed so byte offsets stay meaningful.
+    """
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = DEFAULT_MINIMUM_SIZE,
+        max_body_size: int = MAX_REQUEST_BODY_BYTES,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.max_body_size = max_body_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        content_encoding = headers.get("content-encoding", "").strip().lower()
+        if content_encoding and content_encoding != "identity":
+            if content_encoding not in supported_encodings():
+                response = _error_response(
+                    415,
+                    "Unsupported content encoding",
+                    f"Supported: {', '.join(supported_encodings())}",
+                )
+                await response(scope, receive, send)
+                return
+            try:
+                body = await _read_decompressed(
+                    receive, content_encoding, self.max_body_size
+                )
+            except _BodyTooLarge:
+                response = _error_response(
+                    413,
+                    "Request body too large",
+                    f"Decompressed body exceeds {self.max_body_size} bytes",
+                )
+                await response(scope, receive, send)
+                return
+            except Exception as e:
+                response = _error_response(400, "Invalid compressed body", str(e))
+                await response(scope, receive, send)
+                return
+            scope, receive = _replace_body(scope, body)
+
+        encoding = None
+        if "range" not in headers:
+            encoding = negotiate_encoding(headers.get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressingResponder(self.app, encoding, self.minimum_size)
+        await responder(scope, receive, send)
+
+
+def _replace_body(scope, body: bytes):
+    """Return a scope and receive callable that replay an already decoded body."""
+    raw_headers = [
+        (name, value)
+        for name, value in scope["headers"]
+        if name not in (b"content-encoding", b"content-length")
+    ]
+    raw_headers.append((b"content-length", str(len(body)).encode("latin-1")))
+    scope = dict(scope, headers=raw_headers)
+
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            return {"type": "http.disconnect"}
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    return scope, receive
+
+
+class _CompressingResponder:
+    """Wraps ``send`` to compress a response body on the fly."""
+
+    def __init__(self, app, encoding: str, minimum_size: int):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.send = None
+        self.initial_message = None
+        self.started = False
+        self.passthrough = False
+        self.compressor: Optional[_Compressor] = None
+
+    async def __call__(self, scope, receive, send):
+        self.send = send
+        await self.app(scope, receive, self.send_with_compression)
+
+    def _should_compress(self, headers: MutableHeaders) -> bool:
+        if "content-encoding" in headers or "content-range" in headers:
+            return False
+        if self.initial_message["status"] in (204, 206, 304):
+            return False
+        media_type = headers.get("content-type", "")
+        if not media_type.startswith(COMPRESSIBLE_TYPES):
+            return False
+        content_length = headers.get("content-length")
+        if content_length is not None and int(content_length) < self.minimum_size:
+            return False
+        return True
+
+    async def send_with_compression(self, message):
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            self.initial_message = message
+            return
+
+        if message_type != "http.response.body":
+            await self.send(message)
+            return
+
+        if self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if not self.started:
+            self.started = True
+            headers = MutableHeaders(raw=self.initial_message["headers"])
+            if not self._should_compress(headers) or (
+                not more_body and len(body) < self.minimum_size
+            ):
+                self.passthrough = True
+                await self.send(self.initial_message)
+                await self.send(message)
+                return
+
+            self.compressor = _Compressor(self.encoding)
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if "etag" in headers:
+                # The representation changed, so a strong validator no longer applies
+                headers["ETag"] = "W/" + headers["etag"].removeprefix("W/")
+
+            data = self.compressor.compress(body)
+            if not more_body:
+                data += self.compressor.flush()
+                headers["Content-Length"] = str(len(data))
+            elif "content-length" in headers:
+                del headers["Content-Length"]
+            await self.send(self.initial_message)
+            await self.send(
+                {"type": "http.response.body", "body": data, "more_body": more_body}
+            )
+            return
+
+        data = self.compressor.compress(body)
+        if not more_body:
+            data += self.compressor.flush()
+        await self.send(
+            {"type": "http.response.body", "body": data, "more_body": more_body}
+        )
+
+
+def _file_validators(path: Path) -> Tuple[str, str, int]:
+    stat = path.stat()
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    last_modified = formatdate(stat.st_mtime, usegmt=True)
+    return etag, last_modified, stat.st_size
+
+
+def _parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single ``bytes=`` range against a file of ``size`` bytes.
+
+    Returns:
+        Optional[Tuple[int, int]]: Inclusive (start, end) offsets, or None if the
+        header should be ignored (multiple ranges or another unit)
+
+    Raises:
+        ValueError: If the range is malformed or not satisfiable
+    """
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    start_str, sep, end_str = spec.strip().partition("-")
+    if not sep:
+        raise ValueError("malformed range")
+    if not start_str:
+        # Suffix range: the last N bytes
+        length = int(end_str)
+        if length <= 0:
+            raise ValueError("empty suffix range")
+        return max(size - length, 0), size - 1
+
+    start = int(start_str)
+    end = int(end_str) if end_str else size - 1
+    if start >= size or end < start:
+        raise ValueError("range not satisfiable")
+    return start, min(end, size - 1)
+
+
+def _if_range_matches(if_range: str, etag: str, last_modified: str) -> bool:
+    if if_range.startswith(('"', "W/")):
+        return if_range == etag
+    try:
+        return parsedate_to_datetime(if_range) >= parsedate_to_datetime(last_modified)
+    except (TypeError, ValueError):
+        return False
+
+
+def _iter_file_range(path: Path, start: int, end: int) -> Iterator[bytes]:
+    # A plain generator: StreamingResponse iterates it in a threadpool, keeping
+    # the file reads off the event loop
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(RANGE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def ranged_file_response(
+    request: Request, path: Path, media_type: str, filename: str
+) -> Response:
+    """
+    Serve a file with support for HTTP range requests so downloads can resume.
+
+    Args:
+        request: The incoming request (Range and If-Range headers are honoured)
+        path: File to serve
+        media_type: Content type of the file
+        filename: Download filename for Content-Disposition
+
+    Returns:
+        Response: 200 with the full file, 206 with the requested range, or 416
+    """
+    etag, last_modified, size = _file_validators(path)
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Last-Modified": last_modified,
+    }
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (
+        if_range is None or _if_range_matches(if_range, etag, last_modified)
+    ):
+        try:
+            byte_range = _parse_range(range_header, size)
+        except ValueError:
+            return Response(
+                status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"}
+            )
+        if byte_range is not None:
+            start, end = byte_range
+            headers.update(
+                {
+                    "Content-Range": f"bytes {start}-{end}/{size}",
+                    "Content-Length": str(end - start + 1),
+                    "Content-Disposition": f'attachment; filename="{filename}"',
+                }
+            )
+            return StreamingResponse(
+                _iter_file_range(path, start, end),
+                status_code=206,
+                media_type=media_type,
+                headers=headers,
+            )
+
+    return FileResponse(path=path, media_type=media_type, filename=filename, headers=headers)
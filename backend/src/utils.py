@@ -1,22 +1,30 @@
 """Utility functions for the backend server."""
 
+import logging
+import os
+import shutil
 import socket
 import sys
 import tempfile
 from pathlib import Path
 from typing import Optional
 
+logger = logging.getLogger(__name__)
 
-def get_free_port() -> int:
+
+def get_free_port(host: str = "127.0.0.1") -> int:
     """
     Bind to port 0 to get OS-assigned ephemeral port.
 
+    Args:
+        host: Interface the server will listen on
+
     Returns:
         int: The port number assigned by the OS
     """
     sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     try:
-        sock.bind(("127.0.0.1", 0))
+        sock.bind((host, 0))
         port = sock.getsockname()[1]
         return port
     finally:
@@ -34,18 +42,124 @@ def announce_port(port: int) -> None:
     sys.stdout.flush()  # Critical: Force immediate stdout flush
 
 
+def get_rss_bytes() -> int:
+    """
+    Current resident set size of this process.
+
+    Uses psutil when available, /proc on Linux, and falls back to the peak RSS
+    reported by the resource module elsewhere.
+
+    Returns:
+        int: Resident memory in bytes
+    """
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+
+    try:
+        import resource
+    except ImportError:  # Windows without psutil
+        return 0
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def pid_alive(pid: Optional[int]) -> bool:
+    """
+    Whether a process with this PID is still running.
+
+    Uses psutil when available, signal 0 on POSIX, and the process exit code
+    on Windows (where ``os.kill`` would terminate the process instead).
+
+    Args:
+        pid: Process ID, or None if unknown
+
+    Returns:
+        bool: False if the process has exited or the PID is unknown
+    """
+    if not pid or pid < 0:
+        return False
+
+    try:
+        import psutil
+
+        return psutil.pid_exists(pid)
+    except ImportError:
+        pass
+
+    if sys.platform == "win32":
+        import ctypes
+
+        process_query_limited_information = 0x1000
+        still_active = 259
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(process_query_limited_information, False, pid)
+        if not handle:
+            return False
+        try:
+            exit_code = ctypes.c_ulong()
+            kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+            return exit_code.value == still_active
+        finally:
+            kernel32.CloseHandle(handle)
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:  # Alive, but owned by another user
+        return True
+    return True
+
+
 def get_temp_pdf_dir() -> Path:
     """
     Get or create a temporary directory for PDF files.
 
+    ``NSA_DATA_DIR`` overrides the location, so all worker processes of a
+    shared server use the same output directory.
+
     Returns:
         Path: The temporary directory path
     """
-    temp_dir = Path(tempfile.gettempdir()) / "nsaanbiedingen_pdfs"
+    data_dir = os.environ.get("NSA_DATA_DIR")
+    if data_dir:
+        temp_dir = Path(data_dir)
+    else:
+        temp_dir = Path(tempfile.gettempdir()) / "nsaanbiedingen_pdfs"
     temp_dir.mkdir(parents=True, exist_ok=True)
     return temp_dir
 
 
+def get_project_dir() -> Path:
+    """
+    Get or create the directory where folder projects are saved.
+
+    Unlike generated PDFs, projects must survive restarts and temp cleanup, so
+    they live in the user's home directory unless ``NSA_PROJECT_DIR`` is set.
+
+    Returns:
+        Path: The project directory path
+    """
+    project_dir = os.environ.get("NSA_PROJECT_DIR")
+    if project_dir:
+        path = Path(project_dir)
+    else:
+        path = Path.home() / ".nsaanbiedingen" / "projects"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
 def cleanup_temp_files(max_age_hours: int = 24) -> None:
     """
     Clean up temporary PDF files older than max_age_hours.
@@ -66,6 +180,12 @@ def cleanup_temp_files(max_age_hours: int = 24) -> None:
         if (now - pdf_file.stat().st_mtime) > max_age_seconds:
             try:
                 pdf_file.unlink()
-                print(f"Cleaned up old PDF: {pdf_file.name}")
+                logger.info("Cleaned up old PDF: %s", pdf_file.name)
             except Exception as e:
-                print(f"Failed to clean up {pdf_file.name}: {e}")
+                logger.warning("Failed to clean up %s: %s", pdf_file.name, e)
+
+    # PNG/HTML outputs of multi-format jobs live in a directory per job
+    for output_dir in temp_dir.glob("*-*-*-*-*"):
+        if output_dir.is_dir() and (now - output_dir.stat().st_mtime) > max_age_seconds:
+            shutil.rmtree(output_dir, ignore_errors=True)
+            logger.info("Cleaned up old outputs: %s", output_dir.name)
@@ -1,8 +1,36 @@
 """Pytest configuration for backend tests."""
 
+import atexit
+import os
+import shutil
 import sys
+import tempfile
 from pathlib import Path
 
+import pytest
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
 # Add the backend directory to the Python path so imports work correctly
 backend_dir = Path(__file__).parent.parent
 sys.path.insert(0, str(backend_dir))
+
+# Projects and uploaded images go to a throwaway directory, not the user's home
+# (importing the server opens its stores)
+os.environ["NSA_PROJECT_DIR"] = tempfile.mkdtemp(prefix="nsa-test-projects-")
+atexit.register(shutil.rmtree, os.environ["NSA_PROJECT_DIR"], ignore_errors=True)
+
+
+@pytest.fixture
+def few_file_descriptors():
+    """Let the process open only 48 more files while the test runs."""
+    if resource is None or not os.path.isdir("/proc/self/fd"):
+        pytest.skip("needs RLIMIT_NOFILE and /proc")
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    in_use = len(os.listdir("/proc/self/fd"))
+    resource.setrlimit(resource.RLIMIT_NOFILE, (in_use + 48, hard))
+    yield
+    resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
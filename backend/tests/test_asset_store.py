@@ -0,0 +1,146 @@
+"""Tests for the content-addressed product image store."""
+
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from src import folder_layout, server
+from src.asset_store import AssetStore, InvalidAsset
+from src.models import GeneratePDFRequest
+from src.pdf_generator import generate_pdf_report
+from src.renderers import generate_outputs
+
+
+def _image_bytes(size=(400, 300), color=(200, 30, 30), image_format="JPEG", **save) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, image_format, **save)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def assets(tmp_path, monkeypatch):
+    """Use a throwaway store for uploads and exports."""
+    store = AssetStore(tmp_path / "assets")
+    monkeypatch.setattr(server, "assets", store)
+    monkeypatch.setattr(folder_layout, "get_asset_store", lambda: store)
+    yield store
+    store.close()
+
+
+def _folder(image_id: str, products: int = 200) -> GeneratePDFRequest:
+    return GeneratePDFRequest(
+        pages=[
+            {
+                "page_number": page,
+                "products": [
+                    {"id": f"{page}-{i}", "name": "Tomaten", "price": 1.99, "image_id": image_id}
+                    for i in range(products // 10)
+                ],
+            }
+            for page in range(1, 11)
+        ]
+    )
+
+
+def test_identical_uploads_are_stored_once(tmp_path):
+    """Test that content is stored once, with metadata and renditions from upload."""
+    store = AssetStore(tmp_path / "assets")
+    data = _image_bytes(size=(3000, 1000))
+
+    info, created = store.add(data, "tomaten.jpg")
+    again, created_again = store.add(data, "andere-naam.jpg")
+
+    assert created and not created_again
+    assert again == info
+    assert (info.format, info.width, info.height) == ("JPEG", 3000, 1000)
+    assert store.original_path(info).read_bytes() == data
+    with Image.open(store.rendition_path(info, "print")) as rendition:
+        assert rendition.size == (2000, 667)
+    with Image.open(store.rendition_path(info, "thumb")) as thumb:
+        assert thumb.size == (256, 85)
+    assert len(list((tmp_path / "assets" / "originals").rglob("*"))) == 2  # dir + file
+
+    # Metadata survives reopening, without decoding the image again
+    assert AssetStore(tmp_path / "assets").get(info.asset_id) == info
+
+
+def test_exif_orientation_applied(tmp_path):
+    """Test that dimensions and renditions are upright for rotated photos."""
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Rotated 90 degrees
+    data = _image_bytes(size=(400, 300), exif=exif.tobytes())
+
+    info, _ = AssetStore(tmp_path).add(data)
+
+    assert (info.width, info.height) == (300, 400)
+
+
+def test_rejects_non_images(tmp_path):
+    """Test that uploads which are not images are refused."""
+    with pytest.raises(InvalidAsset):
+        AssetStore(tmp_path).add(b"%PDF-1.4 not an image")
+
+
+def test_metadata_cache_is_bounded(tmp_path):
+    """Test that only the most recently used image metadata stays in memory."""
+    store = AssetStore(tmp_path / "assets", info_cache_size=2)
+    ids = [store.add(_image_bytes(color=(i, 0, 0)))[0].asset_id for i in range(3)]
+    assert list(store._info) == ids[1:]
+
+    store.get(ids[0])  # Read back from SQLite
+    assert list(store._info) == [ids[2], ids[0]]
+
+
+def test_shared_image_embedded_once(tmp_path, assets):
+    """Test that an image on 200 products is embedded once and originals are not read."""
+    info, _ = assets.add(_image_bytes(image_format="PNG"))
+    assets.original_path(info).unlink()
+
+    output_path = tmp_path / "folder.pdf"
+    generate_pdf_report(_folder(info.asset_id), output_path)
+
+    assert output_path.read_bytes().count(b"/Subtype /Image") == 1
+
+    outputs = generate_outputs(
+        _folder(info.asset_id).model_copy(update={"formats": ["html"]}), tmp_path / "job.pdf"
+    )
+    html = outputs["html"][0].read_text(encoding="utf-8")
+    assert html.count(f'src="{info.asset_id}.jpg"') == 200
+    assert [path.name for path in outputs["html"][1:]] == [f"{info.asset_id}.jpg"]
+
+
+def test_upload_endpoint(assets):
+    """Test uploading, serving and exporting with an uploaded image."""
+    client = TestClient(server.app)
+    data = _image_bytes(image_format="PNG")
+
+    uploaded = client.post("/api/assets", files={"file": ("kaas.png", data, "image/png")}).json()
+    assert uploaded["created"] is True
+    assert uploaded["filename"] == "kaas.png"
+    again = client.post("/api/assets", files={"file": ("kaas.png", data, "image/png")}).json()
+    assert again["asset_id"] == uploaded["asset_id"] and again["created"] is False
+
+    thumb = client.get(f"/api/assets/{uploaded['asset_id']}/thumb")
+    assert thumb.status_code == 200
+    assert "immutable" in thumb.headers["cache-control"]
+    assert client.get(f"/api/assets/{uploaded['asset_id']}/original").content == data
+
+    folder = _folder(uploaded["asset_id"], products=10).model_dump()
+    assert client.post("/api/generate", json=folder).json()["success"] is True
+    bad = client.post("/api/assets", files={"file": ("x.txt", b"hello", "text/plain")})
+    assert bad.status_code == 400
+
+
+def test_oversized_upload_is_refused(assets, monkeypatch):
+    """Test that an upload over the size limit is refused while it is being read."""
+    monkeypatch.setattr(server, "MAX_ASSET_BYTES", 100 * 1024)
+    monkeypatch.setattr(server, "UPLOAD_CHUNK_SIZE", 16 * 1024)
+    data = bytes(300 * 1024)
+
+    response = TestClient(server.app).post(
+        "/api/assets", files={"file": ("huge.png", data, "image/png")}
+    )
+    assert response.status_code == 413
+    assert assets.list_assets() == []
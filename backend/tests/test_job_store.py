@@ -0,0 +1,149 @@
+"""Tests for the shared job store and server mode options."""
+
+import multiprocessing
+import os
+from pathlib import Path
+
+import pytest
+
+from src import server
+from src.job_store import JobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Create a job store in a throwaway directory."""
+    return JobStore(tmp_path / "jobs.sqlite3")
+
+
+def test_job_store_roundtrip(store, tmp_path):
+    """Test jobs behave like the dict entries they replace."""
+    pdf_path = tmp_path / "a.pdf"
+    store["a"] = {"status": "completed", "path": pdf_path, "size_kb": 12}
+
+    assert "a" in store
+    assert "missing" not in store
+    assert store["a"]["status"] == "completed"
+    assert store["a"]["path"] == pdf_path
+    assert store["a"]["size_kb"] == 12
+    assert len(store) == 1
+
+    del store["a"]
+    assert len(store) == 0
+    with pytest.raises(KeyError):
+        store["a"]
+
+
+def test_job_store_shared_between_instances(tmp_path):
+    """Test a job written through one worker's store is visible through another's."""
+    first = JobStore(tmp_path / "jobs.sqlite3")
+    second = JobStore(tmp_path / "jobs.sqlite3")
+
+    first["job"] = {"status": "running", "path": None, "worker_pid": 1}
+    assert second["job"]["status"] == "running"
+
+    second["job"] = {"status": "completed", "path": Path("/x.pdf"), "size_kb": 3}
+    assert first["job"]["status"] == "completed"
+
+
+def test_job_store_order_and_active_jobs(store):
+    """Test iteration order and filtering of active jobs by worker."""
+    store["one"] = {"status": "completed", "path": None}
+    store["two"] = {"status": "running", "path": None, "worker_pid": 100}
+    store["three"] = {"status": "running", "path": None, "worker_pid": 200}
+
+    assert list(store) == ["one", "two", "three"]
+    assert [job_id for job_id, _ in store.items()] == ["one", "two", "three"]
+    assert sorted(store.active_jobs()) == ["three", "two"]
+    assert store.active_jobs(worker_pid=100) == ["two"]
+
+
+def test_job_store_prune(store):
+    """Test that old job records are forgotten."""
+    store["old"] = {"status": "completed", "path": None}
+    assert store.prune(max_age_hours=1) == 0
+    assert store.prune(max_age_hours=-1) == 1
+    assert len(store) == 0
+
+
+def test_shutdown_fails_interrupted_jobs(store, monkeypatch):
+    """Test shutdown marks this worker's unfinished jobs as failed."""
+    monkeypatch.setattr(server, "jobs", store)
+    store["mine"] = {"status": "running", "path": None, "worker_pid": os.getpid()}
+    store["other"] = {"status": "running", "path": None, "worker_pid": -1}
+
+    server.fail_interrupted_jobs()
+
+    assert store["mine"]["status"] == "failed"
+    assert store["other"]["status"] == "running"
+
+
+def test_parse_args_defaults_to_sidecar_mode(monkeypatch):
+    """Test that without options the server keeps sidecar defaults."""
+    for name in ("NSA_HOST", "NSA_PORT", "NSA_WORKERS", "NSA_DATA_DIR"):
+        monkeypatch.delenv(name, raising=False)
+    args = server.parse_args([])
+    assert args.host == "127.0.0.1"
+    assert args.port == 0
+    assert args.workers == 1
+    assert args.data_dir is None
+
+    args = server.parse_args(["--host", "0.0.0.0", "--port", "8000", "--workers", "4"])
+    assert (args.host, args.port, args.workers) == ("0.0.0.0", 8000, 4)
+
+
+def test_startup_fails_only_orphaned_jobs(store):
+    """Test the startup sweep leaves jobs of live workers in other instances running."""
+    dead = multiprocessing.Process(target=int)
+    dead.start()
+    dead.join()
+    store["crashed"] = {"status": "running", "path": None, "worker_pid": dead.pid}
+    store["legacy"] = {"status": "running", "path": None}
+    store["alive"] = {"status": "running", "path": None, "worker_pid": os.getpid()}
+    store["done"] = {"status": "completed", "path": None, "worker_pid": dead.pid}
+
+    assert server.fail_orphaned_jobs(store) == 2
+
+    assert store["crashed"]["status"] == "failed"
+    assert store["legacy"]["status"] == "failed"
+    assert store["alive"]["status"] == "running"
+    assert store["done"]["status"] == "completed"
+
+
+@pytest.fixture
+def run_main(tmp_path, monkeypatch):
+    """Run ``server.main`` on a throwaway data dir without starting uvicorn."""
+    for name in (
+        "NSA_DATA_DIR",
+        "NSA_GRACEFUL_TIMEOUT",
+        "NSA_LOG_LEVEL",
+        "NSA_LOG_FORMAT",
+        "NSA_TRACE",
+    ):
+        monkeypatch.setenv(name, "")
+    for name in ("jobs", "render_cache", "speculator"):
+        monkeypatch.setattr(server, name, getattr(server, name))
+    options = {}
+    monkeypatch.setattr(server.uvicorn, "run", lambda app, **kwargs: options.update(kwargs))
+
+    def run(*argv):
+        server.main(["--port", "8123", "--data-dir", str(tmp_path), *argv])
+        return options
+
+    return run
+
+
+@pytest.mark.parametrize("timeout", ["0", "0.5", "30"])
+def test_main_passes_graceful_timeout_through(timeout, run_main):
+    """Test that short graceful timeouts reach uvicorn as given instead of "wait forever"."""
+    options = run_main("--graceful-timeout", timeout)
+    assert options["timeout_graceful_shutdown"] == float(timeout)
+
+
+def test_main_keeps_shared_state_in_data_dir(tmp_path, run_main):
+    """Test that jobs and pre-rendered pages move to the directory given with --data-dir."""
+    run_main()
+
+    assert server.jobs.db_path.parent == tmp_path.resolve()
+    assert server.render_cache.cache_dir.parent == tmp_path.resolve()
+    assert server.speculator.cache is server.render_cache
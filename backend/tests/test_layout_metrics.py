@@ -0,0 +1,111 @@
+"""Tests for precomputed layout metrics and page formats."""
+
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+from src import layout_metrics
+from src.layout_metrics import get_layout_metrics, page_size, precompute_all
+from src.models import GeneratePDFRequest
+from src.pdf_generator import generate_pdf_report
+from src.pdf_optimizer import pikepdf
+from src.server import app
+
+
+def test_a4_metrics_match_classic_layout():
+    """Test A4 keeps the original margins, columns and card sizes."""
+    grid = get_layout_metrics("A4", "portrait", "grid")
+    assert (grid.content_x, grid.column_width, grid.row_pitch) == (15, 90, 60)
+    assert (grid.card_width, grid.card_height, grid.content_bottom) == (85, 55, 277)
+
+    listing = get_layout_metrics("A4", "landscape", "list")
+    assert (listing.card_width, listing.card_height, listing.row_pitch) == (267, 35, 40)
+
+    featured = get_layout_metrics("A4", "portrait", "featured")
+    assert (featured.featured_width, featured.featured_height, featured.featured_pitch) == (
+        180,
+        80,
+        85,
+    )
+
+
+def test_metrics_are_computed_once():
+    """Test every combination is cached per process."""
+    assert precompute_all() == 24
+    assert get_layout_metrics("A3", "landscape", "grid") is get_layout_metrics(
+        "A3", "landscape", "grid"
+    )
+
+
+def test_custom_formats_share_bounded_cache():
+    """Test that spellings of one custom size share a cache entry, and the cache is bounded."""
+    layout_metrics._compute_metrics.cache_clear()
+    metrics = get_layout_metrics("100x200", "portrait", "grid")
+    assert get_layout_metrics("100.0x200", "portrait", "grid") is metrics
+    assert get_layout_metrics("200x100", "portrait", "grid") is metrics
+    assert get_layout_metrics("210x297", "portrait", "grid").page_format == "A4"
+    assert metrics.page_format == "100x200"
+
+    for side in range(100, 100 + 2 * layout_metrics.METRICS_CACHE_SIZE):
+        get_layout_metrics(f"{side}x{side}", "portrait", "grid")
+    info = layout_metrics._compute_metrics.cache_info()
+    assert info.currsize == info.maxsize == layout_metrics.METRICS_CACHE_SIZE
+
+
+def test_custom_page_formats():
+    """Test custom sizes in mm and their bounds."""
+    assert page_size("100x150") == (100, 150)
+    assert page_size("150x100") == (100, 150)
+    with pytest.raises(ValueError):
+        page_size("10x10")
+    with pytest.raises(ValueError):
+        page_size("B5")
+
+
+def test_page_format_is_validated_and_normalized():
+    """Test the request option accepts any spelling and rejects unknown formats."""
+    assert GeneratePDFRequest(pages=[], page_format="letter").page_format == "Letter"
+    with pytest.raises(ValidationError):
+        GeneratePDFRequest(pages=[], page_format="Tabloid")
+
+    response = TestClient(app).post(
+        "/api/generate",
+        json={"pages": [{"page_number": 1}], "page_format": "5000x5000"},
+    )
+    assert response.status_code == 422
+
+
+@pytest.mark.skipif(pikepdf is None, reason="pikepdf not installed")
+@pytest.mark.parametrize(
+    "page_format, orientation, expected",
+    [
+        ("A3", "portrait", (297, 420)),
+        ("A5", "landscape", (210, 148)),
+        ("120x180", "portrait", (120, 180)),
+    ],
+)
+def test_pdf_uses_requested_page_format(tmp_path, page_format, orientation, expected):
+    """Test generated pages have the requested size."""
+    request = GeneratePDFRequest(
+        pages=[
+            {
+                "page_number": 1,
+                "products": [
+                    {"id": str(i), "name": f"Product {i}", "price": 1.0} for i in range(9)
+                ],
+            }
+        ],
+        page_format=page_format,
+        orientation=orientation,
+        compression="fast",
+    )
+    output_path = tmp_path / "format.pdf"
+    generate_pdf_report(request, output_path)
+
+    with pikepdf.open(output_path) as document:
+        assert len(document.pages) > 1
+        sizes = {
+            tuple(round(float(side) * 25.4 / 72) for side in page.mediabox[2:])
+            for page in document.pages
+        }
+    assert sizes == {expected}
@@ -0,0 +1,155 @@
+"""Tests for queue-based structured logging and per-job trace spans."""
+
+import json
+import logging
+import os
+import queue
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from src import server, tracing
+from src.logging_config import DeferredQueueHandler, StructuredFormatter
+from src.tracing import enable_tracing, job_context, span
+
+SERVER_SCRIPT = Path(__file__).parent.parent / "src" / "server.py"
+
+FOLDER = {
+    "pages": [
+        {"page_number": 1, "products": [{"id": "kaas", "name": "Kaas", "price": 4.5}]}
+    ]
+}
+
+
+@pytest.fixture
+def tracing_on():
+    enable_tracing(True)
+    yield
+    enable_tracing(False)
+
+
+def _spans(caplog):
+    return [r for r in caplog.records if r.name == "trace"]
+
+
+def test_disabled_spans_are_shared_noops(caplog):
+    """Test that spans are shared no-ops while tracing is off."""
+    enable_tracing(False)
+    caplog.set_level(logging.INFO, logger="trace")
+
+    assert span("layout") is span("render", pages=3)
+    with span("layout"):
+        pass
+    assert _spans(caplog) == []
+
+
+def test_spans_carry_job_id_and_fields(caplog, tracing_on):
+    """Test that spans log their duration, fields, job and errors."""
+    caplog.set_level(logging.INFO, logger="trace")
+
+    with job_context("job-1"):
+        with span("layout", pages=3):
+            pass
+        with pytest.raises(ValueError):
+            with span("render"):
+                raise ValueError("boom")
+
+    layout, render = _spans(caplog)
+    assert (layout.span, layout.job_id, layout.pages) == ("layout", "job-1", 3)
+    assert layout.ms >= 0
+    assert (render.span, render.error) == ("render", "ValueError")
+    assert tracing.current_job_id() is None
+
+
+def test_generate_traces_every_stage(caplog, tracing_on):
+    """Test that an export logs validate, layout, render and write spans for its job."""
+    caplog.set_level(logging.INFO, logger="trace")
+    client = TestClient(server.app)
+
+    job_id = client.post("/api/generate", json={**FOLDER, "formats": ["pdf", "html"]}).json()[
+        "job_id"
+    ]
+
+    spans = [(r.span, getattr(r, "format", None)) for r in _spans(caplog) if r.job_id == job_id]
+    assert ("validate", None) in spans
+    assert ("layout", None) in spans
+    assert ("render", "pdf") in spans
+    assert ("write", "pdf") in spans
+    assert ("render", "html") in spans
+
+
+def test_json_formatter_includes_fields():
+    """Test that JSON lines hold the message and extra fields."""
+    record = logging.LogRecord("trace", logging.INFO, __file__, 1, "span %s", ("layout",), None)
+    record.job_id = "job-1"
+    record.ms = 1.5
+
+    entry = json.loads(StructuredFormatter("json").format(record))
+
+    assert entry["msg"] == "span layout"
+    assert (entry["logger"], entry["job_id"], entry["ms"]) == ("trace", "job-1", 1.5)
+
+
+def test_queued_records_keep_call_site_state():
+    """Test that messages are rendered when logged, not when the writer gets to them."""
+    log_queue = queue.Queue()
+    test_logger = logging.getLogger("test.deferred")
+    test_logger.propagate = False
+    test_logger.addHandler(DeferredQueueHandler(log_queue))
+    try:
+        job = {"status": "running"}
+        test_logger.warning("job %s", job, extra={"job_id": "job-1"})
+        job["status"] = "failed"
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            test_logger.exception("export failed")
+    finally:
+        test_logger.handlers.clear()
+        test_logger.propagate = True
+
+    logged, failed = log_queue.get_nowait(), log_queue.get_nowait()
+    assert logged.args is None
+    entry = json.loads(StructuredFormatter("json").format(logged))
+    assert (entry["msg"], entry["job_id"]) == ("job {'status': 'running'}", "job-1")
+
+    assert failed.exc_info is None
+    text = StructuredFormatter().format(failed)
+    assert "export failed" in text and "ValueError: boom" in text
+    assert "ValueError: boom" in json.loads(StructuredFormatter("json").format(failed))["exc"]
+
+
+def test_stdout_reserved_for_port_handshake(tmp_path):
+    """Test that the server writes only SERVER_PORT to stdout, and logs to stderr."""
+    env = dict(os.environ, NSA_DATA_DIR=str(tmp_path), NSA_PROJECT_DIR=str(tmp_path / "p"))
+    process = subprocess.Popen(
+        [sys.executable, str(SERVER_SCRIPT), "--trace", "--log-format", "json"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        env=env,
+        text=True,
+    )
+    try:
+        announcement = process.stdout.readline().strip()
+        assert announcement.startswith("SERVER_PORT=")
+        base_url = f"http://127.0.0.1:{announcement.split('=')[1]}"
+        for _ in range(100):
+            try:
+                httpx.get(f"{base_url}/health", timeout=1.0)
+                break
+            except httpx.HTTPError:
+                time.sleep(0.1)
+        assert httpx.post(f"{base_url}/api/generate", json=FOLDER, timeout=60).json()["success"]
+    finally:
+        process.terminate()
+        stdout, stderr = process.communicate(timeout=30)
+
+    assert stdout == ""
+    entries = [json.loads(line) for line in stderr.splitlines() if line.startswith("{")]
+    assert {"validate", "layout", "render", "write"} <= {e.get("span") for e in entries}
+    assert any(e["logger"] == "uvicorn.access" for e in entries)
@@ -0,0 +1,112 @@
+"""Tests for memory-bounded (segmented) rendering."""
+
+import pytest
+
+from src import pdf_generator, pdf_optimizer
+from src.models import GeneratePDFRequest
+from src.pdf_optimizer import pikepdf
+
+pytestmark = pytest.mark.skipif(pikepdf is None, reason="pikepdf not installed")
+
+
+def _request(page_count: int, **options) -> GeneratePDFRequest:
+    return GeneratePDFRequest(
+        pages=[
+            {
+                "page_number": page,
+                "title": f"Pagina {page}",
+                "background_color": "#fff4e0",
+                "products": [
+                    {
+                        "id": f"prod-{page}-{i}",
+                        "name": "Jonge kaas",
+                        "price": 3.49,
+                        "description": "Belegen, per 500 gram",
+                    }
+                    for i in range(4)
+                ],
+            }
+            for page in range(1, page_count + 1)
+        ],
+        low_memory=True,
+        **options,
+    )
+
+
+def _page_text(document, index: int) -> bytes:
+    page = document.pages[index]
+    page.contents_coalesce()
+    return page.obj.Contents.read_bytes()
+
+
+def test_segmented_output_matches_page_count_and_numbering(tmp_path):
+    """Test segments are joined in order with document-wide page numbers."""
+    output_path = tmp_path / "segmented.pdf"
+    pdf_generator.generate_pdf_report(_request(120), output_path)
+
+    with pikepdf.open(output_path) as document:
+        assert len(document.pages) == 120
+        assert b"(Pagina 1/120)" in _page_text(document, 0)
+        assert b"(Pagina 51/120)" in _page_text(document, 50)
+        assert b"(Pagina 120/120)" in _page_text(document, 119)
+
+    # Spill files are removed once the PDF is assembled
+    assert [p.name for p in tmp_path.iterdir()] == ["segmented.pdf"]
+
+
+def test_rss_ceiling_forces_earlier_spills(tmp_path, monkeypatch):
+    """Test that exceeding the RSS ceiling spills, but never below SEGMENT_MIN_PAGES."""
+    monkeypatch.setattr(pdf_generator, "get_rss_bytes", lambda: 10 * 1024**3)
+    segments = []
+    original = pdf_generator.assemble_segments
+
+    def spy(segment_paths, *args, **kwargs):
+        segments.extend(segment_paths)
+        return original(segment_paths, *args, **kwargs)
+
+    monkeypatch.setattr(pdf_generator, "assemble_segments", spy)
+    pdf_generator.generate_pdf_report(_request(25, max_rss_mb=64), tmp_path / "out.pdf")
+
+    assert pdf_generator.SEGMENT_MIN_PAGES == 10
+    assert len(segments) == 3
+
+
+def test_many_segments_stay_within_file_limit(tmp_path, monkeypatch, few_file_descriptors):
+    """Test that assembly merges in batches instead of opening every segment at once."""
+    monkeypatch.setattr(pdf_generator, "get_rss_bytes", lambda: 10 * 1024**3)
+    monkeypatch.setattr(pdf_generator, "SEGMENT_MIN_PAGES", 1)
+    monkeypatch.setattr(pdf_optimizer, "MERGE_BATCH_SIZE", 8)
+    output_path = tmp_path / "out.pdf"
+
+    pdf_generator.generate_pdf_report(_request(100, max_rss_mb=64), output_path)
+
+    with pikepdf.open(output_path) as document:
+        assert len(document.pages) == 100
+        assert b"(Pagina 1/100)" in _page_text(document, 0)
+        assert b"(Pagina 57/100)" in _page_text(document, 56)
+        assert b"(Pagina 100/100)" in _page_text(document, 99)
+    assert [p.name for p in tmp_path.iterdir()] == ["out.pdf"]
+
+
+def test_2000_page_folder_renders_in_bounded_memory(tmp_path, monkeypatch):
+    """Test that memory stays flat while a 2000-page folder is rendered."""
+    samples = []
+    measure = pdf_generator.get_rss_bytes
+
+    def sampling_rss():
+        rss = measure()
+        samples.append(rss)
+        return rss
+
+    monkeypatch.setattr(pdf_generator, "get_rss_bytes", sampling_rss)
+    output_path = tmp_path / "large.pdf"
+    pdf_generator.generate_pdf_report(_request(2000, max_rss_mb=1024), output_path)
+
+    with pikepdf.open(output_path) as document:
+        assert len(document.pages) == 2000
+        assert b"(Pagina 2000/2000)" in _page_text(document, 1999)
+
+    # Skip the first segment while allocator arenas warm up
+    steady = samples[pdf_generator.SEGMENT_MAX_PAGES:]
+    growth_mb = (max(steady) - min(steady)) / 1024**2
+    assert growth_mb < 16, f"RSS grew {growth_mb:.1f} MB while rendering"
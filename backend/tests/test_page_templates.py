@@ -0,0 +1,75 @@
+"""Tests for compiled page templates."""
+
+import pytest
+
+from src.models import GeneratePDFRequest
+from src.page_templates import PageDesign, compile_template, parse_color, pikepdf
+from src.pdf_generator import generate_pdf_report
+
+requires_pikepdf = pytest.mark.skipif(pikepdf is None, reason="pikepdf not installed")
+
+
+def _request(page_count: int, background_color: str = "#fff4e0") -> GeneratePDFRequest:
+    return GeneratePDFRequest(
+        pages=[
+            {
+                "page_number": page,
+                "title": f"Page {page}",
+                "background_color": background_color,
+                "products": [
+                    {"id": f"prod-{page}-{i}", "name": f"Product {i}", "price": 2.5}
+                    for i in range(4)
+                ],
+            }
+            for page in range(1, page_count + 1)
+        ],
+    )
+
+
+def test_parse_color():
+    """Test hex, short hex and named colors."""
+    assert parse_color("#ff8000") == (255, 128, 0)
+    assert parse_color("f80") == (255, 136, 0)
+    assert parse_color("White") == (255, 255, 255)
+    assert parse_color("not-a-color") is None
+    assert parse_color(None) is None
+
+
+@requires_pikepdf
+def test_compile_template_is_cached():
+    """Test a design is compiled once per process."""
+    design = PageDesign(orientation="portrait", background=(1, 2, 3), frames=((15, 40, 85, 55),))
+    assert compile_template(design) is compile_template(design)
+    assert compile_template(design) is not compile_template(
+        PageDesign(orientation="landscape", background=(1, 2, 3))
+    )
+
+
+@requires_pikepdf
+def test_pages_with_same_design_share_one_form_xobject(tmp_path):
+    """Test that identical page chrome is stored once and referenced by every page."""
+    output_path = tmp_path / "templated.pdf"
+    generate_pdf_report(_request(page_count=12), output_path)
+
+    with pikepdf.open(output_path) as document:
+        assert len(document.pages) == 12
+        forms = set()
+        for page in document.pages:
+            for xobject in page.obj.Resources.XObject.values():
+                if xobject.get("/Subtype") == "/Form":
+                    forms.add(xobject.objgen)
+        assert len(forms) == 1
+
+
+@requires_pikepdf
+def test_white_pages_without_frames_are_not_stamped(tmp_path):
+    """Test that pages without chrome get no template reference."""
+    output_path = tmp_path / "plain.pdf"
+    request = GeneratePDFRequest(
+        pages=[{"page_number": 1, "title": "Only a title", "background_color": "white"}]
+    )
+    generate_pdf_report(request, output_path)
+
+    with pikepdf.open(output_path) as document:
+        resources = document.pages[0].obj.Resources
+        assert "/XObject" not in resources
@@ -0,0 +1,126 @@
+"""Tests for the PDF output optimization stage."""
+
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src import pdf_optimizer
+from src.models import GeneratePDFRequest
+from src.pdf_generator import FolderPDF, generate_pdf_report
+from src.pdf_optimizer import COMPRESSION_LEVELS, deduplicate_resources, pikepdf
+from src.server import app
+
+requires_pikepdf = pytest.mark.skipif(pikepdf is None, reason="pikepdf not installed")
+
+
+def _request(**options) -> GeneratePDFRequest:
+    return GeneratePDFRequest(
+        pages=[
+            {
+                "page_number": page,
+                "title": f"Page {page}",
+                "products": [
+                    {"id": f"prod-{page}-{i}", "name": f"Product {i}", "price": 1.5 + i}
+                    for i in range(4)
+                ],
+            }
+            for page in range(1, 11)
+        ],
+        **options,
+    )
+
+
+@pytest.mark.parametrize("compression", list(COMPRESSION_LEVELS))
+def test_compression_levels_produce_valid_pdf(tmp_path, compression):
+    """Test every compression level writes a readable PDF and reports its size."""
+    output_path = tmp_path / "out.pdf"
+    report = generate_pdf_report(_request(compression=compression), output_path)
+
+    assert output_path.read_bytes().startswith(b"%PDF")
+    assert report.final_size == output_path.stat().st_size
+    assert report.compression == compression
+
+
+@requires_pikepdf
+def test_max_compression_is_smallest(tmp_path):
+    """Test that "max" does not produce a larger file than "fast"."""
+    fast = generate_pdf_report(_request(compression="fast"), tmp_path / "fast.pdf")
+    best = generate_pdf_report(_request(compression="max"), tmp_path / "max.pdf")
+    assert best.final_size < fast.final_size
+
+
+@requires_pikepdf
+def test_linearized_output(tmp_path):
+    """Test that linearize=True produces a fast-web-view PDF."""
+    output_path = tmp_path / "linear.pdf"
+    report = generate_pdf_report(_request(linearize=True), output_path)
+
+    assert report.linearized is True
+    with pikepdf.open(output_path) as document:
+        assert document.is_linearized
+        assert len(document.pages) == 10
+
+
+@requires_pikepdf
+def test_deduplicate_resources_across_documents():
+    """Test that identical fonts copied in from separate documents collapse to one."""
+
+    def single_page_pdf(text: str) -> bytes:
+        pdf = FolderPDF()
+        pdf.add_page()
+        pdf.set_font("Helvetica", "B", 12)
+        pdf.cell(0, 10, text)
+        return bytes(pdf.output())
+
+    merged = pikepdf.new()
+    for text in ("first", "second", "third"):
+        with pikepdf.open(io.BytesIO(single_page_pdf(text))) as part:
+            merged.pages.extend(part.pages)
+
+    assert deduplicate_resources(merged) > 0
+
+    fonts = {
+        font.objgen
+        for page in merged.pages
+        for font in page.obj.Resources.Font.values()
+    }
+    assert len(fonts) == 2  # Helvetica-Bold for text, Helvetica-Oblique for the footer
+
+
+def test_generate_endpoint_accepts_output_options():
+    """Test the API accepts compression and linearize options."""
+    client = TestClient(app)
+    response = client.post(
+        "/api/generate",
+        json={
+            "pages": [{"page_number": 1, "products": [{"id": "p1", "name": "A"}]}],
+            "compression": "max",
+            "linearize": True,
+        },
+    )
+    assert response.status_code == 200
+    assert response.json()["success"] is True
+
+    invalid = client.post(
+        "/api/generate",
+        json={"pages": [], "compression": "ultra"},
+    )
+    assert invalid.status_code == 422
+
+
+@requires_pikepdf
+def test_max_save_restores_flate_level_under_lock(tmp_path, monkeypatch):
+    """Test a "max" save raises pikepdf's zlib level only while holding the lock."""
+    levels = []
+
+    def record_level(level):
+        assert pdf_optimizer._compression_lock._is_owned()
+        levels.append(level)
+
+    monkeypatch.setattr(pdf_optimizer, "_pikepdf_flate_level", 3)
+    monkeypatch.setattr(pikepdf.settings, "set_flate_compression_level", record_level)
+    generate_pdf_report(_request(compression="max"), tmp_path / "max.pdf")
+
+    assert levels == [COMPRESSION_LEVELS["max"], 3]
+    assert pdf_optimizer._pikepdf_flate_level == 3
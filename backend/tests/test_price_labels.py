@@ -0,0 +1,102 @@
+"""Tests for locale price formatting and promotion labels."""
+
+import random
+import re
+
+import pytest
+from pydantic import ValidationError
+
+from src.folder_layout import layout_page
+from src.models import FolderPage, GeneratePDFRequest, Product
+from src.pdf_generator import generate_pdf_report
+from src.pdf_optimizer import pikepdf
+from src.price_labels import LabelSegment, format_price, price_label
+
+
+def test_format_price_per_locale():
+    """Test that amounts use each locale's symbol position and separators."""
+    assert format_price(9.99) == "€ 9,99"
+    assert format_price(1234.5) == "€ 1.234,50"
+    assert format_price(1234.5, "de_DE") == "1.234,50 €"
+    assert format_price(1234.5, "en_IE") == "€1,234.50"
+    with pytest.raises(ValueError, match="Unknown locale"):
+        format_price(1.0, "xx_XX")
+
+
+def test_promotion_labels():
+    """Test the segments of each promotion type, in reading order."""
+    assert price_label(7.49, 9.99, "percent_off") == (
+        LabelSegment("price", "€ 7,49"),
+        LabelSegment("original", "€ 9,99"),
+        LabelSegment("badge", "-25%"),
+    )
+    assert price_label(5.0, None, "multi_buy", 2) == (
+        LabelSegment("badge", "2 voor"),
+        LabelSegment("price", "€ 5,00"),
+    )
+    assert price_label(5.0, None, "multi_buy", 3, "de_DE")[0].text == "3 für"
+    assert [s.kind for s in price_label(2.0, 2.5, "price_cut")] == ["price", "original"]
+    assert price_label(2.0, 1.5) == (LabelSegment("price", "€ 2,00"),)
+
+
+def test_promotions_are_validated():
+    """Test that promotions missing their prices, and unknown locales, are rejected."""
+    with pytest.raises(ValidationError, match="original_price"):
+        Product(id="a", name="Kaas", price=7.49, promotion="percent_off")
+    with pytest.raises(ValidationError, match="above price"):
+        Product(id="a", name="Kaas", price=7.49, original_price=5.0, promotion="price_cut")
+    with pytest.raises(ValidationError, match="promotion_quantity"):
+        Product(id="a", name="Bier", price=5.0, promotion="multi_buy")
+    with pytest.raises(ValidationError, match="Unknown locale"):
+        GeneratePDFRequest(pages=[], locale="xx_XX")
+
+
+def test_card_lays_out_label_row():
+    """Test that the old price is struck through, and dropped when the row is too narrow."""
+    product = {"id": "a", "name": "Kaas", "price": 7.49, "original_price": 9.99}
+    page = FolderPage(
+        page_number=1, layout="list", products=[{**product, "promotion": "percent_off"}]
+    )
+    texts = layout_page(page, "A4", "portrait")[0].texts
+    price, original, badge = [run for run in texts if run.text != "Kaas"]
+    assert (price.text, original.text, badge.text) == ("€ 7,49", "€ 9,99", "-25%")
+    assert "S" in original.style
+    assert price.x + price.width < original.x < original.x + original.width < badge.x
+
+    narrow = FolderPage(page_number=1, layout="grid", products=page.products * 4)
+    texts = layout_page(narrow, "100x150", "portrait")[0].texts
+    assert "€ 7,49" in {run.text for run in texts}
+    assert "€ 9,99" not in {run.text for run in texts}
+
+
+@pytest.mark.skipif(pikepdf is None, reason="pikepdf not installed")
+def test_pdf_draws_euro_sign(tmp_path):
+    """Test that the PDF core font encodes the euro sign instead of spelling out EUR."""
+    output_path = tmp_path / "folder.pdf"
+    request = GeneratePDFRequest(
+        pages=[{"page_number": 1, "products": [{"id": "a", "name": "Kaas", "price": 4.5}]}]
+    )
+    generate_pdf_report(request, output_path)
+
+    with pikepdf.open(output_path) as document:
+        page = document.pages[0]
+        font = next(iter(page.Resources.Font.values()))
+        contents = page.obj.Contents
+        streams = contents if isinstance(contents, pikepdf.Array) else [contents]
+        data = b"".join(stream.read_bytes() for stream in streams)
+    assert font.Encoding == "/WinAnsiEncoding"
+    assert re.search(rb"\(\x80 4,50\) Tj", data)
+
+
+def test_mass_labels_are_cached():
+    """Test that 50k labels over a folder's worth of distinct prices are formatted once each."""
+    rng = random.Random(1)
+    prices = [round(rng.uniform(0.5, 30), 2) for _ in range(3000)]
+    products = [rng.choice(prices) for _ in range(50000)]
+
+    price_label.cache_clear()
+    for price in products:
+        price_label(price, round(price * 1.25, 2), "percent_off")
+    info = price_label.cache_info()
+    assert info.misses == len(set(products))
+    assert info.hits == len(products) - info.misses
@@ -0,0 +1,119 @@
+"""Tests for project autosave with content-addressed snapshots."""
+
+import copy
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src import server
+from src.models import FolderPage
+from src.project_store import ProjectNotFound, ProjectStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Create a project store in a throwaway directory."""
+    return ProjectStore(tmp_path / "projects.sqlite3")
+
+
+def _pages(page_count: int = 100, products_per_page: int = 6) -> list:
+    return [
+        FolderPage(
+            page_number=page,
+            title=f"Pagina {page}",
+            products=[
+                {"id": f"prod-{page}-{i}", "name": f"Product {i}", "price": 1.99 + i}
+                for i in range(products_per_page)
+            ],
+        ).model_dump()
+        for page in range(1, page_count + 1)
+    ]
+
+
+def test_snapshot_roundtrip(store):
+    """Test a saved folder loads back unchanged."""
+    project = store.create_project("Week 42")
+    pages = _pages(page_count=3)
+    settings = {"orientation": "landscape"}
+
+    result = store.save_snapshot(project["project_id"], pages, settings)
+    assert (result.revision, result.created) == (1, True)
+
+    loaded = store.load_revision(project["project_id"])
+    assert loaded["revision"] == 1
+    assert loaded["pages"] == pages
+    assert loaded["settings"] == settings
+
+
+def test_autosave_only_writes_changed_objects(store):
+    """Test that editing one product of a 100-page folder stores three objects."""
+    project_id = store.create_project("Groot")["project_id"]
+    pages = _pages()
+
+    first = store.save_snapshot(project_id, pages)
+    # 600 distinct products, 100 pages, settings and the manifest
+    assert first.objects_written == 702
+
+    unchanged = store.save_snapshot(project_id, copy.deepcopy(pages))
+    assert (unchanged.revision, unchanged.created, unchanged.objects_written) == (1, False, 0)
+
+    pages[41]["products"][2]["price"] = 0.99
+    edited = store.save_snapshot(project_id, pages)
+    # The product, its page and the manifest
+    assert (edited.revision, edited.objects_written) == (2, 3)
+
+    assert store.load_revision(project_id, 1)["pages"][41]["products"][2]["price"] == 3.99
+    assert store.load_revision(project_id, 2)["pages"][41]["products"][2]["price"] == 0.99
+    assert [r["revision"] for r in store.list_revisions(project_id)] == [2, 1]
+
+
+def test_reverting_reuses_stored_objects(store):
+    """Test that going back to earlier content stores only a new revision."""
+    project_id = store.create_project("Terug")["project_id"]
+    original = _pages(page_count=5)
+    edited = copy.deepcopy(original)
+    edited[0]["title"] = "Nieuwe titel"
+
+    store.save_snapshot(project_id, original)
+    store.save_snapshot(project_id, edited)
+    result = store.save_snapshot(project_id, original)
+
+    assert (result.revision, result.created, result.objects_written) == (3, True, 0)
+
+
+def test_delete_project_collects_unshared_objects(store):
+    """Test that deleting a project keeps objects other projects still use."""
+    shared = _pages(page_count=2)
+    keep = store.create_project("Blijft")["project_id"]
+    drop = store.create_project("Weg")["project_id"]
+    store.save_snapshot(keep, shared)
+    store.save_snapshot(drop, shared + _pages(page_count=1, products_per_page=1))
+
+    assert store.delete_project(drop) > 0
+    assert store.load_revision(keep)["pages"] == shared
+    with pytest.raises(ProjectNotFound):
+        store.load_revision(drop)
+
+
+def test_project_endpoints(store, monkeypatch):
+    """Test create, autosave, load and revision listing through the API."""
+    monkeypatch.setattr(server, "projects", store)
+    client = TestClient(server.app)
+
+    project = client.post("/api/projects", json={"name": "Folder"}).json()
+    project_id = project["project_id"]
+    assert project["head_revision"] == 0
+
+    snapshot = {"pages": [{"page_number": 1, "title": "Cover"}], "settings": {"dpi": 150}}
+    saved = client.put(f"/api/projects/{project_id}", json=snapshot).json()
+    assert (saved["revision"], saved["created"]) == (1, True)
+    assert client.put(f"/api/projects/{project_id}", json=snapshot).json()["created"] is False
+
+    loaded = client.get(f"/api/projects/{project_id}").json()
+    assert loaded["pages"][0]["title"] == "Cover"
+    assert loaded["settings"] == {"dpi": 150}
+    assert client.get(f"/api/projects/{project_id}/revisions/1").json()["revision"] == 1
+
+    assert client.get(f"/api/projects/{project_id}/revisions/9").status_code == 404
+    assert client.put("/api/projects/missing", json=snapshot).status_code == 404
+    assert len(client.get("/api/projects").json()["projects"]) == 1
@@ -0,0 +1,95 @@
+"""Tests for PDF, PNG and HTML output from one layout pass."""
+
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from src import renderers, server
+from src.models import GeneratePDFRequest
+from src.renderers import generate_outputs
+
+
+def _request(**options) -> GeneratePDFRequest:
+    return GeneratePDFRequest(
+        pages=[
+            {
+                "page_number": 1,
+                "title": "Zuivel & kaas",
+                "background_color": "#ffe0e0",
+                "products": [
+                    {"id": f"kaas-{i}", "name": f"Kaas {i}", "price": 4.5} for i in range(12)
+                ],
+            },
+            {
+                "page_number": 2,
+                "title": "Brood",
+                "layout": "list",
+                "products": [{"id": "brood", "name": "Volkoren", "description": "Vers"}],
+            },
+        ],
+        **options,
+    )
+
+
+def test_formats_share_one_layout_pass(tmp_path, monkeypatch):
+    """Test that all formats are drawn from a single layout."""
+    calls = []
+    layout_folder = renderers.layout_folder
+
+    def counting_layout(request):
+        calls.append(request)
+        return layout_folder(request)
+
+    monkeypatch.setattr(renderers, "layout_folder", counting_layout)
+    outputs = generate_outputs(
+        _request(formats=["pdf", "png", "html", "png"]), tmp_path / "job.pdf"
+    )
+
+    assert len(calls) == 1
+    assert set(outputs) == {"pdf", "png", "html"}
+    assert outputs["pdf"] == [tmp_path / "job.pdf"]
+    assert all(path.exists() for paths in outputs.values() for path in paths)
+
+
+def test_png_pages_match_layout(tmp_path):
+    """Test one image per output page, including overflow pages, at the requested DPI."""
+    outputs = generate_outputs(_request(formats=["png"], png_dpi=72), tmp_path / "job.pdf")
+
+    # 12 grid cards overflow the first page onto a second one
+    assert [path.name for path in outputs["png"]] == [
+        "page-001.png",
+        "page-002.png",
+        "page-003.png",
+    ]
+    with Image.open(outputs["png"][0]) as image:
+        assert image.size == (595, 842)  # A4 at 72 DPI
+        assert image.getpixel((5, 5)) == (255, 224, 224)
+    assert not (tmp_path / "job.pdf").exists()
+
+
+def test_html_contains_folder(tmp_path):
+    """Test that the HTML page holds every page, product and footer, escaped."""
+    outputs = generate_outputs(_request(formats=["html"]), tmp_path / "job.pdf")
+    html = outputs["html"][0].read_text(encoding="utf-8")
+
+    assert html.count('<section class="page"') == 3
+    assert "Zuivel &amp; kaas" in html
+    assert 'data-product-id="brood"' in html
+    assert "€ 4,50" in html
+    assert "Pagina 3/3" in html
+
+
+def test_generate_endpoint_multiple_formats():
+    """Test that a multi-format job lists and serves each output."""
+    client = TestClient(server.app)
+    folder = _request(formats=["pdf", "html"]).model_dump()
+
+    result = client.post("/api/generate", json=folder).json()
+    assert result["success"] is True
+    job_id = result["job_id"]
+    assert result["outputs"] == [f"/api/download/{job_id}", f"/api/download/{job_id}/folder.html"]
+
+    response = client.get(result["outputs"][1])
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/html")
+    assert client.get(result["outputs"][0]).content.startswith(b"%PDF")
+    assert client.get(f"/api/download/{job_id}/..%2F{job_id}.pdf").status_code == 404
@@ -0,0 +1,176 @@
+"""Tests for speculative render-ahead and export from cached page renders."""
+
+import asyncio
+import re
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src import pdf_optimizer, server
+from src.models import GeneratePDFRequest
+from src.pdf_generator import fragment_key, generate_pdf_report
+from src.pdf_optimizer import pikepdf
+from src.render_cache import RenderCache
+from src.speculative import SpeculativeRenderer
+
+pytestmark = pytest.mark.skipif(pikepdf is None, reason="pikepdf not installed")
+
+
+@pytest.fixture
+def speculator(tmp_path):
+    """Create a background renderer with a throwaway cache."""
+    renderer = SpeculativeRenderer(RenderCache(tmp_path / "cache"))
+    yield renderer
+    renderer.stop(timeout=5)
+
+
+def _request(titles, products_per_page: int = 4) -> GeneratePDFRequest:
+    return GeneratePDFRequest(
+        pages=[
+            {
+                "page_number": number,
+                "title": title,
+                "background_color": "#ffe0e0",
+                "products": [
+                    {"id": f"{title}-{i}", "name": f"{title} {i}", "price": 1.25}
+                    for i in range(products_per_page)
+                ],
+            }
+            for number, title in enumerate(titles, start=1)
+        ]
+    )
+
+
+def _footers(path):
+    with pikepdf.open(path) as document:
+        footers = []
+        for page in document.pages:
+            page.contents_coalesce()
+            content = page.obj.Contents.read_bytes()
+            # fpdf2 splits the footer text where the total-pages alias was
+            start = content.index(b"(Pagina ")
+            text_object = content[start:content.index(b"ET", start)]
+            footers.append(b"".join(re.findall(rb"\((.*?)\) Tj", text_object)).decode())
+        return footers
+
+
+def test_submit_renders_only_changed_pages(speculator):
+    """Test that unchanged pages are not queued again after an edit."""
+    request = _request(["Kaas", "Brood", "Fruit"])
+    assert speculator.submit(request) == {"queued": 3, "cached": 0}
+    assert speculator.wait_until_done(timeout=30)
+    assert speculator.rendered == 3
+
+    edited = _request(["Kaas", "Brood", "Groente"])
+    assert speculator.submit(edited) == {"queued": 1, "cached": 2}
+    assert speculator.wait_until_done(timeout=30)
+    assert speculator.rendered == 4
+
+
+def test_clients_keep_their_own_queues(speculator):
+    """Test that a submit replaces only the submitting client's queued pages."""
+    with speculator.interactive():
+        speculator.submit(_request(["Kaas", "Brood"]), client="editor-a")
+        speculator.submit(_request(["Fruit"]), client="editor-b")
+        speculator.submit(_request(["Groente"]), client="editor-a")
+    assert speculator.wait_until_done(timeout=30)
+
+    def cached(title):
+        request = _request([title])
+        return speculator.cache.contains(fragment_key(request.pages[0], request))
+
+    assert cached("Fruit") and cached("Groente")
+    assert not cached("Brood")
+
+
+def test_speculation_pauses_during_interactive_export(speculator):
+    """Test that background rendering waits while an export runs."""
+    with speculator.interactive():
+        speculator.submit(_request(["Kaas", "Brood"]))
+        time.sleep(0.3)
+        assert speculator.rendered == 0
+    assert speculator.wait_until_done(timeout=30)
+    assert speculator.rendered == 2
+
+
+def test_export_assembles_prerendered_pages(speculator, tmp_path):
+    """Test that cached pages are placed at any position with correct numbering."""
+    speculator.submit(_request(["Kaas", "Brood", "Fruit"]))
+    assert speculator.wait_until_done(timeout=30)
+
+    # A new page in front shifts every cached page by one
+    request = _request(["Voorpagina", "Kaas", "Brood", "Fruit"])
+    output_path = tmp_path / "export.pdf"
+    generate_pdf_report(request, output_path, speculator.cache)
+
+    assert _footers(output_path) == [f"Pagina {n}/4" for n in range(1, 5)]
+    assert all(speculator.cache.contains(fragment_key(p, request)) for p in request.pages)
+
+
+def test_export_matches_direct_rendering(speculator, tmp_path):
+    """Test that overflow pages inside fragments are counted and numbered."""
+    request = _request(["Groot", "Klein"], products_per_page=12)
+    speculator.submit(request)
+    assert speculator.wait_until_done(timeout=30)
+
+    direct_path = tmp_path / "direct.pdf"
+    cached_path = tmp_path / "cached.pdf"
+    generate_pdf_report(request, direct_path)
+    generate_pdf_report(request, cached_path, speculator.cache)
+
+    assert _footers(cached_path) == _footers(direct_path)
+
+
+def test_large_prerendered_export_stays_within_file_limit(
+    speculator, tmp_path, monkeypatch, few_file_descriptors
+):
+    """Test that assembling one fragment per page does not open every fragment at once."""
+    monkeypatch.setattr(pdf_optimizer, "MERGE_BATCH_SIZE", 8)
+    request = _request([f"Afdeling {n}" for n in range(1, 101)], products_per_page=1)
+    speculator.submit(request)
+    assert speculator.wait_until_done(timeout=120)
+
+    output_path = tmp_path / "export.pdf"
+    generate_pdf_report(request, output_path, speculator.cache)
+
+    assert _footers(output_path) == [f"Pagina {n}/100" for n in range(1, 101)]
+
+
+def test_speculate_endpoint(tmp_path, monkeypatch):
+    """Test the editor endpoint queues pages and export uses them."""
+    renderer = SpeculativeRenderer(RenderCache(tmp_path / "cache"))
+    monkeypatch.setattr(server, "speculator", renderer)
+    monkeypatch.setattr(server, "render_cache", renderer.cache)
+    client = TestClient(server.app)
+    folder = _request(["Kaas", "Brood"]).model_dump()
+
+    try:
+        assert client.post("/api/speculate", json=folder).json() == {"queued": 2, "cached": 0}
+        assert renderer.wait_until_done(timeout=30)
+        assert client.post("/api/speculate", json=folder).json() == {"queued": 0, "cached": 2}
+        assert client.post("/api/generate", json=folder).json()["success"] is True
+    finally:
+        renderer.stop(timeout=5)
+
+
+def test_speculate_submits_off_the_event_loop(tmp_path, monkeypatch):
+    """Test that queueing a folder does not block the event loop."""
+    renderer = SpeculativeRenderer(RenderCache(tmp_path / "cache"))
+    monkeypatch.setattr(server, "speculator", renderer)
+    on_loop = []
+
+    def submit(request, client=""):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+        return {"queued": 0, "cached": len(request.pages)}
+
+    monkeypatch.setattr(renderer, "submit", submit)
+    folder = _request(["Kaas"]).model_dump()
+
+    response = TestClient(server.app).post("/api/speculate", json=folder)
+    assert response.json() == {"queued": 0, "cached": 1}
+    assert on_loop == [False]
@@ -0,0 +1,228 @@
+"""Tests for compressed transport and resumable downloads."""
+
+import gzip
+import json
+import tracemalloc
+import zlib
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.server import app
+from src.transport import MAX_REQUEST_BODY_BYTES, negotiate_encoding, zstandard
+
+
+@pytest.fixture
+def client():
+    """Create a test client."""
+    return TestClient(app)
+
+
+def _folder(products_per_page: int = 20, page_count: int = 3) -> dict:
+    return {
+        "pages": [
+            {
+                "page_number": page,
+                "title": f"Page {page}",
+                "products": [
+                    {
+                        "id": f"prod-{page}-{i}",
+                        "name": f"Product {i}",
+                        "price": 9.99 + i,
+                        "description": "Compressible description text " * 2,
+                    }
+                    for i in range(products_per_page)
+                ],
+                "layout": "list",
+            }
+            for page in range(1, page_count + 1)
+        ],
+    }
+
+
+def _generate(client) -> str:
+    response = client.post("/api/generate", json=_folder())
+    assert response.json()["success"] is True
+    return response.json()["job_id"]
+
+
+def test_negotiate_encoding():
+    """Test Accept-Encoding negotiation honours q-values and availability."""
+    assert negotiate_encoding("") is None
+    assert negotiate_encoding("identity") is None
+    assert negotiate_encoding("gzip") == "gzip"
+    assert negotiate_encoding("gzip;q=0") is None
+    assert negotiate_encoding("br, gzip;q=0.5") == "gzip"
+    expected = "zstd" if zstandard is not None else "gzip"
+    assert negotiate_encoding("gzip, zstd") == expected
+
+
+def test_gzip_request_body(client):
+    """Test that a gzip-compressed request body is decoded before validation."""
+    body = gzip.compress(json.dumps(_folder()).encode())
+    response = client.post(
+        "/api/generate",
+        content=body,
+        headers={"Content-Type": "application/json", "Content-Encoding": "gzip"},
+    )
+    assert response.status_code == 200
+    assert response.json()["success"] is True
+
+
+@pytest.mark.skipif(zstandard is None, reason="zstandard not installed")
+def test_zstd_request_body(client):
+    """Test that a zstd-compressed request body is decoded before validation."""
+    body = zstandard.ZstdCompressor().compress(json.dumps(_folder()).encode())
+    response = client.post(
+        "/api/generate",
+        content=body,
+        headers={"Content-Type": "application/json", "Content-Encoding": "zstd"},
+    )
+    assert response.status_code == 200
+    assert response.json()["success"] is True
+
+
+def test_unsupported_request_encoding(client):
+    """Test that unknown content codings are rejected."""
+    response = client.post(
+        "/api/generate",
+        content=b"whatever",
+        headers={"Content-Type": "application/json", "Content-Encoding": "br"},
+    )
+    assert response.status_code == 415
+
+
+def test_corrupt_request_body(client):
+    """Test that a body that fails to decompress is rejected."""
+    response = client.post(
+        "/api/generate",
+        content=b"not gzip at all",
+        headers={"Content-Type": "application/json", "Content-Encoding": "gzip"},
+    )
+    assert response.status_code == 400
+
+
+def _bomb(encoding: str, size: int) -> bytes:
+    """A tiny compressed body that inflates to ``size`` zero bytes."""
+    if encoding == "zstd":
+        compressor = zstandard.ZstdCompressor().compressobj()
+    else:
+        compressor = zlib.compressobj(9, zlib.DEFLATED, 31)
+    block = bytes(1024 * 1024)
+    parts = [compressor.compress(block) for _ in range(size // len(block))]
+    return b"".join(parts) + compressor.flush()
+
+
+@pytest.mark.parametrize(
+    "encoding",
+    [
+        "gzip",
+        pytest.param(
+            "zstd",
+            marks=pytest.mark.skipif(zstandard is None, reason="zstandard not installed"),
+        ),
+    ],
+)
+def test_decompression_bomb_is_rejected_early(client, encoding):
+    """Test that a body inflating past the limit is refused without inflating all of it."""
+    body = _bomb(encoding, 2 * MAX_REQUEST_BODY_BYTES)
+    assert len(body) < 1024 * 1024
+
+    tracemalloc.start()
+    try:
+        response = client.post(
+            "/api/generate",
+            content=body,
+            headers={"Content-Type": "application/json", "Content-Encoding": encoding},
+        )
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert response.status_code == 413
+    assert peak < MAX_REQUEST_BODY_BYTES + 16 * 1024 * 1024
+
+
+def test_response_compression_threshold(client):
+    """Test that large text responses are compressed, and small ones and PDFs are not."""
+    response = client.post("/api/generate", json={**_folder(), "formats": ["pdf", "html"]})
+    job_id = response.json()["job_id"]
+
+    small = client.get("/health", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+    page = client.get(f"/api/download/{job_id}/folder.html", headers={"Accept-Encoding": "gzip"})
+    assert page.status_code == 200
+    assert page.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in page.headers["vary"]
+    assert page.text.startswith("<!DOCTYPE html>")
+
+    download = client.get(f"/api/download/{job_id}", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in download.headers
+    assert download.content.startswith(b"%PDF")
+
+
+def test_download_resume_after_negotiated_request(client):
+    """Test that a download started with Accept-Encoding resumes with its ETag."""
+    job_id = _generate(client)
+    accept = ", ".join(["zstd", "gzip"] if zstandard is not None else ["gzip"])
+    full = client.get(f"/api/download/{job_id}", headers={"Accept-Encoding": accept})
+    assert full.status_code == 200
+    etag = full.headers["etag"]
+    assert not etag.startswith("W/")
+
+    rest = client.get(
+        f"/api/download/{job_id}",
+        headers={"Accept-Encoding": accept, "Range": "bytes=100-", "If-Range": etag},
+    )
+    assert rest.status_code == 206
+    assert full.content[:100] + rest.content == full.content
+
+
+def test_download_range_resume(client):
+    """Test that an interrupted download can be resumed with a Range request."""
+    job_id = _generate(client)
+    full = client.get(f"/api/download/{job_id}", headers={"Accept-Encoding": "identity"})
+    assert full.headers["accept-ranges"] == "bytes"
+    etag = full.headers["etag"]
+    size = len(full.content)
+
+    first = client.get(f"/api/download/{job_id}", headers={"Range": "bytes=0-99"})
+    assert first.status_code == 206
+    assert first.headers["content-range"] == f"bytes 0-99/{size}"
+    assert "content-encoding" not in first.headers
+
+    rest = client.get(
+        f"/api/download/{job_id}",
+        headers={"Range": "bytes=100-", "If-Range": etag},
+    )
+    assert rest.status_code == 206
+    assert first.content + rest.content == full.content
+
+
+def test_download_suffix_range(client):
+    """Test suffix ranges return the last N bytes."""
+    job_id = _generate(client)
+    response = client.get(f"/api/download/{job_id}", headers={"Range": "bytes=-10"})
+    assert response.status_code == 206
+    assert response.content.rstrip().endswith(b"%%EOF")
+
+
+def test_download_range_not_satisfiable(client):
+    """Test that a range past the end of the file returns 416."""
+    job_id = _generate(client)
+    response = client.get(
+        f"/api/download/{job_id}", headers={"Range": "bytes=99999999-"}
+    )
+    assert response.status_code == 416
+    assert response.headers["content-range"].startswith("bytes */")
+
+
+def test_download_if_range_mismatch(client):
+    """Test that a stale If-Range validator returns the full file."""
+    job_id = _generate(client)
+    response = client.get(
+        f"/api/download/{job_id}",
+        headers={"Range": "bytes=0-99", "If-Range": '"stale"'},
+    )
+    assert response.status_code == 200
+    assert response.content.startswith(b"%PDF")
@@ -23,6 +23,7 @@ interface PDFSettings {
   output_filename: string;
   color_mode: "RGB" | "CMYK";
   orientation: "portrait" | "landscape";
+  page_format: string;
   dpi: number;
 }
 
@@ -33,6 +34,83 @@ interface Job {
   error?: string;
 }
 
+// Request bodies smaller than this are sent uncompressed
+const COMPRESSION_THRESHOLD_BYTES = 1024;
+// How often an interrupted download is resumed before giving up
+const MAX_DOWNLOAD_RESUMES = 3;
+// Quiet period after the last edit before the folder is autosaved
+const AUTOSAVE_DELAY_MS = 3000;
+// Quiet period after the last edit before changed pages are rendered ahead
+const SPECULATE_DELAY_MS = 1000;
+// Identifies this editor's render-ahead queue on a backend shared by several editors
+const EDITOR_SESSION_ID = crypto.randomUUID();
+
+/**
+ * Gzip a JSON body when it is large enough and the WebView supports
+ * CompressionStream; otherwise send it as-is.
+ */
+async function encodeJsonBody(
+  payload: unknown
+): Promise<{ body: BodyInit; headers: Record<string, string> }> {
+  const json = JSON.stringify(payload);
+  const headers: Record<string, string> = { "Content-Type": "application/json" };
+  if (
+    json.length < COMPRESSION_THRESHOLD_BYTES ||
+    typeof CompressionStream === "undefined"
+  ) {
+    return { body: json, headers };
+  }
+  const stream = new Blob([json])
+    .stream()
+    .pipeThrough(new CompressionStream("gzip"));
+  const body = await new Response(stream).arrayBuffer();
+  return { body, headers: { ...headers, "Content-Encoding": "gzip" } };
+}
+
+/**
+ * Download a file, resuming with HTTP Range requests if the connection drops.
+ */
+async function downloadWithResume(url: string): Promise<Blob> {
+  const chunks: Uint8Array[] = [];
+  let received = 0;
+  let etag: string | null = null;
+
+  for (let attempt = 0; attempt <= MAX_DOWNLOAD_RESUMES; attempt++) {
+    const headers: Record<string, string> = {};
+    if (received > 0) {
+      headers["Range"] = `bytes=${received}-`;
+      if (etag) headers["If-Range"] = etag;
+    }
+
+    const response = await fetch(url, { headers });
+    if (!response.ok || !response.body) {
+      throw new Error("Download failed");
+    }
+    if (received > 0 && response.status !== 206) {
+      // File changed on the server: start over
+      chunks.length = 0;
+      received = 0;
+    }
+    etag = response.headers.get("ETag") ?? etag;
+
+    const reader = response.body.getReader();
+    try {
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) return new Blob(chunks, { type: "application/pdf" });
+        chunks.push(value);
+        received += value.length;
+      }
+    } catch (error) {
+      console.warn(
+        `[Editor] Download interrupted at ${received} bytes, resuming...`,
+        error
+      );
+    }
+  }
+  throw new Error("Download failed after retries");
+}
+
 export default function Editor() {
   const [pages, setPages] = useState<Page[]>([
     {
@@ -59,8 +137,11 @@ export default function Editor() {
     output_filename: "offer_folder.pdf",
     color_mode: "RGB",
     orientation: "portrait",
+    page_format: "A4",
     dpi: 300,
   });
+  const [projectId, setProjectId] = useState<string | null>(null);
+  const [savedRevision, setSavedRevision] = useState<number | null>(null);
 
   useEffect(() => {
     // Listen for backend-ready event from Layout.astro
@@ -104,6 +185,98 @@ export default function Editor() {
     };
   }, []);
 
+  useEffect(() => {
+    if (!port) return;
+
+    // Reopen the last project, or start a new one
+    const openProject = async () => {
+      const storedId = localStorage.getItem("project-id");
+      if (storedId) {
+        const response = await fetch(
+          `http://127.0.0.1:${port}/api/projects/${storedId}`
+        );
+        if (response.ok) {
+          const project = await response.json();
+          if (project.revision > 0) {
+            setPages(project.pages);
+            setSettings((current) => ({ ...current, ...project.settings }));
+          }
+          setProjectId(storedId);
+          setSavedRevision(project.revision);
+          return;
+        }
+      }
+      const response = await fetch(`http://127.0.0.1:${port}/api/projects`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ name: "Aanbiedingenfolder" }),
+      });
+      const project = await response.json();
+      localStorage.setItem("project-id", project.project_id);
+      setProjectId(project.project_id);
+      setSavedRevision(project.head_revision);
+    };
+
+    openProject().catch((error) =>
+      console.error("[Editor] Failed to open project:", error)
+    );
+  }, [port]);
+
+  useEffect(() => {
+    if (!port || !projectId) return;
+
+    // Autosave once editing pauses; the backend only stores what changed
+    const timer = setTimeout(async () => {
+      try {
+        const { body, headers } = await encodeJsonBody({ pages, settings });
+        const response = await fetch(
+          `http://127.0.0.1:${port}/api/projects/${projectId}`,
+          { method: "PUT", headers, body }
+        );
+        if (response.ok) {
+          const result = await response.json();
+          setSavedRevision(result.revision);
+        }
+      } catch (error) {
+        console.warn("[Editor] Autosave failed:", error);
+      }
+    }, AUTOSAVE_DELAY_MS);
+
+    return () => clearTimeout(timer);
+  }, [pages, settings, port, projectId]);
+
+  useEffect(() => {
+    if (!port) return;
+
+    // Let the backend pre-render changed pages so export only assembles them
+    const timer = setTimeout(async () => {
+      try {
+        const { body, headers } = await encodeJsonBody(buildExportRequest());
+        await fetch(
+          `http://127.0.0.1:${port}/api/speculate?client=${EDITOR_SESSION_ID}`,
+          {
+            method: "POST",
+            headers,
+            body,
+          }
+        );
+      } catch (error) {
+        console.debug("[Editor] Render-ahead request failed:", error);
+      }
+    }, SPECULATE_DELAY_MS);
+
+    return () => clearTimeout(timer);
+  }, [pages, settings, port]);
+
+  const buildExportRequest = () => ({
+    pages: pages,
+    output_filename: settings.output_filename,
+    color_mode: settings.color_mode,
+    dpi: settings.dpi,
+    orientation: settings.orientation,
+    page_format: settings.page_format,
+  });
+
   const handleAddProduct = () => {
     if (!productForm.name.trim()) {
       alert("Product name is required");
@@ -177,18 +350,11 @@ export default function Editor() {
         status: "generating",
       });
 
+      const { body, headers } = await encodeJsonBody(buildExportRequest());
       const response = await fetch(`http://127.0.0.1:${port}/api/generate`, {
         method: "POST",
-        headers: {
-          "Content-Type": "application/json",
-        },
-        body: JSON.stringify({
-          pages: pages,
-          output_filename: settings.output_filename,
-          color_mode: settings.color_mode,
-          dpi: settings.dpi,
-          orientation: settings.orientation,
-        }),
+        headers,
+        body,
       });
 
       if (!response.ok) {
@@ -230,14 +396,9 @@ export default function Editor() {
     if (!port) return;
 
     try {
-      const response = await fetch(
+      const blob = await downloadWithResume(
         `http://127.0.0.1:${port}/api/download/${jobId}`
       );
-      if (!response.ok) {
-        throw new Error("Download failed");
-      }
-
-      const blob = await response.blob();
       const url = URL.createObjectURL(blob);
       const a = document.createElement("a");
       a.href = url;
@@ -279,6 +440,13 @@ export default function Editor() {
                   ? "✗ Connection failed"
                   : "⏳ Loading..."}
             </p>
+            {savedRevision !== null && (
+              <p className="mt-1 text-gray-500">
+                {savedRevision > 0
+                  ? `Saved (revision ${savedRevision})`
+                  : "Not saved yet"}
+              </p>
+            )}
           </div>
 
           {/* Pages Section */}
@@ -396,6 +564,23 @@ export default function Editor() {
                   <option value="landscape">Landscape</option>
                 </select>
               </div>
+              <div>
+                <label className="block text-sm font-medium text-gray-700 mb-1">
+                  Page Format
+                </label>
+                <select
+                  value={settings.page_format}
+                  onChange={(e) =>
+                    setSettings({ ...settings, page_format: e.target.value })
+                  }
+                  className="w-full px-3 py-2 border border-gray-300 rounded"
+                >
+                  <option value="A4">A4</option>
+                  <option value="A3">A3</option>
+                  <option value="A5">A5</option>
+                  <option value="Letter">Letter</option>
+                </select>
+              </div>
               <div>
                 <label className="block text-sm font-medium text-gray-700 mb-1">
                   DPI Resolution
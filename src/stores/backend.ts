@@ -19,7 +19,14 @@ export interface Product {
   price?: number;
   description?: string;
   image_url?: string;
+  // asset_id returned by POST /api/assets
+  image_id?: string;
   quantity?: number;
+  // Regular price, struck through when above price
+  original_price?: number;
+  promotion?: "price_cut" | "percent_off" | "multi_buy";
+  // Items in a multi_buy deal ("2 voor"); price covers all of them
+  promotion_quantity?: number;
 }
 
 export interface FolderPage {
@@ -35,6 +42,15 @@ export interface PDFSettings {
   color_mode: "RGB" | "CMYK";
   dpi: number;
   orientation: "portrait" | "landscape";
+  // A3, A4, A5, Letter, or custom "<width>x<height>" in mm
+  page_format?: string;
+  compression?: "fast" | "balanced" | "max";
+  linearize?: boolean;
+  // Produced from one layout pass; png/html are downloaded per file
+  formats?: ("pdf" | "png" | "html")[];
+  png_dpi?: number;
+  // Price and promotion label formatting
+  locale?: "nl_NL" | "nl_BE" | "de_DE" | "en_IE";
 }
 
 export const pages = atom<FolderPage[]>([
@@ -51,6 +67,9 @@ export const pdfSettings = atom<PDFSettings>({
   color_mode: "RGB",
   dpi: 300,
   orientation: "portrait",
+  page_format: "A4",
+  compression: "balanced",
+  linearize: false,
 });
 
 // Current job status
@@ -58,6 +77,8 @@ export interface PDFJob {
   job_id: string;
   status: "generating" | "completed" | "failed";
   size_kb?: number;
+  // Download URLs of every generated file
+  outputs?: string[];
   error?: string;
 }
 